@@ -0,0 +1,100 @@
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.messages import SystemMessage, HumanMessage
+
+# Los resúmenes se escriben fuera del turno (compartido entre sesiones)
+_resumidor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="resumen")
+
+
+def estimar_tokens(texto: str) -> int:
+    """Estimación local (~4 caracteres por token): no hace llamadas a la API como get_num_tokens."""
+    return len(texto) // 4 + 1
+
+
+class GestorContexto:
+    """
+    Mantiene acotado el contexto que el Tutor envía al modelo:
+    system prompt + resumen acumulado de lo antiguo + ventana de turnos recientes.
+    Cuando la ventana supera el presupuesto de tokens, los turnos más viejos se
+    condensan en el resumen, así el tamaño del prompt no crece con la sesión.
+    El resumen se pide en segundo plano y se aplica en el turno siguiente: mientras
+    tanto, los mensajes que va a reemplazar siguen en la ventana.
+    """
+
+    def __init__(self, llm, system_prompt: SystemMessage, max_tokens: int = 3000,
+                 min_mensajes: int = 4, contar_tokens=estimar_tokens):
+        self.llm = llm
+        self.system_prompt = system_prompt
+        self.max_tokens = max_tokens
+        self.min_mensajes = min_mensajes  # nunca se resumen los últimos N mensajes
+        self.contar_tokens = contar_tokens
+
+        self.resumen = ""
+        self.recientes = []
+        self._tokens = []  # tokens de cada mensaje de la ventana (se cuentan una sola vez)
+        self._en_curso = None  # (cuántos mensajes del principio reemplaza, Future con el resumen)
+
+    def tokens_ventana(self) -> int:
+        return sum(self._tokens)
+
+    def agregar(self, mensaje):
+        self._aplicar_resumen()
+        self.recientes.append(mensaje)
+        self._tokens.append(self.contar_tokens(mensaje.content))
+        if self.tokens_ventana() > self.max_tokens and self._en_curso is None:
+            self._condensar()
+
+    def _condensar(self):
+        # Histéresis: se baja al 60% del presupuesto para no resumir en cada turno
+        objetivo = int(self.max_tokens * 0.6)
+        restantes, n = self.tokens_ventana(), 0
+        while restantes > objetivo and len(self.recientes) - n > self.min_mensajes:
+            restantes -= self._tokens[n]
+            n += 1
+        if n:
+            self._en_curso = (n, _resumidor.submit(self._resumir, self.resumen, self.recientes[:n]))
+
+    def _aplicar_resumen(self):
+        """Si el resumen en segundo plano ya terminó, reemplaza a los mensajes que condensa."""
+        if self._en_curso is None or not self._en_curso[1].done():
+            return
+        n, futuro = self._en_curso
+        self._en_curso = None
+        self.resumen = futuro.result()
+        del self.recientes[:n], self._tokens[:n]
+
+    def esperar(self, timeout: float | None = None):
+        """Espera el resumen en curso y lo aplica (al rehidratar una sesión, p. ej.)."""
+        if self._en_curso is not None:
+            self._en_curso[1].result(timeout=timeout)
+            self._aplicar_resumen()
+
+    def _resumir(self, resumen: str, mensajes) -> str:
+        """Integra los mensajes desplazados al resumen existente (actualización incremental)."""
+        transcripcion = "\n".join(
+            f"{'Estudiante' if isinstance(m, HumanMessage) else 'Luna'}: {m.content}" for m in mensajes
+        )
+        prompt = [
+            SystemMessage(
+                content=(
+                    "Actualiza el resumen de una clase de idiomas. Conserva el idioma que practica "
+                    "el estudiante, su nivel, las palabras explicadas y sus dudas pendientes. "
+                    "Responde solo con el resumen, en español y en pocas líneas."
+                )
+            ),
+            HumanMessage(content=f"Resumen actual:\n{resumen or '(vacío)'}\n\nNuevos mensajes:\n{transcripcion}"),
+        ]
+        try:
+            resultado = self.llm.invoke(prompt)
+            return (resultado.content if hasattr(resultado, "content") else str(resultado)).strip()
+        except Exception as e:
+            print(f"⚠️ No se pudo actualizar el resumen del contexto: {e}")
+            # sin modelo, al menos se conserva el final de lo desplazado (~4 caracteres por token)
+            return f"{resumen}\n{transcripcion}"[-self.max_tokens * 4:]
+
+    def mensajes(self) -> list:
+        """Lista lista para enviar al modelo: system prompt, resumen fijado y ventana reciente."""
+        self._aplicar_resumen()
+        mensajes = [self.system_prompt]
+        if self.resumen:
+            mensajes.append(SystemMessage(content=f"Resumen de la conversación hasta ahora:\n{self.resumen}"))
+        return mensajes + self.recientes
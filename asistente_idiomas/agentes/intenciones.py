@@ -0,0 +1,252 @@
+import os
+import re
+import math
+import threading
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from asistente_idiomas.tools.glosario import normalizar
+
+# 🧭 Enrutador local de intenciones del Tutor (sin llamar al modelo):
+# 1. un único patrón compilado con los disparadores en español, inglés y francés;
+# 2. si no coincide, un clasificador de n-gramas de caracteres entrenado con EJEMPLOS.
+# Las respuestas fijas (saludo, tema ajeno) solo salen de un disparador explícito: el clasificador
+# únicamente puede mandar a consulta o registro, y lo que no supera UMBRAL_INTENCION va al modelo.
+
+CONSULTA, REGISTRO, SALUDO, CHARLA, FUERA_DE_TEMA = "consulta", "registro", "saludo", "charla", "fuera_de_tema"
+UMBRAL_INTENCION = float(os.getenv("TUTOR_UMBRAL_INTENCION", "0.9"))
+
+# disparadores sobre el texto plegado (sin acentos ni signos: 'qué significa' -> 'que significa')
+_DISPARADORES_CONSULTA = [
+    # español
+    r"que significa", r"definicion de", r"significado de", r"que quiere decir", r"que es",
+    r"explica la palabra", r"explicame la palabra", r"dime que significa",
+    # inglés
+    r"what does \S+(?: \S+)? mean", r"what is the meaning of", r"meaning of", r"definition of",
+    r"define the word", r"explain the word",
+    # francés
+    r"que veut dire", r"qu'est-ce que \S+(?: \S+)? veut dire", r"que signifie", r"signification de",
+    r"definition du mot", r"explique le mot",
+]
+_DISPARADORES_REGISTRO = [
+    r"(?:registra|guarda|anota|apunta)\w*",          # 'guárdala', 'anótalas'
+    r"(?:save|store) (?:it|this|that|them|the words?)", r"(?:write|note) (?:it|this|that|them) down",
+    r"(?:enregistre|sauvegarde|garde|note)[sz]?-?(?:le|la|les)",
+]
+# solo PEDIDOS que claramente no son de idiomas ('what time is it' o 'me gusta la música' son práctica);
+# el tema suelto no basta: 'cómo se dice receta en inglés' es vocabulario
+_DISPARADORES_FUERA_DE_TEMA = [
+    r"(?:dame|pasame|quiero|necesito) una receta", r"(?:give me|i need) a recipe", r"donne-moi une recette",
+    r"ayudame a programar", r"(?:escribe|hazme|haz) (?:un|el) (?:codigo|programa|script)",
+    r"write (?:a|the|some|me a) (?:python |javascript )?(?:code|program|script|function)",
+    r"precio del? (?:bitcoin|ethereum|dolar)", r"price of (?:bitcoin|ethereum)",
+    r"(?:invertir|invierto|comprar|compro) (?:en )?(?:bitcoin|criptomonedas|acciones|la bolsa)",
+    r"(?:invest|buy) (?:in )?(?:bitcoin|crypto|stocks)",
+    r"resuelve (?:esta|la) ecuacion", r"solve (?:this|the) equation",
+    r"cuales son las noticias", r"what's (?:in )?the news",
+    r"(?:que|cuales son los) sintomas (?:de|tiene)", r"what are the symptoms of",
+]
+# pedidos de traducción: 'what's the Spanish word for bitcoin' nombra un tema ajeno, pero es vocabulario
+_PISTAS_TRADUCCION = [
+    r"como se (?:dice|escribe|traduce)", r"traduce\w*", r"traduccion de", r"(?:en|al) (?:ingles|espanol|frances)",
+    r"how do (?:you|i) say", r"what(?:'s| is) the (?:\w+ )?word for", r"translat\w*", r"in (?:english|spanish|french)",
+    r"comment (?:dit-on|on dit)", r"tradui\w*", r"en (?:anglais|espagnol|francais)",
+]
+_SALUDOS = [
+    r"hola", r"buen(?:os|as) (?:dias|tardes|noches)", r"buenas", r"que tal",
+    r"hello", r"hi", r"hey", r"good (?:morning|afternoon|evening)",
+    r"bonjour", r"salut", r"bonsoir", r"coucou",
+]
+# lo que se quita para quedarse con la palabra consultada: fragmentos de los disparadores y palabras vacías
+_RELLENO_CONSULTA = [
+    r"que significa", r"que quiere decir", r"definicion de", r"significado de", r"que es", r"explica(?:me)? la palabra",
+    r"dime", r"what does", r"what is the meaning of", r"meaning of", r"definition of", r"define the word",
+    r"explain the word", r"que veut dire", r"qu'est-ce que", r"veut dire", r"que signifie", r"signification de",
+    r"definition du mot", r"explique le mot",
+    r"la", r"el", r"las", r"los", r"una", r"un", r"palabra", r"palabras", r"de", r"del", r"es", r"son",
+    r"the", r"a", r"an", r"word", r"words", r"mean", r"means", r"le", r"les", r"mot", r"mots", r"du",
+    r"significado", r"define", r"signifie",
+    # saludos, pronombres y cortesía: 'hola, qué significa zorplin', 'what does it mean please'
+    r"hola", r"hello", r"hi", r"hey", r"buenas", r"bonjour", r"salut", r"luna",
+    r"it", r"this", r"that", r"these", r"those", r"esto", r"eso", r"esta", r"este", r"esa", r"ese", r"ello",
+    r"ca", r"cela", r"ceci", r"please", r"por favor", r"s'il (?:te|vous) plait",
+]
+
+
+def _compilar(patrones: list[str]) -> str:
+    # entre palabras se acepta cualquier espacio: el texto plegado no los colapsa
+    return "|".join(p.replace(" ", r"\s+") for p in patrones)
+
+
+# un saludo solo cuenta si es todo el mensaje ('hola luna', 'hello!'): 'hola, qué significa...' es una consulta
+_PATRON = re.compile(
+    rf"\b(?P<{CONSULTA}>{_compilar(_DISPARADORES_CONSULTA)})\b"
+    rf"|\b(?P<{REGISTRO}>{_compilar(_DISPARADORES_REGISTRO)})\b"
+    rf"|(?P<{SALUDO}>^\s*(?:{_compilar(_SALUDOS)})(?:\s+luna)?\s*$)"
+    rf"|\b(?P<{FUERA_DE_TEMA}>{_compilar(_DISPARADORES_FUERA_DE_TEMA)})\b"
+)
+_PATRON_TRADUCCION = re.compile(rf"\b(?:{_compilar(_PISTAS_TRADUCCION)})\b")
+_PATRON_RELLENO = re.compile(rf"\b(?:{_compilar(_RELLENO_CONSULTA)})\b")
+_SEPARADORES = re.compile(r",|;|\by\b|\be\b|\band\b|\bet\b")
+# si un mensaje dispara varias, gana la más específica (el Tutor siempre priorizó la consulta)
+_PRIORIDAD = (CONSULTA, REGISTRO, SALUDO, FUERA_DE_TEMA)
+# lo que el clasificador puede decidir (charla igual va al modelo); saludo y tema ajeno solo absorben probabilidad
+_DECIDE_EL_CLASIFICADOR = (CONSULTA, REGISTRO, CHARLA)
+
+
+def _plegar(texto: str) -> str:
+    """Como normalizar() pero conservando la longitud: las posiciones valen para el texto original."""
+    plegado = []
+    for c in texto.lower():
+        base = unicodedata.normalize("NFKD", c)[:1] or c
+        plegado.append(base if base.isalnum() or base in "'-" or base.isspace() else ("'" if c in "’‘" else " "))
+    return "".join(plegado)
+
+
+EJEMPLOS = {
+    CONSULTA: [
+        "qué significa zorplin", "qué quiere decir glimpa", "significado de florblin", "definición de apple",
+        "zorplin significado", "qué es un phrasal verb", "explícame la palabra brunch",
+        "what does awkward mean", "meaning of cozy", "define serendipity", "what's the meaning of tough",
+        "que veut dire bouquiner", "que signifie flâner", "le mot dépaysement", "signification de chouette",
+    ],
+    REGISTRO: [
+        "guárdala", "anótalas por favor", "regístrala en notion", "apúntala en mi lista", "guarda esa palabra",
+        "agrégala a mis palabras", "súmala a notion", "save it please", "add it to my notion", "store this word",
+        "keep that one in my list", "enregistre-le", "ajoute ce mot à ma liste", "garde ce mot",
+    ],
+    SALUDO: [
+        "hola", "hola luna", "buenos días", "buenas tardes", "qué tal", "hey", "hello there", "hi luna",
+        "good morning", "bonjour", "salut luna", "bonsoir", "hola de nuevo", "holis",
+    ],
+    CHARLA: [
+        "quiero practicar inglés", "cómo se dice buenos días", "corrige mi oración", "I went to the beach yesterday",
+        "my favourite food is pizza", "can we practice the past tense", "hablemos en francés",
+        "traduce esta frase al inglés", "cuál es la diferencia entre say y tell", "dame un ejercicio de vocabulario",
+        "how do you say perro in english", "je voudrais pratiquer le français", "j'ai mangé une pomme ce matin",
+        "is this sentence correct", "gracias", "no entendí la explicación", "repite el ejemplo", "otro ejemplo",
+        "conjuga el verbo to be", "cómo se pronuncia through", "yesterday I have gone to school",
+        "quiero aprender palabras de comida", "pregúntame algo en inglés", "ok, sigamos",
+    ],
+    FUERA_DE_TEMA: [
+        "quién ganó el partido de ayer", "dame una receta de lasaña", "cuánto es 234 por 12",
+        "ayúdame a programar en python", "qué tiempo hará mañana", "recomiéndame una película de terror",
+        "cuál es el precio del bitcoin", "resuelve esta ecuación", "escribe un código en javascript",
+        "cuáles son las noticias de hoy", "who won the world cup", "what is the weather tomorrow",
+        "write a python script", "how much is the stock of apple", "recommend me a movie",
+        "quelle est la météo demain", "qui a gagné le match", "donne-moi une recette de crêpes",
+        "arregla mi computadora", "cómo invierto en la bolsa", "qué síntomas tiene la gripe",
+    ],
+}
+
+
+@dataclass
+class Intencion:
+    nombre: str
+    confianza: float
+    via: str  # 'patron', 'clasificador' o 'ambigua'
+
+
+def _ngramas(texto: str, n_min: int = 2, n_max: int = 4) -> Counter:
+    relleno = f" {texto} "
+    return Counter(relleno[i:i + n] for n in range(n_min, n_max + 1) for i in range(len(relleno) - n + 1))
+
+
+class ClasificadorNgramas:
+    """
+    Naive Bayes multinomial sobre n-gramas de caracteres (2 a 4) del texto normalizado:
+    tolera erratas, conjugaciones y los tres idiomas sin listas de palabras.
+    La confianza es la probabilidad a posteriori con la verosimilitud promediada
+    por n-grama (sin eso, NB da ~1.0 a casi todo y no sirve para detectar ambigüedad).
+    """
+
+    def __init__(self, alfa: float = 0.5, temperatura: float = 0.1):
+        self.alfa = alfa
+        self.temperatura = temperatura
+        self.clases: list[str] = []
+        self._log_prior: dict[str, float] = {}
+        self._log_ngrama: dict[str, dict[str, float]] = {}  # log P(ngrama | clase), precalculado
+        self._log_desconocido: dict[str, float] = {}  # lo mismo para un n-grama nunca visto
+
+    def entrenar(self, ejemplos: dict[str, list[str]]) -> "ClasificadorNgramas":
+        self.clases = list(ejemplos)
+        total = sum(len(textos) for textos in ejemplos.values())
+        conteos = {}
+        for clase, textos in ejemplos.items():
+            conteos[clase] = Counter()
+            for texto in textos:
+                conteos[clase].update(_ngramas(normalizar(texto)))
+            self._log_prior[clase] = math.log(len(textos) / total)
+        vocabulario = len(set().union(*conteos.values()))
+        for clase, conteo in conteos.items():
+            log_denominador = math.log(sum(conteo.values()) + self.alfa * vocabulario)
+            self._log_ngrama[clase] = {g: math.log(c + self.alfa) - log_denominador for g, c in conteo.items()}
+            self._log_desconocido[clase] = math.log(self.alfa) - log_denominador
+        return self
+
+    def probabilidades(self, texto: str) -> dict[str, float]:
+        ngramas = _ngramas(texto)
+        cantidad = sum(ngramas.values()) or 1
+        puntajes = {}
+        for clase in self.clases:
+            logs, desconocido = self._log_ngrama[clase], self._log_desconocido[clase]
+            verosimilitud = sum(f * logs.get(g, desconocido) for g, f in ngramas.items())
+            puntajes[clase] = (self._log_prior[clase] + verosimilitud / cantidad) / self.temperatura
+        maximo = max(puntajes.values())
+        exp = {clase: math.exp(p - maximo) for clase, p in puntajes.items()}
+        suma = sum(exp.values())
+        return {clase: v / suma for clase, v in exp.items()}
+
+
+_clasificador = None
+_lock_clasificador = threading.Lock()
+
+
+def _obtener_clasificador() -> ClasificadorNgramas:
+    global _clasificador
+    with _lock_clasificador:
+        if _clasificador is None:
+            _clasificador = ClasificadorNgramas().entrenar(EJEMPLOS)
+    return _clasificador
+
+
+def clasificar(texto: str, umbral: float | None = None) -> Intencion:
+    """
+    Intención del mensaje con su confianza; 'charla' con via='ambigua' si nada es seguro.
+    Saludo y tema ajeno (respuestas sin modelo) solo salen del patrón, nunca del clasificador,
+    y un pedido de traducción nunca es tema ajeno.
+    """
+    plegado = _plegar(texto)
+    encontradas = {m.lastgroup for m in _PATRON.finditer(plegado)}
+    if FUERA_DE_TEMA in encontradas and _PATRON_TRADUCCION.search(plegado):
+        encontradas.discard(FUERA_DE_TEMA)
+    for nombre in _PRIORIDAD:
+        if nombre in encontradas:
+            return Intencion(nombre, 1.0, "patron")
+
+    probabilidades = _obtener_clasificador().probabilidades(normalizar(texto))
+    nombre, confianza = max(probabilidades.items(), key=lambda x: x[1])
+    if nombre in _DECIDE_EL_CLASIFICADOR and confianza >= (UMBRAL_INTENCION if umbral is None else umbral):
+        return Intencion(nombre, confianza, "clasificador")
+    return Intencion(CHARLA, confianza, "ambigua")
+
+
+def palabras_consultadas(texto: str) -> list[str]:
+    """
+    'qué significa glimpa, zorplin y florblin' -> ['glimpa', 'zorplin', 'florblin'];
+    'what does awkward mean' -> ['awkward']. Conserva los acentos de lo consultado.
+    Lista vacía si no queda ninguna palabra ('what does it mean' se refiere a lo anterior).
+    """
+    original = texto.lower().strip()
+    partes, ultimo = [], 0
+    for m in _PATRON_RELLENO.finditer(_plegar(original)):
+        partes += [original[ultimo:m.start()], " "]
+        ultimo = m.end()
+    limpio = "".join(partes) + original[ultimo:]
+
+    palabras = []
+    for segmento in _SEPARADORES.split(limpio):
+        encontradas = re.findall(r"[^\W\d_][\w'-]*", segmento)
+        if encontradas and encontradas[-1] not in palabras:
+            palabras.append(encontradas[-1].strip("'-"))
+    return palabras
@@ -0,0 +1,61 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class PoolTutores:
+    """
+    Un Tutor por sesión (thread_id), guardados en un LRU acotado.
+    Las sesiones inactivas se desalojan; si el estudiante vuelve, su Tutor se
+    reconstruye a partir de los mensajes guardados en el checkpointer.
+    """
+
+    def __init__(self, fabrica, checkpointer=None, max_sesiones: int = 500, max_inactividad: float = 1800.0):
+        self.fabrica = fabrica  # callable sin argumentos que devuelve un Tutor nuevo
+        self.checkpointer = checkpointer
+        self.max_sesiones = max_sesiones
+        self.max_inactividad = max_inactividad
+        self._sesiones: OrderedDict[str, tuple[object, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sesiones)
+
+    def _mensajes_guardados(self, thread_id: str) -> list:
+        if self.checkpointer is None:
+            return []
+        guardado = self.checkpointer.get_tuple({"configurable": {"thread_id": thread_id}})
+        if guardado is None:
+            return []
+        return list(guardado.checkpoint.get("channel_values", {}).get("messages", []))
+
+    def obtener(self, thread_id: str):
+        """Devuelve el Tutor de la sesión (creándolo o rehidratándolo si hace falta)."""
+        with self._lock:
+            if thread_id in self._sesiones:
+                tutor, _ = self._sesiones.pop(thread_id)
+                self._sesiones[thread_id] = (tutor, time.monotonic())
+                return tutor
+
+        # fuera del lock: leer el checkpointer puede tardar
+        tutor = self.fabrica()
+        mensajes = self._mensajes_guardados(thread_id)
+        if mensajes:
+            tutor.rehidratar(mensajes)
+
+        with self._lock:
+            if thread_id in self._sesiones:  # otro hilo la creó mientras tanto
+                return self._sesiones[thread_id][0]
+            self._sesiones[thread_id] = (tutor, time.monotonic())
+            while len(self._sesiones) > self.max_sesiones:
+                self._sesiones.popitem(last=False)
+        return tutor
+
+    def evictar_inactivos(self) -> int:
+        """Desaloja las sesiones sin actividad hace más de max_inactividad segundos."""
+        limite = time.monotonic() - self.max_inactividad
+        with self._lock:
+            inactivas = [tid for tid, (_, ultimo_uso) in self._sesiones.items() if ultimo_uso < limite]
+            for tid in inactivas:
+                del self._sesiones[tid]
+        return len(inactivas)
@@ -1,11 +1,41 @@
-from asistente_idiomas.tools.notion_tool import guardar_en_notion
+from asistente_idiomas.tools.notion_tool import guardar_en_notion, buscar_registro
+from asistente_idiomas.utils.metricas import span, evento
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 from datetime import datetime
 
 class Registrador:
     """Agente responsable de registrar en Notion los aprendizajes o resultados."""
 
+    def __init__(self, outbox=None):
+        # Con outbox, registrar() solo encola y vuelve al instante; el envío lo hace el worker.
+        self.outbox = outbox
+        # Registros desprendidos del turno: un solo hilo, así se aplican en el orden en que llegaron
+        self._ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="registro")
+
+    def registrar_en_segundo_plano(self, datos):
+        """Como registrar(), pero vuelve al instante: la respuesta al usuario no espera a Notion."""
+        return self._ejecutor.submit(self._registrar_medido, datos)
+
+    def _registrar_medido(self, datos):
+        # span propio: el del nodo mide solo el encolado, este la escritura fuera del turno
+        with span("notion_registro"):
+            resultado = self.registrar(datos)
+        evento("registrador.resultado", resultado=resultado)
+        return resultado
+
+    def esperar(self, timeout: float | None = None) -> bool:
+        """Espera a que terminen los registros en segundo plano (al cerrar); False si venció el timeout."""
+        try:
+            self._ejecutor.submit(lambda: None).result(timeout=timeout)
+            return True
+        except TimeoutError:
+            return False
+
     def registrar(self, datos):
-        """Guarda los datos en Notion y devuelve el resultado."""
+        """Guarda los datos en Notion (o los encola) y devuelve el resultado."""
+        # Varias palabras explicadas juntas -> un registro por cada una
+        if isinstance(datos, list):
+            return "\n".join(self.registrar(d) for d in datos)
         try:
             if not isinstance(datos, dict):
                 return "⚠️ Formato inválido: se esperaba un diccionario con los campos de Notion."
@@ -18,6 +48,28 @@ class Registrador:
             #  Sobrescribimos siempre con la fecha actual
             fecha = datetime.now().date().isoformat()
 
+            # Índice local O(1): si ya existe la página, se actualiza en vez de duplicarla
+            page_id = buscar_registro(palabra, idioma)
+
+            if self.outbox is not None:
+                _, resultado = self.outbox.encolar({
+                    "palabra": palabra,
+                    "traduccion": traduccion,
+                    "ejemplo": ejemplo,
+                    "idioma": idioma,
+                    "fecha": fecha,
+                    "page_id": page_id,
+                })
+                if resultado == "en_cola":
+                    return f"ℹ️ '{palabra}' ya estaba en la cola de Notion para hoy."
+                if resultado == "enviado":
+                    return f"ℹ️ '{palabra}' ya estaba guardada en Notion con estos datos."
+                if resultado == "actualizado":
+                    return f"📝 Registro de '{palabra}' corregido; se enviará de nuevo a Notion."
+                if page_id:
+                    return f"ℹ️ '{palabra}' ya estaba guardada en Notion; se actualizará la entrada existente."
+                return f"📝 Registro de '{palabra}' en cola para Notion."
+
             resultado = guardar_en_notion(palabra, traduccion, ejemplo, idioma, fecha)
             return f"✅ Registro guardado en Notion correctamente: {resultado}"
         except Exception as e:
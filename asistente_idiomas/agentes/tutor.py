@@ -1,10 +1,110 @@
 import os
 import json
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from langchain.schema import SystemMessage, HumanMessage, AIMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-from asistente_idiomas.tools.rag_idioma import buscar_vocabulario
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from pydantic import BaseModel, Field
+from asistente_idiomas.tools.rag_idioma import buscar_lexico, buscar_vectorial, sin_candidatos_lexicos, off_topic_tool
+from asistente_idiomas.agentes.contexto import GestorContexto
+from asistente_idiomas.agentes import intenciones
+from asistente_idiomas.tools.glosario import normalizar
+from asistente_idiomas.tools.chunker import IDIOMAS, NOMBRES_IDIOMA
+from asistente_idiomas.tools.cache_respuestas import clave_respuesta
+from asistente_idiomas.tools.notion_tool import buscar_registro
+from asistente_idiomas.utils.metricas import contar, evento
+
+# Cambiar al modificar los prompts de definición: invalida las respuestas cacheadas
+VERSION_PROMPT_DEFINICION = "definicion-v2"
+
+# Separa, en la respuesta de una definición, el texto para el estudiante de los datos para Notion
+MARCA_DATOS = "<<<DATOS>>>"
+
+# Definiciones de respaldo pedidas por adelantado mientras corre la búsqueda vectorial (compartido entre sesiones)
+_especulador = ThreadPoolExecutor(max_workers=8, thread_name_prefix="especulacion")
+
+# nombres de idiomas (ver tools/chunker.py) y verbos que indican que el estudiante elige uno
+_PATRON_IDIOMA = re.compile(r"\b(" + "|".join(n for nombres in IDIOMAS.values() for n in nombres) + r")\b")
+_PATRON_PRACTICAR = re.compile(
+    r"\b(practicar|aprender|estudiar|repasar|cambiar|practice|learn|study|switch|pratiquer|apprendre|etudier)\b"
+)
+
+
+def confirmar_registro(entradas: list[dict]) -> str:
+    """Mensaje para el estudiante: distingue las palabras nuevas de las que ya estaban guardadas en Notion."""
+    nuevas = [e.get("palabra", "") for e in entradas if not buscar_registro(e.get("palabra", ""), e.get("idioma", ""))]
+    guardadas = [e.get("palabra", "") for e in entradas if e.get("palabra", "") not in nuevas]
+    lineas = []
+    if nuevas:
+        lineas.append(f"✅ La palabra **{', '.join(nuevas)}** fue registrada correctamente en Notion.")
+    if guardadas:
+        lineas.append(f"ℹ️ **{', '.join(guardadas)}** ya estaba guardada en Notion; se actualizó la entrada existente.")
+    return "\n".join(lineas)
+
+
+def detectar_idioma_objetivo(texto: str) -> str | None:
+    """
+    'quiero practicar francés' -> 'fr'; 'inglés, por favor' -> 'en'.
+    None si el mensaje no elige idioma ('qué significa hello en inglés' no cambia nada).
+    """
+    normal = normalizar(texto)
+    nombres = _PATRON_IDIOMA.findall(normal)
+    if not nombres or not (_PATRON_PRACTICAR.search(normal) or len(normal.split()) <= 3):
+        return None
+    return next(codigo for codigo, variantes in IDIOMAS.items() if nombres[-1] in variantes)
+
+
+# 📐 Datos de cada palabra explicada, listos para Notion (van al final de la misma respuesta)
+class EntradaVocabulario(BaseModel):
+    palabra: str = Field(description="Palabra o expresión explicada, tal como se escribe en su idioma.")
+    traduccion: str = Field(description="Traducción al español.")
+    ejemplo: str = Field(description="Una oración de ejemplo de uso en su idioma original.")
+    idioma: str = Field(description="Idioma de la palabra, en español (por ejemplo: 'inglés').")
+
+
+def _con_datos(prompt: str) -> str:
+    """Pide, en la misma respuesta y después de MARCA_DATOS, los campos de cada palabra en JSON."""
+    return (
+        f"{prompt}\n\n"
+        f"Al terminar la explicación, escribe una línea que diga exactamente {MARCA_DATOS} y debajo "
+        "SOLO un JSON: una lista con un objeto por palabra explicada, con las claves "
+        '"palabra", "traduccion" (al español), "ejemplo" (en su idioma original) e "idioma" (en español). '
+        "No escribas nada después del JSON."
+    )
+
+
+def _parsear_entradas(datos: str) -> list[dict]:
+    """Entradas válidas del bloque JSON que sigue a MARCA_DATOS ([] si falta o está mal formado)."""
+    datos = re.sub(r"```(?:json)?", "", datos).strip()
+    if not datos:
+        return []
+    try:
+        crudas = json.loads(datos)
+        if isinstance(crudas, dict):
+            crudas = [crudas]
+        return [EntradaVocabulario(**cruda).model_dump() for cruda in crudas]
+    except Exception as e:
+        evento("definicion.datos_invalidos", nivel="error", datos=datos[:500], error=str(e))
+        return []
+
+
+def _largo_prefijo_marca(texto: str) -> int:
+    """Cuántos caracteres del final de `texto` podrían ser el comienzo de MARCA_DATOS."""
+    for n in range(min(len(texto), len(MARCA_DATOS) - 1), 0, -1):
+        if MARCA_DATOS.startswith(texto[-n:]):
+            return n
+    return 0
+
+
+def consumir_stream(generador, al_recibir=None):
+    """Recorre un generador de Tutor.responder_stream y devuelve su resultado final."""
+    while True:
+        try:
+            fragmento = next(generador)
+        except StopIteration as fin:
+            return fin.value
+        if al_recibir is not None:
+            al_recibir(fragmento)
 
 
 class Tutor:
@@ -13,11 +113,14 @@ class Tutor:
     Mantiene un saludo inicial solo la primera vez y gestiona el historial.
     """
 
-    def __init__(self, llm):
-        self.llm = llm
+    def __init__(self, llm, max_tokens_contexto: int | None = None, cache_respuestas=None):
+        self.llm = llm  # un chat model o un Despachador (tools/despachador_llm.py) con un modelo por tarea
+        self.cache_respuestas = cache_respuestas  # CacheRespuestas compartida (opcional)
         self.saludado = False
-        self.historial_mensajes = []
         self.ultima_palabra = None  # 🧩 para evitar errores entre modos
+        self.ultimas_entradas = []  # datos estructurados de la última explicación (para registrar sin LLM)
+        self.idioma_activo = None  # código del idioma que se practica: limita las búsquedas del RAG
+        self._especulacion = None  # (termino, Future) de la definición de respaldo adelantada
 
         self.system_prompt = SystemMessage(
             content=(
@@ -26,29 +129,238 @@ class Tutor:
                 "Responde en ese idioma y siempre incluye la traducción al español entre paréntesis."
             )
         )
-        self.historial_mensajes.append(self.system_prompt)
+        # Contexto acotado: ventana de turnos recientes + resumen de lo anterior
+        self.contexto = GestorContexto(
+            self._llm_para("resumen"),
+            self.system_prompt,
+            max_tokens=max_tokens_contexto or int(os.getenv("TUTOR_MAX_TOKENS_CONTEXTO", "3000")),
+        )
+
+    def _llm_para(self, tarea: str):
+        """El modelo que atiende la tarea ('conversacion', 'definicion', 'fallback', 'registro', 'resumen')."""
+        return self.llm.para(tarea) if hasattr(self.llm, "para") else self.llm
+
+    @property
+    def historial_mensajes(self) -> list:
+        """Mensajes que se envían al modelo (system prompt, resumen y ventana reciente)."""
+        return self.contexto.mensajes()
+
+    def rehidratar(self, mensajes: list):
+        """Reconstruye el estado de una sesión previa a partir de sus mensajes guardados."""
+        for mensaje in mensajes:
+            if isinstance(mensaje, (HumanMessage, AIMessage)):
+                self.contexto.agregar(mensaje)
+                self.contexto.esperar()  # sin turno en curso: mejor llegar con la ventana ya acotada
+            if isinstance(mensaje, HumanMessage):
+                self.idioma_activo = detectar_idioma_objetivo(mensaje.content) or self.idioma_activo
+        self.saludado = bool(mensajes)
+
+    def _actualizar_idioma(self, pregunta: str):
+        idioma = detectar_idioma_objetivo(pregunta)
+        if idioma and idioma != self.idioma_activo:
+            self.idioma_activo = idioma
+            print(f"🌍 Idioma activo: {NOMBRES_IDIOMA[idioma]} (el RAG busca primero en ese idioma)")
+
+    # 🧠 Funciones auxiliares para extraer la(s) palabra(s) consultada(s)
+    def _extraer_palabras(self, texto: str) -> list[str]:
+        """
+        Extrae las palabras clave de una pregunta del tipo:
+        'qué significa glimpa, zorplin y florblin' -> ['glimpa', 'zorplin', 'florblin']
+        """
+        return intenciones.palabras_consultadas(texto)
 
-    # 🧠 Función auxiliar para extraer la palabra consultada
     def _extraer_palabra(self, texto: str) -> str:
         """
         Extrae la palabra clave de una pregunta del tipo:
         'qué significa la palabra zorplin' -> 'zorplin'
         """
-        texto = texto.lower().strip()
-        texto = re.sub(
-            r"(qué\s+significa|qué\s+quiere\s+decir|definición\s+de|significado\s+de|qué\s+es|explica\s+la\s+palabra|explícame\s+la\s+palabra|dime\s+qué\s+significa)",
-            "",
-            texto,
+        palabras = self._extraer_palabras(texto)
+        return palabras[-1] if palabras else ""
+
+    def _stream_llm(self, mensajes, tarea: str = "conversacion"):
+        """Reenvía los tokens del modelo a medida que llegan y devuelve el texto completo."""
+        partes = []
+        for chunk in self._llm_para(tarea).stream(mensajes):
+            texto = chunk.content if hasattr(chunk, "content") else str(chunk)
+            if texto:
+                partes.append(texto)
+                yield texto
+        return "".join(partes)
+
+    def _nombre_modelo(self, tarea: str = "definicion") -> str:
+        llm = self._llm_para(tarea)
+        return getattr(llm, "model", None) or getattr(llm, "model_name", None) or type(llm).__name__
+
+    def _explicacion_en_vivo(self, prompt: str, tarea: str = "definicion"):
+        """
+        Generador: UNA llamada en streaming. Emite el texto de la explicación a medida que llega
+        y retiene lo que sigue a MARCA_DATOS; devuelve {"respuesta", "entradas"}.
+        """
+        partes, emitido, pendiente, en_datos = [], [], "", False
+        for texto in self._stream_llm([HumanMessage(content=_con_datos(prompt))], tarea):
+            partes.append(texto)
+            if en_datos:
+                continue
+            pendiente += texto
+            indice = pendiente.find(MARCA_DATOS)
+            if indice >= 0:
+                listo, pendiente, en_datos = pendiente[:indice], "", True
+            else:
+                # lo que podría ser el comienzo de la marca espera al próximo fragmento
+                corte = len(pendiente) - _largo_prefijo_marca(pendiente)
+                listo, pendiente = pendiente[:corte], pendiente[corte:]
+            if listo:
+                emitido.append(listo)
+                yield listo
+        if pendiente:
+            emitido.append(pendiente)
+            yield pendiente
+        _, _, datos = "".join(partes).partition(MARCA_DATOS)
+        return {"respuesta": "".join(emitido).strip(), "entradas": _parsear_entradas(datos)}
+
+    def _clave_cache(self, termino: str | None, contexto_rag: str, tarea: str) -> str | None:
+        if self.cache_respuestas is None or not termino:
+            return None
+        return clave_respuesta(termino, contexto_rag, VERSION_PROMPT_DEFINICION, self._nombre_modelo(tarea))
+
+    def _obtener_explicacion(self, prompt: str, termino: str | None, contexto_rag: str, tarea: str) -> dict | None:
+        """Con caché de respuestas, la misma consulta sobre el mismo contexto no vuelve al modelo."""
+        calcular = lambda: consumir_stream(self._explicacion_en_vivo(prompt, tarea))
+        clave = self._clave_cache(termino, contexto_rag, tarea)
+        if clave is None:
+            return calcular()
+        explicacion, en_cache = self.cache_respuestas.obtener_o_calcular(clave, calcular)
+        contar("cache_respuestas", resultado="hit" if en_cache else "miss")
+        if en_cache:
+            print(f"⚡ Respuesta de caché para: {termino}")
+        return explicacion
+
+    def _explicar(self, prompt: str, termino: str | None = None, contexto_rag: str = "", tarea: str = "definicion",
+                  adelantada=None):
+        """
+        Explica una o varias palabras en UNA llamada: el texto se transmite token a token y los
+        campos de cada palabra (palabra, traducción, ejemplo, idioma) llegan al final de la misma
+        respuesta. Quedan en la sesión, para que un "guárdala" posterior no necesite otra llamada,
+        y en la caché junto al texto. Si la explicación ya estaba en caché, o `adelantada` (un
+        Future con ella, pedido en segundo plano) la trae, se emite entera sin llamar al modelo.
+        """
+        clave = self._clave_cache(termino, contexto_rag, tarea)
+        explicacion, completa = None, False
+        if adelantada is not None:
+            try:
+                explicacion, completa = adelantada.result(), True
+            except Exception as e:
+                print(f"⚠️ La definición adelantada falló ({e}); se pide de nuevo.")
+
+        if explicacion is None:
+            en_vivo = lambda: self._explicacion_en_vivo(prompt, tarea)
+            if clave is None:
+                explicacion = yield from en_vivo()
+            else:
+                # single-flight también en streaming: el líder transmite, los demás esperan su resultado
+                explicacion, completa = yield from self.cache_respuestas.obtener_o_generar(clave, en_vivo)
+                contar("cache_respuestas", resultado="hit" if completa else "miss")
+                if completa:
+                    print(f"⚡ Respuesta de caché para: {termino}")
+
+        self.ultimas_entradas = [dict(entrada) for entrada in explicacion["entradas"]]
+        if completa:
+            yield explicacion["respuesta"]
+        return explicacion["respuesta"]
+
+    # 🔍 Consultas de vocabulario (las usa responder_stream y, por partes, los nodos del grafo)
+    def preparar_consulta(self, pregunta: str) -> dict | None:
+        """
+        Palabras consultadas, clave de caché e idioma de la búsqueda (todo serializable).
+        None si la pregunta no nombra ninguna palabra ('what does it mean'): la responde el modelo con el contexto.
+        """
+        palabras = self._extraer_palabras(pregunta)
+        if not palabras:
+            return None
+        termino = "|".join(normalizar(p) for p in palabras)
+        if self.idioma_activo:
+            termino = f"{self.idioma_activo}:{termino}"  # otro idioma, otra respuesta cacheada
+        texto = ", ".join(palabras)
+        self.ultima_palabra = texto  # se conserva para registro inmediato
+        return {"palabras": palabras, "texto": texto, "termino": termino, "idioma": self.idioma_activo}
+
+    def _prompt_fallback(self, consulta: dict) -> str:
+        return (
+            f"Define y traduce al español la palabra o expresión '{consulta['texto']}'. "
+            f"Explica brevemente su significado y da un ejemplo de uso en "
+            f"{NOMBRES_IDIOMA.get(consulta['idioma'], 'inglés')}."
         )
-        texto = re.sub(r"\b(la|el|una|un|palabra|de|del|es)\b", "", texto)
-        match = re.findall(r"[a-záéíóúüñ'-]+", texto)
-        return match[-1] if match else texto
 
-    # 👇 FUNCIÓN PRINCIPAL
+    def especular_fallback(self, consulta: dict):
+        """
+        Si ninguna palabra tiene siquiera un candidato en BM25, lo más probable es que los vectores
+        tampoco la encuentren: la definición sin contexto se pide ya, en paralelo con la búsqueda
+        vectorial. Si hay candidatos, se espera a los vectores (una llamada de más por nada).
+        """
+        if not sin_candidatos_lexicos(consulta["palabras"]):
+            contar("fallback_adelantado", resultado="omitido")
+            return
+        futuro = _especulador.submit(
+            self._obtener_explicacion, self._prompt_fallback(consulta), consulta["termino"], "", "fallback"
+        )
+        self._especulacion = (consulta["termino"], futuro)
+
+    def responder_consulta(self, consulta: dict, resultados: dict[str, list[str]]):
+        """Generador: responde la consulta con lo recuperado (o con la definición de respaldo)."""
+        termino, palabra_consulta = consulta["termino"], consulta["texto"]
+        adelantado, adelantada = self._especulacion or (None, None)
+        self._especulacion = None
+        if adelantado != termino:
+            adelantada = None
+        encontrados = {p: r for p, r in resultados.items() if r}
+
+        if not encontrados:
+            print(f"⚠️ '{palabra_consulta}' no encontrada en el RAG. Consultando directamente al modelo Gemini...")
+            if adelantada is not None:
+                contar("fallback_adelantado", resultado="usado")
+            respuesta_final = yield from self._explicar(
+                self._prompt_fallback(consulta), termino, tarea="fallback", adelantada=adelantada
+            )
+            return {"respuesta": respuesta_final, "texto_para_guardar": f"{palabra_consulta}: {respuesta_final}"}
+        if adelantada is not None:
+            # los vectores sí encontraron algo: la respuesta adelantada queda en la caché, sin usar
+            contar("fallback_adelantado", resultado="descartado")
+
+        # todas las palabras se responden en una sola llamada al modelo
+        contexto_rag = "\n\n".join(
+            f"### {p}\n" + "\n\n".join(r) for p, r in encontrados.items()
+        )
+        faltantes = [p for p in consulta["palabras"] if p not in encontrados]
+        prompt = (
+            f"El usuario preguntó por: '{palabra_consulta}'. "
+            f"Usa la siguiente información del RAG para responder:\n\n"
+            f"{contexto_rag}\n\n"
+        )
+        if faltantes:
+            prompt += (
+                f"No hay información en el RAG para: {', '.join(faltantes)}; "
+                f"defínelas con tu propio conocimiento.\n\n"
+            )
+        prompt += "Para cada palabra, explica su significado de forma breve, tradúcela al español, y da un ejemplo de uso."
+
+        respuesta_final = yield from self._explicar(prompt, termino, contexto_rag)
+        return {"respuesta": respuesta_final, "texto_para_guardar": f"{palabra_consulta}: {respuesta_final}"}
+
     def responder(self, pregunta: str) -> dict:
-        keywords_registrar = ["registra", "guarda", "anota", "apunta"]
+        """Versión bloqueante: consume el stream y devuelve solo el resultado final."""
+        return consumir_stream(self.responder_stream(pregunta))
+
+    # 👇 FUNCIÓN PRINCIPAL
+    def responder_stream(self, pregunta: str, diferir_consulta: bool = False):
+        """
+        Generador: emite la respuesta por fragmentos (tokens del modelo) y, al terminar,
+        devuelve el dict {"respuesta", "texto_para_guardar"} como valor de retorno.
+        Con `diferir_consulta`, una consulta de vocabulario no se responde aquí: se devuelve
+        {"consulta": ...} y la búsqueda y la definición quedan a cargo del grafo.
+        """
         texto_para_guardar = None
         respuesta_final = ""
+        self._actualizar_idioma(pregunta)
 
         # --- 1️⃣ Primer saludo ---
         if not self.saludado:
@@ -61,61 +373,52 @@ class Tutor:
                 "(por ejemplo: inglés, francés o español)\n"
             )
             self.saludado = True
+            yield respuesta_final
             return {"respuesta": respuesta_final, "texto_para_guardar": None}
 
-        # --- 2️⃣ Guardamos el mensaje ---
-        self.historial_mensajes.append(HumanMessage(content=pregunta))
-
-        # --- 2.5️⃣ Detección de consultas tipo "qué significa..." ---
-        patrones_significado = [
-            r"qu[eé]\s+significa",
-            r"definici[oó]n\s+de",
-            r"significado\s+de",
-            r"qu[eé]\s+quiere\s+decir",
-            r"qu[eé]\s+es\s+",
-            r"explica\s+la\s+palabra",
-            r"expl[ií]came\s+la\s+palabra",
-            r"dime\s+qu[eé]\s+significa",
-        ]
-
-        if any(re.search(p, pregunta.lower()) for p in patrones_significado):
-            palabra_consulta = self._extraer_palabra(pregunta)
-            self.ultima_palabra = palabra_consulta
-
-            print(f"🔍 Buscando en RAG: {palabra_consulta}")
-            resultados_rag = buscar_vocabulario(palabra_consulta)
-
-            if not resultados_rag:
-                print(f"⚠️ '{palabra_consulta}' no encontrada en el RAG. Consultando directamente al modelo Gemini...")
-                prompt_fallback = (
-                    f"Define y traduce al español la palabra o expresión '{palabra_consulta}'. "
-                    f"Explica brevemente su significado y da un ejemplo de uso en inglés."
-                )
-                respuesta_llm = self.llm.invoke([HumanMessage(content=prompt_fallback)])
-                respuesta_final = respuesta_llm.content
-
-                texto_para_guardar = f"{palabra_consulta}: {respuesta_final}"
-                self.ultima_palabra = palabra_consulta
-                return {"respuesta": respuesta_final, "texto_para_guardar": texto_para_guardar}
-
-            contexto_rag = "\n\n".join(resultados_rag)
-            prompt = (
-                f"El usuario preguntó por la palabra '{palabra_consulta}'. "
-                f"Usa la siguiente información del RAG para responder:\n\n"
-                f"{contexto_rag}\n\n"
-                f"Explica su significado de forma breve, tradúcela al español, y da un ejemplo de uso."
-            )
+        # --- 2️⃣ Intención del mensaje (local, sin llamar al modelo) ---
+        intencion = intenciones.clasificar(pregunta)
+        contar("intencion", intencion=intencion.nombre, via=intencion.via)
+        evento("tutor.intencion", intencion=intencion.nombre, via=intencion.via, confianza=round(intencion.confianza, 3))
 
-            respuesta_llm = self.llm.invoke([HumanMessage(content=prompt)])
-            respuesta_final = respuesta_llm.content
-            texto_para_guardar = f"{palabra_consulta}: {respuesta_final}"
+        # saludos repetidos y temas ajenos se contestan sin modelo y sin ensuciar el contexto
+        if intencion.nombre == intenciones.SALUDO:
+            respuesta_final = "¡Hola de nuevo! 😊 ¿Qué palabra o frase quieres practicar ahora?"
+            yield respuesta_final
+            return {"respuesta": respuesta_final, "texto_para_guardar": None}
+        if intencion.nombre == intenciones.FUERA_DE_TEMA:
+            respuesta_final = off_topic_tool()
+            yield respuesta_final
+            return {"respuesta": respuesta_final, "texto_para_guardar": None}
 
-            # 🧹 Limpieza de contexto del RAG tras responder
-            self.ultima_palabra = palabra_consulta  # se conserva para registro inmediato
-            return {"respuesta": respuesta_final, "texto_para_guardar": texto_para_guardar}
+        # --- 2.1️⃣ Guardamos el mensaje ---
+        self.contexto.agregar(HumanMessage(content=pregunta))
+
+        # --- 2.5️⃣ Consultas tipo "qué significa..." ---
+        consulta = self.preparar_consulta(pregunta) if intencion.nombre == intenciones.CONSULTA else None
+        if consulta is not None:
+            print(f"🔍 Buscando en RAG: {consulta['texto']}")
+            if diferir_consulta:
+                return {"respuesta": None, "texto_para_guardar": None, "consulta": consulta}
+
+            encontrados = buscar_lexico(consulta["palabras"], idioma=consulta["idioma"])
+            if not encontrados:
+                self.especular_fallback(consulta)
+            faltantes = [p for p in consulta["palabras"] if p not in encontrados]
+            resultados = {**buscar_vectorial(faltantes, idioma=consulta["idioma"]), **encontrados}
+            return (yield from self.responder_consulta(consulta, resultados))
 
         # --- 3️⃣ Registro en Notion ---
-        if any(keyword in pregunta.lower() for keyword in keywords_registrar):
+        if intencion.nombre == intenciones.REGISTRO:
+            # 💾 Los datos ya se capturaron al explicar: se registran sin volver a llamar al modelo
+            if self.ultimas_entradas:
+                datos = self.ultimas_entradas if len(self.ultimas_entradas) > 1 else self.ultimas_entradas[0]
+                respuesta_final = confirmar_registro(self.ultimas_entradas)
+                self.ultimas_entradas = []
+                self.ultima_palabra = None
+                yield respuesta_final
+                return {"respuesta": respuesta_final, "texto_para_guardar": datos}
+
             contexto = (
                 f"La última palabra explicada fue '{self.ultima_palabra}'." 
                 if self.ultima_palabra else "No hay palabra previa registrada."
@@ -144,38 +447,34 @@ class Tutor:
                 ),
             ]
 
-            resultado = self.llm.invoke(prompt_extraccion)
+            resultado = self._llm_para("registro").invoke(prompt_extraccion)
 
             try:
                 contenido = resultado.content if hasattr(resultado, "content") else str(resultado)
-                print("\nDEBUG respuesta cruda del modelo:\n", contenido)
+                evento("registro.respuesta_cruda", contenido=contenido)
                 contenido_limpio = re.sub(r"```json|```", "", contenido, flags=re.DOTALL).strip()
                 datos = json.loads(contenido_limpio)
-                print("✅ DEBUG JSON decodificado correctamente:", datos)
+                evento("registro.json_decodificado", datos=datos)
             except Exception as e:
                 print("⚠️ No se pudo convertir la respuesta a JSON.")
-                print("🧾 Respuesta recibida del modelo:", resultado)
-                print("⚠️ Error JSON:", e)
+                evento("registro.json_invalido", nivel="error", respuesta=str(resultado), error=str(e))
                 datos = None
 
             texto_para_guardar = datos
            # 💾 Confirmación directa de registro sin invocar nuevamente al modelo
-            if datos:
-                respuesta_final = f"✅ La palabra **{datos.get('palabra', '')}** fue registrada correctamente en Notion."
+            if isinstance(datos, dict):
+                respuesta_final = confirmar_registro([datos])
             else:
                 respuesta_final = "⚠️ No se pudo registrar la palabra. Verifica que se haya reconocido correctamente."
 
             # 🧹 Limpieza tras registrar en Notion
             self.ultima_palabra = None
+            yield respuesta_final
             return {"respuesta": respuesta_final, "texto_para_guardar": texto_para_guardar}
 
         # --- 9️⃣ Conversación normal ---
-        resultado_generico = self.llm.invoke(self.historial_mensajes)
-        respuesta_final = (
-            resultado_generico.content.strip()
-            if hasattr(resultado_generico, "content")
-            else str(resultado_generico).strip()
-        )
-        self.historial_mensajes.append(AIMessage(content=respuesta_final))
+        resultado_generico = yield from self._stream_llm(self.historial_mensajes)
+        respuesta_final = resultado_generico.strip()
+        self.contexto.agregar(AIMessage(content=respuesta_final))
 
         return {"respuesta": respuesta_final, "texto_para_guardar": None}
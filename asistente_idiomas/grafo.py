@@ -0,0 +1,213 @@
+# asistente_idiomas/grafo.py
+"""
+Grafo de LangGraph del asistente: estado compartido, nodos Tutor y Registrador.
+Vive aparte de main.py para que el arranque no tenga que importar LangGraph
+antes de mostrar el prompt (main lo construye en segundo plano).
+
+Una consulta de vocabulario se abre en dos ramas paralelas (léxica y vectorial) que
+se juntan en 'definir'; el registro en Notion se desprende del turno y corre en
+segundo plano, así que el camino crítico es la llamada remota más lenta, no la suma.
+"""
+
+from typing import Sequence, Annotated, TypedDict, Literal
+from langchain_core.messages import BaseMessage, AIMessage, RemoveMessage
+from langchain_core.tools import tool
+from langgraph.graph import StateGraph, END
+from langgraph.config import get_stream_writer
+from langgraph.graph.message import add_messages
+
+# Agentes
+from asistente_idiomas.agentes.tutor import Tutor, consumir_stream
+from asistente_idiomas.agentes.registrador import Registrador
+
+# Herramientas
+from asistente_idiomas.tools.rag_idioma import buscar_vocabulario, buscar_lexico, buscar_vectorial, en_glosario
+from asistente_idiomas.tools.notion_tool import guardar_en_notion
+from asistente_idiomas.tools.rag_idioma import off_topic_tool
+
+# Instrumentación
+from asistente_idiomas.utils.metricas import span
+
+# El Tutor lleva su propio contexto (con resumen); el estado del grafo solo guarda los últimos mensajes
+MAX_MENSAJES_ESTADO = 20
+
+
+# --- Definición de herramientas ---
+@tool
+def herramienta_buscar_vocabulario(palabra: str):
+    """Busca definiciones o traducciones de palabras en la base RAG de idiomas."""
+    return buscar_vocabulario(palabra)
+
+@tool
+def herramienta_guardar_en_notion(texto_a_guardar: str):
+    """ Guarda una ÚNICA cadena de texto en la base de datos de Notion.
+    Esta herramienta solo acepta un argumento de tipo string llamado 'texto_a_guardar'.
+    Úsala para registrar la palabra y su significado juntos en una sola frase.
+    Por ejemplo: 'yellow: amarillo'.
+    NO intentes pasar argumentos separados para la palabra y el significado.
+    """
+    return guardar_en_notion(texto_a_guardar)
+
+@tool
+def herramienta_off_topic():
+    """Responde cuando el usuario pregunta algo fuera del contexto educativo."""
+    return off_topic_tool()
+
+
+def definir_herramientas():
+    return [
+        herramienta_buscar_vocabulario,
+        herramienta_guardar_en_notion,
+        herramienta_off_topic,
+    ]
+
+# --- Estado compartido ---
+class AgentState(TypedDict):
+    """Estado compartido entre nodos del grafo."""
+    messages: Annotated[Sequence[BaseMessage], add_messages]
+    texto_para_registrar: str | None
+    consulta: dict | None  # consulta de vocabulario en curso (ver Tutor.preparar_consulta)
+    recuperado_lexico: dict | None  # palabra -> textos, de la rama léxica
+    recuperado_vectorial: dict | None  # palabra -> textos, de la rama vectorial
+
+# --- Nodos del grafo ---
+def _cerrar_turno(state: AgentState, respuesta: str, texto_a_guardar) -> dict:
+    """Agrega la respuesta del Tutor al estado, recortado a los últimos MAX_MENSAJES_ESTADO mensajes."""
+    # Recortamos el estado: sin esto cada checkpoint re-serializa toda la conversación
+    mensajes = state["messages"]
+    sobrantes = mensajes[: max(0, len(mensajes) + 1 - MAX_MENSAJES_ESTADO)]
+    return {
+        "messages": [RemoveMessage(id=m.id) for m in sobrantes] + [AIMessage(content=respuesta)],
+        "texto_para_registrar": texto_a_guardar,
+    }
+
+
+def nodo_tutor(state: AgentState, tutor: Tutor):
+    """ El agente Tutor procesa el último mensaje del usuario, genera una respuesta y decide si algo debe ser registrado. """
+    last_user_message = state["messages"][-1].content
+
+    # Los tokens se emiten por el stream "custom" del grafo a medida que llegan;
+    # si el grafo no se ejecuta con stream_mode="custom", el writer no hace nada.
+    escribir = get_stream_writer()
+
+    # El tutor procesa la entrada y devuelve la respuesta y el texto a guardar
+    with span("nodo", nodo="tutor"):
+        resultado_tutor = consumir_stream(
+            tutor.responder_stream(last_user_message, diferir_consulta=True),
+            lambda token: escribir({"token": token}),
+        )
+    if resultado_tutor.get("consulta"):
+        # consulta de vocabulario: la responden las ramas de recuperación y el nodo 'definir'
+        return {"consulta": resultado_tutor["consulta"], "texto_para_registrar": None}
+
+    respuesta_para_usuario = resultado_tutor.get("respuesta", "No pude procesar tu solicitud.")
+    return dict(_cerrar_turno(state, respuesta_para_usuario, resultado_tutor.get("texto_para_guardar")), consulta=None)
+
+
+def nodo_lexico(state: AgentState, tutor: Tutor):
+    """Rama local: glosario y BM25. Si no encuentra nada, quizás adelanta la definición de respaldo."""
+    consulta = state["consulta"]
+    with span("nodo", nodo="lexico"):
+        encontrados = buscar_lexico(consulta["palabras"], idioma=consulta["idioma"])
+        if not encontrados:
+            tutor.especular_fallback(consulta)
+    return {"recuperado_lexico": encontrados}
+
+
+def nodo_vectorial(state: AgentState):
+    """Rama remota: embeddings y búsqueda vectorial, en paralelo con la léxica."""
+    consulta = state["consulta"]
+    with span("nodo", nodo="vectorial"):
+        # lo que el glosario resuelve no se embebe; el atajo de BM25 lo decide la otra rama
+        palabras = [p for p in consulta["palabras"] if not en_glosario(p, consulta["idioma"])]
+        resultados = buscar_vectorial(palabras, idioma=consulta["idioma"])
+    return {"recuperado_vectorial": resultados}
+
+
+def nodo_definir(state: AgentState, tutor: Tutor):
+    """Junta ambas ramas (lo léxico tiene prioridad) y responde la consulta."""
+    resultados = {**(state.get("recuperado_vectorial") or {}), **(state.get("recuperado_lexico") or {})}
+    escribir = get_stream_writer()
+    with span("nodo", nodo="definir"):
+        resultado = consumir_stream(
+            tutor.responder_consulta(state["consulta"], resultados),
+            lambda token: escribir({"token": token}),
+        )
+    return dict(
+        _cerrar_turno(state, resultado["respuesta"], resultado.get("texto_para_guardar")),
+        consulta=None, recuperado_lexico=None, recuperado_vectorial=None,
+    )
+
+
+def nodo_registrador(state: AgentState, registrador: Registrador):
+    """
+    El agente Registrador toma el texto del estado y lo guarda en Notion. Es una rama
+    desprendida: la respuesta ya salió, así que el turno no espera a Notion (ni al outbox).
+    """
+    with span("nodo", nodo="registrador"):
+        datos = state.get("texto_para_registrar")
+        if datos:
+            registrador.registrar_en_segundo_plano(datos)
+
+    # Limpiamos el estado
+    return {"texto_para_registrar": None}
+
+
+def should_register(state: AgentState) -> Literal["registrador", "__end__"]:
+    """Decide si el flujo debe ir al agente Registrador o terminar."""
+    if state.get("texto_para_registrar"):
+        return "registrador"
+    else:
+        return "__end__"
+
+
+def despues_del_tutor(state: AgentState) -> list[str] | Literal["registrador", "__end__"]:
+    """Una consulta de vocabulario se abre en las dos ramas de recuperación, que corren a la vez."""
+    if state.get("consulta"):
+        return ["lexico", "vectorial"]
+    return should_register(state)
+
+
+def _tutor_de_sesion(tutor, config) -> Tutor:
+    """Con un PoolTutores, cada thread_id usa su propio Tutor; con un Tutor suelto, siempre el mismo."""
+    if hasattr(tutor, "obtener"):
+        return tutor.obtener(config["configurable"]["thread_id"])
+    return tutor
+
+
+def construir_grafo(tutor: Tutor, registrador: Registrador):
+    """
+    Construye y compila el grafo con los agentes Tutor y Registrador.
+    `tutor` puede ser un Tutor (una sola conversación) o un PoolTutores (modo servidor).
+    """
+    graph = StateGraph(AgentState)
+    graph.add_node("tutor", lambda state, config: nodo_tutor(state, _tutor_de_sesion(tutor, config)))
+    graph.add_node("lexico", lambda state, config: nodo_lexico(state, _tutor_de_sesion(tutor, config)))
+    graph.add_node("vectorial", nodo_vectorial)
+    graph.add_node("definir", lambda state, config: nodo_definir(state, _tutor_de_sesion(tutor, config)))
+    graph.add_node("registrador", lambda state: nodo_registrador(state, registrador))
+    graph.set_entry_point("tutor")
+
+    graph.add_conditional_edges(
+        "tutor",
+        despues_del_tutor,
+        {
+            "lexico": "lexico",
+            "vectorial": "vectorial",
+            "registrador": "registrador",
+            "__end__": END,
+        },
+    )
+    # 'definir' espera a las dos ramas de recuperación
+    graph.add_edge(["lexico", "vectorial"], "definir")
+    graph.add_conditional_edges(
+        "definir",
+        should_register,
+        {
+            "registrador": "registrador",
+            "__end__": END,
+        },
+    )
+    graph.add_edge("registrador", END)
+
+    return graph
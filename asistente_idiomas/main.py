@@ -1,28 +1,33 @@
 # asistente_idiomas/main.py
 
+import sys
+import time
+from asistente_idiomas.utils.perfil_arranque import PerfilArranque
+
+# El perfil se instala antes que el resto de los imports para poder medirlos
+PERFIL = PerfilArranque() if "--profile-startup" in sys.argv else None
+if PERFIL:
+    PERFIL.instalar()
+
 import os
-from typing import Sequence, Annotated, TypedDict, Literal
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from dotenv import load_dotenv
-from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, AIMessage
-from langchain_core.tools import tool
 os.environ["GRPC_VERBOSITY"] = "NONE"
 os.environ["GRPC_CPP_PLUGIN_LOG_LEVEL"] = "ERROR"
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langgraph.graph import StateGraph, END
-from langgraph.graph.message import add_messages
-from langgraph.prebuilt import ToolNode
-from langgraph.checkpoint.sqlite import SqliteSaver
-from IPython.display import Image
 
-# Agentes
-from asistente_idiomas.agentes.tutor import Tutor
-from asistente_idiomas.agentes.registrador import Registrador
+# Solo lo liviano se importa aquí: LangGraph, Gemini, Chroma y Notion se cargan
+# en segundo plano (o en su primer uso) para que el prompt aparezca enseguida.
+from asistente_idiomas.tools.notion_outbox import NotionOutbox
+from asistente_idiomas.tools.rag_idioma import inicializar_rag, huella_conocimiento, precargar
+from asistente_idiomas.tools.cache_respuestas import CacheRespuestas
+from asistente_idiomas.utils.metricas import LLMInstrumentado, configurar_metricas, volcar_snapshot, REGISTRO
 
-# Herramientas
-from asistente_idiomas.tools.rag_idioma import buscar_vocabulario
-from asistente_idiomas.tools.notion_tool import guardar_en_notion
-from asistente_idiomas.tools.rag_idioma import off_topic_tool
-from asistente_idiomas.tools.rag_idioma import inicializar_rag
+# Cada cuántos turnos se podan los checkpoints viejos y se compacta checkpoints.db
+TURNOS_ENTRE_PODAS = 25
+CHECKPOINTS_A_CONSERVAR = 5
 
 
 # --- Configuración de entorno ---
@@ -33,137 +38,180 @@ def setup_environment():
         raise ValueError("⚠️ Falta la variable GEMINI_API_KEY en tu archivo .env")
     
 
-# --- Definición de herramientas ---
-@tool
-def herramienta_buscar_vocabulario(palabra: str):
-    """Busca definiciones o traducciones de palabras en la base RAG de idiomas."""
-    return buscar_vocabulario(palabra)
-
-@tool
-def herramienta_guardar_en_notion(texto_a_guardar: str):
-    """ Guarda una ÚNICA cadena de texto en la base de datos de Notion.
-    Esta herramienta solo acepta un argumento de tipo string llamado 'texto_a_guardar'.
-    Úsala para registrar la palabra y su significado juntos en una sola frase.
-    Por ejemplo: 'yellow: amarillo'.
-    NO intentes pasar argumentos separados para la palabra y el significado.
+def crear_llm():
     """
-    return guardar_en_notion(texto_a_guardar)
-
-@tool
-def herramienta_off_topic():
-    """Responde cuando el usuario pregunta algo fuera del contexto educativo."""
-    return off_topic_tool()
-
-
-def definir_herramientas():
-    return [
-        herramienta_buscar_vocabulario,
-        herramienta_guardar_en_notion,
-        herramienta_off_topic,
-    ]
-
-# --- Estado compartido ---
-class AgentState(TypedDict):
-    """Estado compartido entre nodos del grafo."""
-    messages: Annotated[Sequence[BaseMessage], add_messages]
-    texto_para_registrar: str | None
-
-# --- Nodos del grafo ---
-def nodo_tutor(state: AgentState, tutor: Tutor):
-    """ El agente Tutor procesa el último mensaje del usuario, genera una respuesta y decide si algo debe ser registrado. """
-    last_user_message = state["messages"][-1].content
-
-    # El tutor procesa la entrada y devuelve la respuesta y el texto a guardar
-    resultado_tutor = tutor.responder(last_user_message)
-    respuesta_para_usuario = resultado_tutor.get("respuesta", "No pude procesar tu solicitud.")
-    texto_a_guardar = resultado_tutor.get("texto_para_guardar")
-
-    # Devolvemos la respuesta del Tutor como un mensaje de la IA y actualizamos el estado
-    return {
-        "messages": [AIMessage(content=respuesta_para_usuario)],
-        "texto_para_registrar": texto_a_guardar,
-    }
-
-
-def nodo_registrador(state: AgentState, registrador: Registrador):
-    """El agente Registrador toma el texto del estado y lo guarda en Notion."""
-    datos = state.get("texto_para_registrar")
-    if datos:
-        resultado = registrador.registrar(datos)
-        
-    # Limpiamos el estado
-    return {"texto_para_registrar": None}
-
-
-def should_register(state: AgentState) -> Literal["registrador", "__end__"]:
-    """Decide si el flujo debe ir al agente Registrador o terminar."""
-    if state.get("texto_para_registrar"):
-        return "registrador"
-    else:
-        return "__end__"
-
-
-def construir_grafo(tutor: Tutor, registrador: Registrador):
-    """Construye y compila el grafo con los agentes Tutor y Registrador."""
-    graph = StateGraph(AgentState)
-    graph.add_node("tutor", lambda state: nodo_tutor(state, tutor))
-    graph.add_node("registrador", lambda state: nodo_registrador(state, registrador))
-    graph.set_entry_point("tutor")
-
-    graph.add_conditional_edges(
-        "tutor",
-        should_register,
-        {
-            "registrador": "registrador",
-            "__end__": END,
-        },
-    )
-    graph.add_edge("registrador", END)
+    Modelos Gemini compartidos por todos los agentes, detrás del despachador: cuota RPM/TPM,
+    concurrencia, reintentos, circuito y un modelo ligero para las tareas baratas.
+    """
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from asistente_idiomas.tools.despachador_llm import crear_despachador
 
-    return graph
+    def _gemini(modelo: str):
+        # cada llamada al modelo queda medida (duración, tokens y errores)
+        return LLMInstrumentado(ChatGoogleGenerativeAI(
+            model=modelo,
+            google_api_key=os.getenv("GEMINI_API_KEY"),
+            temperature=0.4,
+            max_retries=1,  # un solo intento: los reintentos (con backoff y jitter) los hace el despachador
+        ))
+    return crear_despachador(_gemini)
 
 
-# --- Ejecución principal ---
-def main():
-    print("🧩 Iniciando setup...")
-    setup_environment()
+def _cargar_indice_notion():
+    from asistente_idiomas.tools.notion_tool import cargar_registradas
+    try:
+        cargar_registradas()
+    except Exception as e:
+        print(f"⚠️ No se pudo cargar el índice de Notion: {e}")
 
-    # Inicializamos el RAG ANTES de crear los agentes 
-    inicializar_rag()  # esto carga vocabulario.txt, frases.txt y gramatica.txt
 
-    # Configuramos el modelo LLM
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        google_api_key=os.getenv("GEMINI_API_KEY"),
-        temperature=0.4,
-    )
+def _sincronizar_notion() -> str:
+    from asistente_idiomas.tools.sync_notion import sincronizar_notion
+    try:
+        stats = sincronizar_notion()
+    except Exception as e:
+        return f"⚠️ No se pudo sincronizar Notion → RAG: {e}"
+    return f"🔄 Notion → RAG: {stats['leidas']} fila(s) leída(s), {stats['embebidas']} embebida(s), {stats['borradas']} borrada(s)."
 
-    # Inicializamos los agentes
-    tutor = Tutor(llm)
-    registrador = Registrador()
 
-    # Construimos el grafo
-    graph = construir_grafo(tutor, registrador)
+def _fase(nombre: str):
+    return PERFIL.fase(nombre) if PERFIL else nullcontext()
 
-    # Configuramos la memoria (checkpoints)
-    with SqliteSaver.from_conn_string("checkpoints.db") as checkpointer:
-        app = graph.compile(checkpointer=checkpointer)
-        print("🌍 Asistente de idiomas iniciado con LangGraph 🌍")
 
-        historial = []
+def _preparar_app(outbox, cache_respuestas):
+    """
+    Lo pesado del arranque: índice RAG diferido, modelo, agentes, checkpointer y grafo.
+    Corre en un hilo mientras el usuario escribe su primer mensaje.
+    """
+    with _fase("precarga RAG"):
+        precargar()
+    with _fase("modelo + agentes"):
+        from asistente_idiomas.agentes.tutor import Tutor
+        from asistente_idiomas.agentes.registrador import Registrador
+        # respuestas de definiciones reutilizables entre sesiones (se invalidan si cambia 'knowledge/')
+        tutor = Tutor(crear_llm(), cache_respuestas=cache_respuestas)
+        registrador = Registrador(outbox=outbox)
+    with _fase("grafo + checkpointer"):
+        from asistente_idiomas.grafo import construir_grafo
+        from asistente_idiomas.utils.checkpoints import abrir_checkpointer
+        checkpointer = abrir_checkpointer("checkpoints.db")
+        app = construir_grafo(tutor, registrador).compile(checkpointer=checkpointer)
+    return app, checkpointer, registrador
+
+
+# --- Ejecución principal ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Asistente de idiomas Luna (consola).")
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Mide el arranque (fases e imports), muestra el reporte y termina.",
+    )
+    args = parser.parse_args(argv)
+    global PERFIL
+    if args.profile_startup and PERFIL is None:
+        PERFIL = PerfilArranque()
+        PERFIL.instalar()
+
+    print("🧩 Iniciando setup...")
+    with _fase("setup"):
+        setup_environment()
+        configurar_metricas()  # JSONL rotativo y, si METRICAS_PUERTO está definido, /metrics
+
+    # Inicializamos el RAG ANTES de crear los agentes; con el índice al día no lee documentos
+    with _fase("RAG"):
+        inicializar_rag()  # esto carga vocabulario.txt, frases.txt y gramatica.txt
+
+    with _fase("outbox + caché"):
+        # Outbox de Notion: los registros se encolan en SQLite y un hilo los envía en segundo plano
+        outbox = NotionOutbox()
+        outbox.iniciar()
+        cache_respuestas = CacheRespuestas(huella=huella_conocimiento)
+    # El índice de palabras ya registradas se carga en segundo plano para no demorar el arranque
+    threading.Thread(target=_cargar_indice_notion, name="indice-notion", daemon=True).start()
+    # Las palabras registradas en Notion vuelven al RAG (solo las nuevas o editadas, cada NOTION_SYNC_INTERVALO s)
+    from asistente_idiomas.tools.sync_notion import iniciar_sincronizacion_periodica
+    iniciar_sincronizacion_periodica()
+
+    # El grafo se construye en segundo plano: el usuario ya puede ir escribiendo
+    ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preparacion")
+    preparacion = ejecutor.submit(_preparar_app, outbox, cache_respuestas)
+    ejecutor.shutdown(wait=False)
+    print("🌍 Asistente de idiomas iniciado con LangGraph 🌍")
+
+    if args.profile_startup:
+        PERFIL.marcar("hasta el prompt")
+        preparacion.result()
+        PERFIL.marcar("hasta el grafo listo")
+        PERFIL.desinstalar()
+        print(PERFIL.reporte())
+        outbox.detener()
+        preparacion.result()[1].conn.close()
+        return
+
+    from langchain_core.messages import HumanMessage
+
+    config = {"configurable": {"thread_id": "chat_unico"}}
+    turnos = 0
+    tiempos_primer_token = []
+    try:
         while True:
             entrada = input("👤 Usuario: ")
             if entrada.lower() in ["salir", "exit", "quit"]:
                 print("\n👋 Luna: ¡Hasta luego! Sigue practicando 🌟")
+                if tiempos_primer_token:
+                    promedio = sum(tiempos_primer_token) / len(tiempos_primer_token)
+                    print(f"⏱️ Tiempo medio hasta el primer token: {promedio:.2f} s")
+                if preparacion.done():
+                    preparacion.result()[2].esperar(timeout=10)  # registros desprendidos de los últimos turnos
+                if not outbox.flush(timeout=10):
+                    print(f"⚠️ Quedaron registros pendientes para Notion; se enviarán en la próxima sesión. {outbox.estado()}")
+                outbox.detener()
+                volcar_snapshot()
                 break
 
-            historial.append(HumanMessage(content=entrada))
-            config = {"configurable": {"thread_id": "chat_unico"}}
-
-            final_state = app.invoke({"messages": historial}, config=config)
-            historial.append(final_state["messages"][-1])
-
-            print(f"\n🤖 Luna: {final_state['messages'][-1].content}\n")
+            # Comandos del outbox de Notion
+            if entrada.strip().lower() == "/estado":
+                print(f"\n📬 Outbox de Notion: {outbox.estado()}")
+                print(f"⚡ Caché de respuestas: {cache_respuestas.estadisticas()}\n")
+                continue
+            if entrada.strip().lower() == "/metricas":
+                for nombre, h in sorted(REGISTRO.snapshot()["histogramas"].items()):
+                    print(f"📈 {nombre}: {h['cuenta']} × {h['media'] * 1000:.1f} ms")
+                print()
+                continue
+            if entrada.strip().lower() == "/sincronizar":
+                completo = outbox.flush()
+                print(f"\n📬 Sincronización {'completa' if completo else 'incompleta'}: {outbox.estado()}")
+                print(f"{_sincronizar_notion()}\n")
+                continue
+
+            # Streaming: imprimimos los tokens apenas llegan (la latencia que importa es la del primer token)
+            inicio = time.perf_counter()
+            primer_token = None
+            app, checkpointer, _ = preparacion.result()  # normalmente ya está listo
+            # Solo se envía el mensaje nuevo: el resto de la conversación ya está en el checkpointer
+            entrada_grafo = {"messages": [HumanMessage(content=entrada)]}
+            for dato in app.stream(entrada_grafo, config=config, stream_mode="custom"):
+                if primer_token is None:
+                    primer_token = time.perf_counter() - inicio
+                    print("\n🤖 Luna: ", end="", flush=True)
+                print(dato["token"], end="", flush=True)
+            print("\n")
+
+            if primer_token is not None:
+                tiempos_primer_token.append(primer_token)
+
+            turnos += 1
+            if turnos % TURNOS_ENTRE_PODAS == 0:
+                from asistente_idiomas.utils.checkpoints import podar_checkpoints, compactar
+                podar_checkpoints(checkpointer, conservar=CHECKPOINTS_A_CONSERVAR)
+                compactar(checkpointer)
+    finally:
+        from asistente_idiomas.utils.checkpoints import podar_checkpoints
+        _, checkpointer, _ = preparacion.result()
+        podar_checkpoints(checkpointer, conservar=CHECKPOINTS_A_CONSERVAR)
+        checkpointer.conn.close()
 
 
 if __name__ == "__main__":
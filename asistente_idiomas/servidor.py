@@ -0,0 +1,193 @@
+# asistente_idiomas/servidor.py
+"""
+Modo servidor: muchos estudiantes conectados a un mismo proceso por WebSocket.
+
+Cada conexión indica su sesión en la URL (ws://host:8765/?sesion=<id>); si no la
+indica, se le asigna una nueva. Cada sesión es un thread_id del grafo con su propio
+Tutor (PoolTutores), pero todas comparten el vectorstore, el modelo, el outbox de
+Notion y el checkpointer. Los turnos se ejecutan en hilos bajo un límite global
+de concurrencia.
+
+Protocolo (JSON):
+  cliente -> {"mensaje": "qué significa zorplin"}   (también se acepta texto plano)
+  servidor -> {"tipo": "sesion", "id": "..."}  al conectar
+              {"tipo": "token", "texto": "..."} mientras se genera la respuesta
+              {"tipo": "fin"} / {"tipo": "error", "detalle": "..."}
+
+Uso: python -m asistente_idiomas.servidor [--host 0.0.0.0] [--puerto 8765] [--concurrencia 16]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, parse_qs
+
+from langchain_core.messages import HumanMessage
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+from asistente_idiomas.main import setup_environment, crear_llm, _cargar_indice_notion, CHECKPOINTS_A_CONSERVAR
+from asistente_idiomas.grafo import construir_grafo
+from asistente_idiomas.agentes.tutor import Tutor
+from asistente_idiomas.agentes.registrador import Registrador
+from asistente_idiomas.agentes.pool_tutores import PoolTutores
+from asistente_idiomas.tools.rag_idioma import inicializar_rag, huella_conocimiento, precargar
+from asistente_idiomas.tools.cache_respuestas import CacheRespuestas
+from asistente_idiomas.tools.notion_outbox import NotionOutbox
+from asistente_idiomas.tools.sync_notion import iniciar_sincronizacion_periodica
+from asistente_idiomas.utils.checkpoints import abrir_checkpointer, podar_checkpoints
+from asistente_idiomas.utils.metricas import configurar_metricas, volcar_snapshot
+
+_FIN = object()
+
+
+class ServidorLuna:
+    """Atiende muchas sesiones concurrentes sobre un único grafo compilado."""
+
+    def __init__(self, app, pool: PoolTutores, concurrencia: int = 16, checkpointer=None):
+        self.app = app
+        self.pool = pool
+        self.checkpointer = checkpointer  # para podar los checkpoints viejos desde mantenimiento()
+        self.concurrencia = concurrencia
+        self._limite = asyncio.Semaphore(concurrencia)
+        self._ejecutor = ThreadPoolExecutor(max_workers=concurrencia, thread_name_prefix="turno")
+        self._locks_sesion: dict[str, asyncio.Lock] = {}
+
+    def _ejecutar_turno(self, thread_id: str, mensaje: str, emitir):
+        """Corre el grafo en un hilo; cada token se reenvía al event loop con `emitir`."""
+        config = {"configurable": {"thread_id": thread_id}}
+        for dato in self.app.stream({"messages": [HumanMessage(content=mensaje)]}, config=config, stream_mode="custom"):
+            emitir(dato["token"])
+
+    async def turno(self, thread_id: str, mensaje: str, enviar):
+        """Un turno completo; los tokens llegan al cliente a medida que se generan."""
+        loop = asyncio.get_running_loop()
+        cola: asyncio.Queue = asyncio.Queue()
+        emitir = lambda token: loop.call_soon_threadsafe(cola.put_nowait, token)
+
+        # Una sesión procesa un mensaje por vez (su Tutor no es thread-safe);
+        # sesiones distintas corren en paralelo hasta el límite global.
+        lock = self._locks_sesion.setdefault(thread_id, asyncio.Lock())
+        async with lock, self._limite:
+            tarea = loop.run_in_executor(self._ejecutor, self._ejecutar_turno, thread_id, mensaje, emitir)
+            tarea.add_done_callback(lambda _: loop.call_soon_threadsafe(cola.put_nowait, _FIN))
+            try:
+                while (token := await cola.get()) is not _FIN:
+                    await enviar({"tipo": "token", "texto": token})
+            finally:
+                # si el cliente se fue a mitad del turno, el hilo sigue corriendo con el Tutor de la sesión:
+                # el lock (y el lugar en el límite) se sueltan recién cuando termina
+                await asyncio.wait([tarea])
+            await tarea  # propaga la excepción del hilo, si la hubo
+
+    async def atender(self, conexion):
+        consulta = parse_qs(urlparse(conexion.request.path).query)
+        thread_id = (consulta.get("sesion") or [str(uuid.uuid4())])[0]
+        enviar = lambda datos: conexion.send(json.dumps(datos, ensure_ascii=False))
+        await enviar({"tipo": "sesion", "id": thread_id})
+
+        try:
+            async for crudo in conexion:
+                try:
+                    mensaje = json.loads(crudo).get("mensaje", "")
+                except (json.JSONDecodeError, AttributeError):
+                    mensaje = crudo
+                if not str(mensaje).strip():
+                    continue
+                try:
+                    await self.turno(thread_id, str(mensaje), enviar)
+                    await enviar({"tipo": "fin"})
+                except ConnectionClosed:
+                    raise
+                except Exception as e:
+                    print(f"⚠️ Error en la sesión {thread_id}: {e}")
+                    await enviar({"tipo": "error", "detalle": str(e)})
+        except ConnectionClosed:
+            pass
+        finally:
+            lock = self._locks_sesion.get(thread_id)
+            if lock is not None and not lock.locked():
+                self._locks_sesion.pop(thread_id, None)
+
+    async def mantenimiento(self, intervalo: float = 60.0, ciclos_entre_podas: int = 10):
+        """Desaloja tutores inactivos periódicamente y, cada tanto, poda los checkpoints viejos."""
+        loop = asyncio.get_running_loop()
+        ciclos = 0
+        while True:
+            await asyncio.sleep(intervalo)
+            desalojados = self.pool.evictar_inactivos()
+            if desalojados:
+                print(f"🧹 {desalojados} sesión(es) inactiva(s) desalojada(s); activas: {len(self.pool)}")
+            ciclos += 1
+            if self.checkpointer is not None and ciclos % ciclos_entre_podas == 0:
+                try:
+                    # SQLite bloqueante: fuera del event loop
+                    eliminados = await loop.run_in_executor(
+                        None, podar_checkpoints, self.checkpointer, CHECKPOINTS_A_CONSERVAR
+                    )
+                except Exception as e:
+                    print(f"⚠️ No se pudieron podar los checkpoints: {e}")
+                else:
+                    if eliminados:
+                        print(f"🧹 {eliminados} checkpoint(s) viejo(s) podado(s).")
+
+
+async def _servir(servidor: ServidorLuna, host: str, puerto: int):
+    async with serve(servidor.atender, host, puerto) as ws:
+        print(f"🌍 Servidor de Luna escuchando en ws://{host}:{puerto} (concurrencia: {servidor.concurrencia})")
+        mantenimiento = asyncio.create_task(servidor.mantenimiento())
+        try:
+            await ws.serve_forever()
+        finally:
+            mantenimiento.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor WebSocket multi-sesión de Luna.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--concurrencia", type=int, default=int(os.getenv("LUNA_CONCURRENCIA", "16")))
+    parser.add_argument("--max-sesiones", type=int, default=500)
+    parser.add_argument("--puerto-metricas", type=int, default=None,
+                        help="Puerto del endpoint /metrics de Prometheus (por defecto METRICAS_PUERTO; 0 lo desactiva).")
+    args = parser.parse_args()
+
+    print("🧩 Iniciando setup...")
+    setup_environment()
+    configurar_metricas(puerto=args.puerto_metricas)
+    inicializar_rag()
+    precargar()  # un servidor prefiere pagar la carga al arrancar y no en la primera consulta
+
+    # Recursos compartidos por todas las sesiones
+    llm = crear_llm()
+    outbox = NotionOutbox()
+    outbox.iniciar()
+    threading.Thread(target=_cargar_indice_notion, name="indice-notion", daemon=True).start()
+    iniciar_sincronizacion_periodica()  # lo registrado en Notion se vuelve buscable en el RAG
+    checkpointer = abrir_checkpointer("checkpoints.db")
+
+    # una sola caché de respuestas: lo que un estudiante preguntó le sirve al siguiente
+    cache_respuestas = CacheRespuestas(huella=huella_conocimiento)
+    pool = PoolTutores(lambda: Tutor(llm, cache_respuestas=cache_respuestas), checkpointer=checkpointer, max_sesiones=args.max_sesiones)
+    registrador = Registrador(outbox=outbox)
+    app = construir_grafo(pool, registrador).compile(checkpointer=checkpointer)
+
+    try:
+        asyncio.run(_servir(ServidorLuna(app, pool, concurrencia=args.concurrencia, checkpointer=checkpointer), args.host, args.puerto))
+    except KeyboardInterrupt:
+        print("\n👋 Servidor detenido.")
+    finally:
+        registrador.esperar(timeout=10)  # registros desprendidos de los últimos turnos
+        outbox.flush(timeout=10)
+        outbox.detener()
+        volcar_snapshot()
+        podar_checkpoints(checkpointer, conservar=CHECKPOINTS_A_CONSERVAR)
+        checkpointer.conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# asistente_idiomas/tools/bm25.py
+import math
+import threading
+from collections import Counter
+from langchain_core.documents import Document
+from asistente_idiomas.tools.glosario import normalizar
+
+# palabras vacías de los idiomas del conocimiento: no cuentan para la cobertura de la consulta
+STOPWORDS = frozenset(
+    "a al con de del el en la las lo los para por que se un una y o "
+    "an and are as at be for from in is it of on or the to with "
+    "au aux de des du et la le les un une".split()
+)
+
+
+def tokenizar(texto: str) -> list[str]:
+    """Mismos criterios que el glosario (sin acentos ni puntuación), más el apóstrofo y el guion sueltos."""
+    return [t for t in (p.strip("'-") for p in normalizar(texto).split()) if t]
+
+
+def tiene_terminos_significativos(texto: str) -> bool:
+    """False si el texto solo tiene palabras vacías ('the', 'de la'): no alcanza para afirmar una coincidencia."""
+    return any(t not in STOPWORDS for t in tokenizar(texto))
+
+
+class IndiceBM25:
+    """
+    Índice invertido en memoria con puntaje BM25 sobre los mismos chunks que el vectorstore.
+    buscar() devuelve (Document, puntaje, cobertura), donde cobertura es la fracción de los
+    términos de la consulta (sin palabras vacías) que aparecen en el chunk.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._docs: dict[str, Document] = {}
+        self._longitudes: dict[str, int] = {}
+        self._postings: dict[str, dict[str, int]] = {}  # término -> {id: frecuencia}
+        self._total_tokens = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def agregar(self, ids: list[str], docs: list[Document]):
+        with self._lock:
+            for cid, doc in zip(ids, docs):
+                if cid in self._docs:
+                    self._quitar(cid)
+                tokens = tokenizar(doc.page_content)
+                self._docs[cid] = Document(id=cid, page_content=doc.page_content, metadata=dict(doc.metadata or {}))
+                self._longitudes[cid] = len(tokens)
+                self._total_tokens += len(tokens)
+                for termino, frecuencia in Counter(tokens).items():
+                    self._postings.setdefault(termino, {})[cid] = frecuencia
+
+    def eliminar(self, ids: list[str]):
+        with self._lock:
+            for cid in ids:
+                if cid in self._docs:
+                    self._quitar(cid)
+
+    def _quitar(self, cid: str):
+        for termino in set(tokenizar(self._docs[cid].page_content)):
+            posting = self._postings.get(termino)
+            if posting is not None:
+                posting.pop(cid, None)
+                if not posting:
+                    del self._postings[termino]
+        self._total_tokens -= self._longitudes.pop(cid)
+        del self._docs[cid]
+
+    def _idf(self, termino: str) -> float:
+        n = len(self._postings.get(termino, ()))
+        return math.log(1 + (len(self._docs) - n + 0.5) / (n + 0.5))
+
+    def buscar(self, consulta: str, k: int = 10) -> list[tuple[Document, float, float]]:
+        terminos = list(dict.fromkeys(tokenizar(consulta)))
+        significativos = [t for t in terminos if t not in STOPWORDS] or terminos
+        if not significativos:
+            return []
+        with self._lock:
+            if not self._docs:
+                return []
+            promedio = self._total_tokens / len(self._docs) or 1.0
+            puntajes, encontrados = Counter(), {}
+            for termino in terminos:
+                posting = self._postings.get(termino)
+                if not posting:
+                    continue
+                idf = self._idf(termino)
+                for cid, frecuencia in posting.items():
+                    norma = self.k1 * (1 - self.b + self.b * self._longitudes[cid] / promedio)
+                    puntajes[cid] += idf * frecuencia * (self.k1 + 1) / (frecuencia + norma)
+                    if termino in significativos:
+                        encontrados[cid] = encontrados.get(cid, 0) + 1
+            return [
+                (self._docs[cid], puntaje, encontrados.get(cid, 0) / len(significativos))
+                for cid, puntaje in puntajes.most_common(k)
+            ]
@@ -0,0 +1,186 @@
+# asistente_idiomas/tools/cache_respuestas.py
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+CACHE_FILE = "data/respuestas_cache.db"
+
+
+def clave_respuesta(termino: str, contexto: str, version_prompt: str, modelo: str) -> str:
+    """Clave de caché: término normalizado + hash del contexto recuperado + versión del prompt + modelo."""
+    base = json.dumps([termino, hashlib.sha256(contexto.encode("utf-8")).hexdigest(), version_prompt, modelo])
+    return hashlib.sha256(base.encode("utf-8")).hexdigest()
+
+
+class _Vuelo:
+    """Cálculo en curso para una clave: los demás hilos esperan su resultado."""
+    __slots__ = ("evento", "valor", "error")
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.valor = None
+        self.error = None
+
+
+class CacheRespuestas:
+    """
+    Caché persistente (SQLite) de respuestas del Tutor a consultas de vocabulario.
+    - TTL y tamaño máximo (se desalojan las menos usadas).
+    - Se vacía sola cuando cambia la huella del conocimiento (`huella()`).
+    - Single-flight: preguntas idénticas simultáneas comparten una sola llamada al modelo.
+    """
+
+    def __init__(self, ruta: str = CACHE_FILE, ttl: float = 7 * 24 * 3600, max_entradas: int = 5000, huella=None):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.huella = huella  # callable que devuelve la huella actual del conocimiento
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._en_vuelo: dict[str, _Vuelo] = {}
+        self._huella_vista = None
+
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS respuestas (
+                clave TEXT PRIMARY KEY,
+                valor TEXT NOT NULL,
+                creado REAL NOT NULL,
+                ultimo_uso REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_respuestas_uso ON respuestas (ultimo_uso);
+            CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT);
+            """
+        )
+        self._conn.commit()
+
+    # ---------- invalidación ----------
+    def _verificar_huella(self):
+        """Si el conocimiento cambió desde la última vez, las respuestas guardadas ya no valen."""
+        if self.huella is None:
+            return
+        actual = self.huella()
+        if actual is None or actual == self._huella_vista:
+            return
+        guardada = self._conn.execute("SELECT valor FROM meta WHERE clave = 'huella'").fetchone()
+        if guardada is None or guardada[0] != actual:
+            self._conn.execute("DELETE FROM respuestas")
+            self._conn.execute("INSERT OR REPLACE INTO meta (clave, valor) VALUES ('huella', ?)", (actual,))
+            self._conn.commit()
+            if guardada is not None:
+                print("♻️ El conocimiento cambió: caché de respuestas vaciada.")
+        self._huella_vista = actual
+
+    # ---------- lectura / escritura ----------
+    def obtener(self, clave: str):
+        with self._lock:
+            self._verificar_huella()
+            fila = self._conn.execute("SELECT valor, creado FROM respuestas WHERE clave = ?", (clave,)).fetchone()
+            if fila is None:
+                return None
+            valor, creado = fila
+            if time.time() - creado > self.ttl:
+                self._conn.execute("DELETE FROM respuestas WHERE clave = ?", (clave,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE respuestas SET ultimo_uso = ? WHERE clave = ?", (time.time(), clave))
+            self._conn.commit()
+        return json.loads(valor)
+
+    def guardar(self, clave: str, valor):
+        ahora = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO respuestas (clave, valor, creado, ultimo_uso) VALUES (?, ?, ?, ?)",
+                (clave, json.dumps(valor, ensure_ascii=False), ahora, ahora),
+            )
+            total = self._conn.execute("SELECT COUNT(*) FROM respuestas").fetchone()[0]
+            if total > self.max_entradas:
+                self._conn.execute(
+                    "DELETE FROM respuestas WHERE clave IN "
+                    "(SELECT clave FROM respuestas ORDER BY ultimo_uso ASC LIMIT ?)",
+                    (total - self.max_entradas,),
+                )
+            self._conn.commit()
+
+    def obtener_o_calcular(self, clave: str, calcular):
+        """
+        Devuelve (valor, True) si estaba en caché; si no, calcula UNA sola vez aunque
+        varios hilos pidan la misma clave a la vez, y devuelve (valor, False).
+        Los resultados None no se guardan ni se comparten: quien esperaba calcula por su cuenta.
+        """
+        def generar():
+            return calcular()
+            yield  # generador sin fragmentos
+
+        return _agotar(self.obtener_o_generar(clave, generar))
+
+    def obtener_o_generar(self, clave: str, generar):
+        """
+        Como obtener_o_calcular(), para respuestas en streaming: `generar()` es un generador que
+        emite fragmentos y devuelve el valor. Solo el líder lo ejecuta y reenvía sus fragmentos;
+        los demás esperan su valor sin emitir nada. Devuelve (valor, en_cache) al terminar.
+        Si el líder no llega al final (error o consumidor que corta), nada se comparte.
+        """
+        valor = self.obtener(clave)
+        if valor is not None:
+            self.hits += 1
+            return valor, True
+
+        with self._lock:
+            vuelo = self._en_vuelo.get(clave)
+            lider = vuelo is None
+            if lider:
+                vuelo = self._en_vuelo[clave] = _Vuelo()
+
+        if not lider:
+            vuelo.evento.wait()
+            if vuelo.error is not None:
+                raise vuelo.error
+            if vuelo.valor is not None:
+                self.hits += 1
+                return vuelo.valor, True
+            # el líder no obtuvo nada (o se cortó antes de terminar): se calcula aparte
+            self.misses += 1
+            valor = yield from generar()
+            if valor is not None:
+                self.guardar(clave, valor)
+            return valor, False
+
+        self.misses += 1
+        try:
+            valor = yield from generar()
+            if valor is not None:
+                self.guardar(clave, valor)
+            vuelo.valor = valor
+            return valor, False
+        except Exception as e:
+            vuelo.error = e
+            raise
+        finally:
+            vuelo.evento.set()
+            with self._lock:
+                self._en_vuelo.pop(clave, None)
+
+    def estadisticas(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+def _agotar(generador):
+    """Consume un generador y devuelve su valor de retorno."""
+    while True:
+        try:
+            next(generador)
+        except StopIteration as fin:
+            return fin.value
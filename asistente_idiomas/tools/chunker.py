@@ -0,0 +1,118 @@
+# asistente_idiomas/tools/chunker.py
+import re
+from langchain_core.documents import Document
+from asistente_idiomas.tools.glosario import EntradaGlosario, parsear_glosario, normalizar
+
+# cambiarlo invalida el fingerprint y fuerza a reindexar todo con el chunker nuevo
+CHUNKER_VERSION = "glosario-v1"
+MAX_CARACTERES_NOTAS = 600  # las líneas sueltas de una sección se agrupan hasta este tamaño
+
+# palabras frecuentes para adivinar el idioma de cada lado de las entradas
+_PALABRAS_IDIOMA = {
+    "en": set("the a an is are i you he she it we they my your to of and in on at what where how do does".split()),
+    "es": set("el la los las un una es son yo tú él ella mi tu de y en que qué dónde cómo me te se al del".split()),
+    "fr": set("le la les un une est sont je tu il elle mon ton de et en que où comment ce du au".split()),
+}
+_ETIQUETA = re.compile(r"^\*\*[^*]+\*\*:?$")  # '**Examples:**' sin contenido propio
+IDIOMA_ORIGEN, IDIOMA_DESTINO = "en", "es"  # el caso del asistente: hispanohablantes aprendiendo inglés
+
+# 🌍 Idiomas que se pueden practicar: código de la partición del RAG -> nombres (es/en/fr, sin acentos)
+IDIOMAS = {
+    "en": ("ingles", "english", "anglais"),
+    "fr": ("frances", "french", "francais"),
+    "es": ("espanol", "castellano", "spanish", "espagnol"),
+    "de": ("aleman", "german", "allemand", "deutsch"),
+    "it": ("italiano", "italian", "italien"),
+    "pt": ("portugues", "portuguese", "portugais"),
+}
+NOMBRES_IDIOMA = {"en": "inglés", "fr": "francés", "es": "español", "de": "alemán", "it": "italiano", "pt": "portugués"}
+
+
+def codigo_idioma(nombre: str) -> str | None:
+    """'Inglés' / 'english' / 'en' -> 'en'; None si no se reconoce."""
+    clave = normalizar(nombre)
+    if clave in IDIOMAS:
+        return clave
+    return next((codigo for codigo, variantes in IDIOMAS.items() if clave in variantes), None)
+
+
+def _votar_idioma(textos: list[str]) -> str | None:
+    votos = dict.fromkeys(_PALABRAS_IDIOMA, 0)
+    for texto in textos:
+        palabras = set(re.findall(r"[a-záéíóúñàâçèêëîïôûù']+", texto.lower()))
+        for idioma, frecuentes in _PALABRAS_IDIOMA.items():
+            votos[idioma] += len(palabras & frecuentes)
+    idioma, cantidad = max(votos.items(), key=lambda x: x[1])
+    return idioma if cantidad else None
+
+
+def detectar_par_idiomas(entradas: list[EntradaGlosario]) -> tuple[str, str]:
+    """Idioma de los términos y de las traducciones de un archivo, por mayoría de palabras frecuentes."""
+    origen = _votar_idioma([e.termino for e in entradas] + [
+        ej for e in entradas for ej in e.ejemplos if not ej.startswith("(")
+    ])
+    destino = _votar_idioma([e.traduccion for e in entradas] + [
+        ej for e in entradas for ej in e.ejemplos if ej.startswith("(")
+    ])
+    origen = origen or IDIOMA_ORIGEN
+    destino = destino if destino and destino != origen else (IDIOMA_DESTINO if origen != IDIOMA_DESTINO else IDIOMA_ORIGEN)
+    return origen, destino
+
+
+def _metadatos(source: str, seccion: str, origen: str, destino: str, **extra) -> dict:
+    # Chroma no acepta valores None en los metadatos: todo es texto, vacío si no aplica
+    meta = {"source": source, "seccion": seccion or "", "idioma": origen, "par_idiomas": f"{origen}-{destino}"}
+    meta.update({k: v or "" for k, v in extra.items()})
+    return meta
+
+
+def chunk_de_entrada(entrada: EntradaGlosario, origen: str, destino: str) -> Document:
+    """El chunk de una entrada: su texto completo y sus datos como metadatos."""
+    return Document(
+        page_content=entrada.texto(),
+        metadata=_metadatos(
+            entrada.source, entrada.seccion, origen, destino,
+            tipo="entrada", categoria=entrada.categoria, termino=normalizar(entrada.termino),
+        ),
+    )
+
+
+def dividir_glosario(doc: Document) -> list[Document]:
+    """
+    Un chunk por entrada del glosario ('- termino → traduccion' más sus ejemplos), con
+    sección, categoría gramatical y par de idiomas en los metadatos. Las líneas que no
+    pertenecen a ninguna entrada ('**Examples:**', listas de días...) se agrupan por sección.
+    """
+    source = doc.metadata.get("source", "sin fuente")
+    sueltas = []
+    entradas = parsear_glosario(doc.page_content, source, sueltas=sueltas)
+    if doc.metadata.get("par_idiomas"):
+        # el par viene dado (p. ej. por la carpeta del corpus): no se adivina
+        origen, _, destino = doc.metadata["par_idiomas"].partition("-")
+        destino = destino or (IDIOMA_DESTINO if origen != IDIOMA_DESTINO else IDIOMA_ORIGEN)
+    else:
+        origen, destino = detectar_par_idiomas(entradas)
+
+    chunks = [chunk_de_entrada(entrada, origen, destino) for entrada in entradas]
+
+    # notas: líneas sueltas consecutivas de la misma sección, con el título como contexto
+    grupo, seccion_grupo = [], None
+    def _cerrar():
+        if grupo and not all(_ETIQUETA.match(l) for l in grupo):
+            texto = "\n".join(([seccion_grupo] if seccion_grupo else []) + grupo)
+            chunks.append(Document(
+                page_content=texto,
+                metadata=_metadatos(source, seccion_grupo, origen, destino, tipo="notas", categoria="", termino=""),
+            ))
+    for seccion, linea in sueltas:
+        tamano = sum(len(l) + 1 for l in grupo)
+        if seccion != seccion_grupo or tamano + len(linea) > MAX_CARACTERES_NOTAS:
+            _cerrar()
+            grupo, seccion_grupo = [], seccion
+        grupo.append(linea)
+    _cerrar()
+    return chunks
+
+
+def dividir(docs: list[Document]) -> list[Document]:
+    return [chunk for doc in docs for chunk in dividir_glosario(doc)]
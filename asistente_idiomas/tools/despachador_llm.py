@@ -0,0 +1,440 @@
+# asistente_idiomas/tools/despachador_llm.py
+import os
+import time
+import queue
+import random
+import threading
+import contextvars
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from asistente_idiomas.agentes.contexto import estimar_tokens
+from asistente_idiomas.utils.metricas import contar, observar, evento
+
+# 🧭 Qué modelo atiende cada tarea del Tutor: lo barato (extraer el JSON del registro,
+# definir sin contexto del RAG, resumir el historial) va al modelo ligero.
+RUTAS = {
+    "conversacion": "principal",
+    "definicion": "principal",
+    "fallback": "ligero",
+    "registro": "ligero",
+    "resumen": "ligero",
+}
+
+# errores de cuota, de disponibilidad o de red: vale la pena reintentar (un 400 no)
+_TRANSITORIOS = (
+    "429", "resourceexhausted", "resource exhausted", "resource_exhausted", "rate limit", "quota",
+    "500 ", "503", "serviceunavailable", "unavailable", "internalservererror",
+    "deadline", "timeout", "timed out", "connection",
+)
+
+_ejecutor = None
+_lock_ejecutor = threading.Lock()
+
+
+def _ejecutor_llm() -> ThreadPoolExecutor:
+    global _ejecutor
+    with _lock_ejecutor:
+        if _ejecutor is None:
+            _ejecutor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm")
+    return _ejecutor
+
+
+def es_transitorio(error: Exception) -> bool:
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    texto = f"{type(error).__name__} {error}".lower()
+    return any(marca in texto for marca in _TRANSITORIOS)
+
+
+def _texto(mensajes) -> str:
+    if isinstance(mensajes, str):
+        return mensajes
+    return "\n".join(str(getattr(m, "content", m)) for m in mensajes)
+
+
+class CircuitoAbierto(RuntimeError):
+    """El modelo falló demasiadas veces seguidas: no se lo llama hasta que pase el enfriamiento."""
+
+
+class CuboTokens:
+    """
+    Token bucket por minuto (RPM o TPM). reservar() descuenta enseguida aunque el saldo
+    quede negativo y devuelve cuánto esperar: los pedidos se atienden en orden de llegada.
+    """
+
+    def __init__(self, por_minuto: float):
+        self.capacidad = por_minuto
+        self.por_segundo = por_minuto / 60
+        self._disponible = por_minuto
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _recargar(self):
+        ahora = time.monotonic()
+        self._disponible = min(self.capacidad, self._disponible + (ahora - self._ultimo) * self.por_segundo)
+        self._ultimo = ahora
+
+    def reservar(self, cantidad: float) -> float:
+        with self._lock:
+            self._recargar()
+            self._disponible -= min(cantidad, self.capacidad)
+            return max(0.0, -self._disponible / self.por_segundo)
+
+    def intentar(self, cantidad: float) -> bool:
+        """Descuenta solo si alcanza sin esperar (para las solicitudes de cobertura)."""
+        with self._lock:
+            self._recargar()
+            if self._disponible < cantidad:
+                return False
+            self._disponible -= cantidad
+            return True
+
+
+class Circuito:
+    """Cerrado -> abierto tras `umbral` fallos transitorios seguidos -> semiabierto (una sonda) tras `enfriamiento`."""
+
+    def __init__(self, nombre: str, umbral: int = 5, enfriamiento: float = 30.0):
+        self.nombre = nombre
+        self.umbral = umbral
+        self.enfriamiento = enfriamiento
+        self.estado = "cerrado"
+        self.fallos = 0
+        self._abierto_desde = 0.0
+        self._sonda_en_curso = False
+        self._lock = threading.Lock()
+
+    def permitir(self):
+        with self._lock:
+            if self.estado == "abierto":
+                if time.monotonic() - self._abierto_desde < self.enfriamiento:
+                    raise CircuitoAbierto(f"Circuito abierto para {self.nombre}")
+                self.estado, self._sonda_en_curso = "semiabierto", False
+            if self.estado == "semiabierto":
+                if self._sonda_en_curso:
+                    raise CircuitoAbierto(f"Circuito semiabierto para {self.nombre}: ya hay una sonda en curso")
+                self._sonda_en_curso = True
+
+    def exito(self):
+        with self._lock:
+            if self.estado != "cerrado":
+                evento("llm.circuito", modelo=self.nombre, estado="cerrado")
+            self.estado, self.fallos, self._sonda_en_curso = "cerrado", 0, False
+
+    def soltar_sonda(self):
+        """La sonda terminó sin veredicto (p. ej. se cerró el stream): otra llamada puede probar."""
+        with self._lock:
+            self._sonda_en_curso = False
+
+    def fallo(self):
+        with self._lock:
+            self.fallos += 1
+            if self.estado == "semiabierto" or (self.estado == "cerrado" and self.fallos >= self.umbral):
+                self.estado, self._abierto_desde, self._sonda_en_curso = "abierto", time.monotonic(), False
+                contar("llm_circuito_abierto", modelo=self.nombre)
+                evento("llm.circuito", nivel="error", modelo=self.nombre, estado="abierto", fallos=self.fallos)
+
+
+class ModeloDespachado:
+    """
+    Un chat model detrás de los límites de la API, con la misma interfaz (invoke, stream,
+    with_structured_output): cupo RPM/TPM, concurrencia acotada, reintentos con backoff
+    y jitter, cobertura opcional (una segunda solicitud si la primera tarda más de
+    `cobertura` segundos) y circuito. Con el circuito abierto se usa el `respaldo`.
+    En streaming, el plazo es para el primer fragmento (`timeout_primer_fragmento`, por
+    defecto `timeout`) y para el silencio entre dos fragmentos (`timeout_inactividad`).
+    """
+
+    def __init__(self, llm, nombre: str, rpm: float = 0, tpm: float = 0, concurrencia: int = 16,
+                 max_intentos: int = 4, backoff_base: float = 0.5, backoff_max: float = 20.0,
+                 timeout: float | None = None, cobertura: float | None = None,
+                 timeout_primer_fragmento: float | None = None, timeout_inactividad: float | None = None,
+                 tokens_salida: int = 512, circuito: Circuito | None = None):
+        self._llm = llm
+        self.model = nombre
+        self.max_intentos = max(1, max_intentos)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.cobertura = cobertura
+        self.timeout_primer_fragmento = timeout_primer_fragmento or timeout
+        self.timeout_inactividad = timeout_inactividad
+        self.tokens_salida = tokens_salida  # lo que se reserva del TPM por la respuesta
+        self.circuito = circuito or Circuito(nombre)
+        self.respaldo: ModeloDespachado | None = None
+        self._rpm = CuboTokens(rpm) if rpm > 0 else None
+        self._tpm = CuboTokens(tpm) if tpm > 0 else None
+        self._semaforo = threading.BoundedSemaphore(concurrencia)
+
+    def __getattr__(self, nombre):
+        return getattr(self._llm, nombre)
+
+    # ---------- cupo ----------
+    def _tokens(self, mensajes) -> int:
+        return estimar_tokens(_texto(mensajes)) + self.tokens_salida
+
+    def _esperar_cupo(self, mensajes):
+        espera = max(
+            self._rpm.reservar(1) if self._rpm else 0.0,
+            self._tpm.reservar(self._tokens(mensajes)) if self._tpm else 0.0,
+        )
+        if espera > 0:
+            observar("llm_espera_cupo_segundos", espera, modelo=self.model)
+            time.sleep(espera)
+
+    def _cupo_libre(self, mensajes) -> bool:
+        if self._rpm and not self._rpm.intentar(1):
+            return False
+        return not self._tpm or self._tpm.intentar(self._tokens(mensajes))
+
+    def _backoff(self, intento: int) -> float:
+        # "full jitter": los reintentos de muchas sesiones no llegan todos juntos
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (intento - 1)))
+
+    # ---------- ejecución ----------
+    def _lanzar(self, fn):
+        """
+        Envía la llamada al ejecutor con un lugar del semáforo tomado (ya adquirido por quien llama).
+        El lugar se libera cuando la llamada termina de verdad, no cuando se deja de esperarla:
+        una solicitud abandonada por timeout sigue contando contra la concurrencia mientras corre.
+        """
+        try:
+            futuro = _ejecutor_llm().submit(contextvars.copy_context().run, fn, self._llm)
+        except BaseException:
+            self._semaforo.release()
+            raise
+        futuro.add_done_callback(lambda _: self._semaforo.release())
+        return futuro
+
+    def _abandonar(self, pendientes: set, motivo: str):
+        for futuro in pendientes:
+            # si aún no arrancó, se cancela; si ya corre, conserva su lugar y su cupo hasta terminar
+            if not futuro.cancel():
+                contar("llm_abandonadas", modelo=self.model, motivo=motivo)
+
+    def _ejecutar(self, fn, mensajes):
+        if not self.timeout and not self.cobertura:
+            with self._semaforo:
+                return fn(self._llm)
+        self._semaforo.acquire()
+        pendientes = {self._lanzar(fn)}
+        limite = time.monotonic() + self.timeout if self.timeout else None
+        if self.cobertura and (not self.timeout or self.cobertura < self.timeout):
+            hechos, _ = wait(pendientes, timeout=self.cobertura)
+            # la cobertura no espera lugar ni cupo: si no hay, se sigue solo con la primera
+            if not hechos and self._semaforo.acquire(blocking=False):
+                if self._cupo_libre(mensajes):
+                    contar("llm_coberturas", modelo=self.model)
+                    pendientes.add(self._lanzar(fn))
+                else:
+                    self._semaforo.release()
+        error = None
+        while pendientes:
+            restante = None if limite is None else limite - time.monotonic()
+            if restante is not None and restante <= 0:
+                self._abandonar(pendientes, "timeout")
+                raise TimeoutError(f"{self.model} no respondió en {self.timeout} s")
+            hechos, pendientes = wait(pendientes, timeout=restante, return_when=FIRST_COMPLETED)
+            for futuro in hechos:
+                if futuro.exception() is None:
+                    self._abandonar(pendientes, "cobertura")  # la primera que responde gana
+                    return futuro.result()
+                error = futuro.exception()
+        raise error
+
+    def _llamar(self, fn, mensajes, operacion: str, con_respaldo: bool = True):
+        ultimo_error = None
+        for intento in range(1, self.max_intentos + 1):
+            try:
+                self.circuito.permitir()
+            except CircuitoAbierto:
+                if con_respaldo and self.respaldo is not None:
+                    contar("llm_respaldo", modelo=self.model, respaldo=self.respaldo.model)
+                    return self.respaldo._llamar(fn, mensajes, operacion, con_respaldo=False)
+                raise
+            self._esperar_cupo(mensajes)
+            try:
+                resultado = self._ejecutar(fn, mensajes)
+            except Exception as e:
+                if not es_transitorio(e):
+                    self.circuito.exito()  # la API respondió: el error es de la solicitud, no del servicio
+                    raise
+                self.circuito.fallo()
+                ultimo_error = e
+                contar("llm_reintentos", modelo=self.model, operacion=operacion)
+                evento("llm.reintento", modelo=self.model, operacion=operacion, intento=intento, error=str(e))
+                if intento < self.max_intentos:
+                    time.sleep(self._backoff(intento))
+                continue
+            self.circuito.exito()
+            return resultado
+        raise ultimo_error
+
+    # ---------- interfaz de chat model ----------
+    def invoke(self, mensajes, **kwargs):
+        return self._llamar(lambda llm: llm.invoke(mensajes, **kwargs), mensajes, "invoke")
+
+    def with_structured_output(self, schema, **kwargs):
+        return _SalidaEstructuradaDespachada(self, schema, kwargs)
+
+    def stream(self, mensajes, **kwargs):
+        yield from self._stream(mensajes, kwargs, con_respaldo=True)
+
+    def _fragmentos(self, mensajes, kwargs: dict):
+        """
+        Los fragmentos del modelo con sus plazos: TimeoutError si el primero no llega a tiempo o si
+        el modelo se queda callado a mitad de la respuesta. El stream corre en el ejecutor y, como
+        en _lanzar, conserva su lugar en el semáforo hasta terminar de verdad.
+        """
+        if not self.timeout_primer_fragmento and not self.timeout_inactividad:
+            with self._semaforo:
+                yield from self._llm.stream(mensajes, **kwargs)
+            return
+
+        cola, cortar, fin = queue.Queue(), threading.Event(), object()
+
+        def producir(llm):
+            try:
+                with closing(llm.stream(mensajes, **kwargs)) as fragmentos:
+                    for chunk in fragmentos:
+                        if cortar.is_set():
+                            return
+                        cola.put((chunk, None))
+                cola.put((fin, None))
+            except Exception as e:
+                cola.put((None, e))
+
+        self._semaforo.acquire()
+        self._lanzar(producir)
+        plazo, que = self.timeout_primer_fragmento, "el primer fragmento"
+        try:
+            while True:
+                try:
+                    chunk, error = cola.get(timeout=plazo)
+                except queue.Empty:
+                    contar("llm_abandonadas", modelo=self.model, motivo="timeout_stream")
+                    raise TimeoutError(f"{self.model}: {que} no llegó en {plazo} s")
+                if error is not None:
+                    raise error
+                if chunk is fin:
+                    return
+                yield chunk
+                plazo, que = self.timeout_inactividad, "el siguiente fragmento"
+        finally:
+            cortar.set()  # el hilo deja de leer en el próximo fragmento y suelta su lugar
+
+    def _stream(self, mensajes, kwargs: dict, con_respaldo: bool):
+        """
+        Sin cobertura: solo se reintenta si el error (o el timeout) llega antes del primer fragmento.
+        Un timeout a mitad de la respuesta corta el stream y cuenta como fallo del circuito.
+        """
+        for intento in range(1, self.max_intentos + 1):
+            try:
+                self.circuito.permitir()
+            except CircuitoAbierto:
+                if con_respaldo and self.respaldo is not None:
+                    contar("llm_respaldo", modelo=self.model, respaldo=self.respaldo.model)
+                    yield from self.respaldo._stream(mensajes, kwargs, con_respaldo=False)
+                    return
+                raise
+            self._esperar_cupo(mensajes)
+            emitido, error, registrado = False, None, False
+            try:
+                with closing(self._fragmentos(mensajes, kwargs)) as fragmentos:
+                    try:
+                        for chunk in fragmentos:
+                            emitido = True
+                            yield chunk
+                    except Exception as e:
+                        if emitido or not es_transitorio(e) or intento == self.max_intentos:
+                            registrado = True
+                            if es_transitorio(e):
+                                self.circuito.fallo()
+                            else:
+                                self.circuito.exito()
+                            raise
+                        error = e
+                registrado = True
+            finally:
+                if not registrado:
+                    # el consumidor cerró el generador (GeneratorExit) o algo ajeno lo cortó: si el modelo
+                    # ya respondía, cuenta como éxito; si no, se suelta la sonda para no trabar el circuito
+                    if emitido:
+                        self.circuito.exito()
+                    else:
+                        self.circuito.soltar_sonda()
+            if error is None:
+                self.circuito.exito()
+                return
+            self.circuito.fallo()
+            contar("llm_reintentos", modelo=self.model, operacion="stream")
+            time.sleep(self._backoff(intento))
+
+
+class _SalidaEstructuradaDespachada:
+    def __init__(self, modelo: ModeloDespachado, schema, kwargs: dict):
+        self.modelo = modelo
+        self.schema = schema
+        self.kwargs = kwargs
+
+    def invoke(self, mensajes, **kwargs):
+        # se arma sobre el llm que atienda (el del modelo o el de su respaldo)
+        return self.modelo._llamar(
+            lambda llm: llm.with_structured_output(self.schema, **self.kwargs).invoke(mensajes, **kwargs),
+            mensajes,
+            "estructurada",
+        )
+
+
+class Despachador:
+    """
+    Punto único de acceso a los modelos: para(tarea) devuelve el modelo que atiende esa
+    tarea según RUTAS. Usado directamente (invoke, stream...) se comporta como el principal.
+    """
+
+    def __init__(self, principal: ModeloDespachado, ligero: ModeloDespachado | None = None, rutas: dict | None = None):
+        self.modelos = {"principal": principal, "ligero": ligero or principal}
+        self.rutas = {**RUTAS, **(rutas or {})}
+        if ligero is not None and ligero is not principal:
+            # con un circuito abierto, la tarea sigue atendida por el otro modelo (degradada, pero atendida)
+            principal.respaldo, ligero.respaldo = ligero, principal
+
+    def para(self, tarea: str) -> ModeloDespachado:
+        return self.modelos[self.rutas.get(tarea, "principal")]
+
+    def __getattr__(self, nombre):
+        return getattr(self.modelos["principal"], nombre)
+
+    def estado(self) -> dict:
+        return {
+            nivel: {"modelo": m.model, "circuito": m.circuito.estado, "fallos": m.circuito.fallos}
+            for nivel, m in self.modelos.items()
+        }
+
+
+def _float_env(nombre: str, por_defecto: float | None) -> float | None:
+    valor = os.getenv(nombre, "").strip()
+    return float(valor) if valor else por_defecto
+
+
+def crear_despachador(fabrica) -> Despachador:
+    """
+    `fabrica(nombre_modelo)` crea el chat model. Los límites salen del .env (LLM_*) y se
+    aplican por modelo, como las cuotas de la API.
+    """
+    opciones = dict(
+        rpm=_float_env("LLM_RPM", 1000),
+        tpm=_float_env("LLM_TPM", 1_000_000),
+        concurrencia=int(_float_env("LLM_CONCURRENCIA", 16)),
+        max_intentos=int(_float_env("LLM_MAX_INTENTOS", 4)),
+        timeout=_float_env("LLM_TIMEOUT", 60) or None,
+        timeout_primer_fragmento=_float_env("LLM_TIMEOUT_PRIMER_FRAGMENTO", None),
+        timeout_inactividad=_float_env("LLM_TIMEOUT_INACTIVIDAD", 20) or None,
+        cobertura=_float_env("LLM_COBERTURA", None),
+    )
+    nombre = os.getenv("LLM_MODELO", "gemini-2.5-flash")
+    nombre_ligero = os.getenv("LLM_MODELO_LIGERO", "gemini-2.5-flash-lite").strip()
+    principal = ModeloDespachado(fabrica(nombre), nombre, **opciones)
+    ligero = None
+    if nombre_ligero and nombre_ligero != nombre:
+        ligero = ModeloDespachado(fabrica(nombre_ligero), nombre_ligero, **opciones)
+    return Despachador(principal, ligero)
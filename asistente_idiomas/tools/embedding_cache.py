@@ -0,0 +1,158 @@
+# asistente_idiomas/tools/embedding_cache.py
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from langchain_core.embeddings import Embeddings
+from asistente_idiomas.utils.metricas import span, contar
+
+CACHE_FILE = "data/embeddings_cache.db"
+
+
+class EmbeddingCache(Embeddings):
+    """
+    Caché persistente de embeddings delante de cualquier modelo de LangChain.
+    Las claves son (modelo, hash del texto) y los vectores se guardan como float32.
+    Solo los textos que no están en caché se envían al modelo, en un único lote.
+    """
+
+    def __init__(self, modelo: Embeddings, nombre_modelo: str, ruta: str = CACHE_FILE, max_entradas: int = 200_000):
+        self.modelo = modelo
+        self.nombre_modelo = nombre_modelo
+        self.max_entradas = max_entradas
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                modelo TEXT NOT NULL,
+                texto_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                ultimo_uso REAL NOT NULL,
+                PRIMARY KEY (modelo, texto_hash)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_uso ON embeddings (ultimo_uso)")
+        self._conn.commit()
+
+    # ---------- helpers ----------
+    @staticmethod
+    def _hash(texto: str) -> str:
+        return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _a_blob(vector) -> bytes:
+        return array("f", vector).tobytes()
+
+    @staticmethod
+    def _desde_blob(blob: bytes) -> list[float]:
+        vector = array("f")
+        vector.frombytes(blob)
+        return vector.tolist()
+
+    def _leer(self, modelo: str, hashes: list[str]) -> dict:
+        encontrados = {}
+        # SQLite limita la cantidad de parámetros por consulta
+        for i in range(0, len(hashes), 500):
+            lote = hashes[i:i + 500]
+            marcas = ",".join("?" * len(lote))
+            filas = self._conn.execute(
+                f"SELECT texto_hash, vector FROM embeddings WHERE modelo = ? AND texto_hash IN ({marcas})",
+                [modelo, *lote],
+            ).fetchall()
+            encontrados.update({h: self._desde_blob(blob) for h, blob in filas})
+        if encontrados:
+            ahora = time.time()
+            self._conn.executemany(
+                "UPDATE embeddings SET ultimo_uso = ? WHERE modelo = ? AND texto_hash = ?",
+                [(ahora, modelo, h) for h in encontrados],
+            )
+        return encontrados
+
+    def _guardar(self, modelo: str, pares: list[tuple[str, list[float]]]):
+        ahora = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (modelo, texto_hash, vector, ultimo_uso) VALUES (?, ?, ?, ?)",
+            [(modelo, h, self._a_blob(v), ahora) for h, v in pares],
+        )
+        self._evictar()
+
+    def _evictar(self):
+        """Elimina las entradas usadas hace más tiempo si se supera max_entradas (LRU)."""
+        total = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        sobrantes = total - self.max_entradas
+        if sobrantes > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY ultimo_uso ASC LIMIT ?)",
+                (sobrantes,),
+            )
+
+    def _embeber(self, modelo: str, texts: list[str], embeber_remoto) -> list[list[float]]:
+        hashes = [self._hash(t) for t in texts]
+        with self._lock:
+            encontrados = self._leer(modelo, list(set(hashes)))
+            self._conn.commit()
+
+        # textos faltantes (sin repetir) -> una sola llamada en lote al modelo
+        faltantes = {}
+        for h, t in zip(hashes, texts):
+            if h not in encontrados and h not in faltantes:
+                faltantes[h] = t
+        aciertos = len(texts) - sum(1 for h in hashes if h in faltantes)
+        self.hits += aciertos
+        self.misses += len(texts) - aciertos
+        tipo = "consulta" if modelo.endswith("#query") else "documento"
+        contar("embeddings_cache", aciertos, resultado="hit", tipo=tipo)
+        contar("embeddings_cache", len(texts) - aciertos, resultado="miss", tipo=tipo)
+
+        if faltantes:
+            with span("embeddings", tipo=tipo):
+                vectores = embeber_remoto(list(faltantes.values()))
+            contar("embeddings_textos", len(faltantes), tipo=tipo)
+            nuevos = list(zip(faltantes.keys(), vectores))
+            with self._lock:
+                self._guardar(modelo, nuevos)
+                self._conn.commit()
+            # devolvemos lo mismo que devolvería una lectura posterior (float32)
+            encontrados.update({h: self._desde_blob(self._a_blob(v)) for h, v in nuevos})
+
+        return [encontrados[h] for h in hashes]
+
+    def _embeber_consultas_remoto(self, texts: list[str]) -> list[list[float]]:
+        if len(texts) == 1:
+            return [self.modelo.embed_query(texts[0])]
+        try:
+            # GoogleGenerativeAIEmbeddings acepta task_type para embeber consultas en lote
+            return self.modelo.embed_documents(texts, task_type="RETRIEVAL_QUERY")
+        except TypeError:
+            return [self.modelo.embed_query(t) for t in texts]
+
+    # ---------- API de Embeddings ----------
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._embeber(self.nombre_modelo, texts, self.modelo.embed_documents)
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embeddings de varias consultas con una sola llamada remota para los faltantes."""
+        # las consultas se embeben con otro task type que los documentos: clave aparte
+        return self._embeber(f"{self.nombre_modelo}#query", texts, self._embeber_consultas_remoto)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_queries([text])[0]
+
+    def estadisticas(self) -> dict:
+        """Devuelve los contadores de aciertos/fallos de la caché."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,184 @@
+# asistente_idiomas/tools/glosario.py
+import re
+import unicodedata
+from dataclasses import dataclass, field
+
+# "verbo. Expresar confusión..." -> categoría gramatical + definición
+_PATRON_CATEGORIA = re.compile(
+    r"^(verbo|sustantivo|adjetivo|adverbio|expresi[oó]n|pronombre|preposici[oó]n|conjunci[oó]n|interjecci[oó]n)\.\s*",
+    re.IGNORECASE,
+)
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas, sin acentos ni signos de puntuación: 'Qué tal?' -> 'que tal'."""
+    texto = texto.replace("’", "'").replace("‘", "'").lower()
+    texto = unicodedata.normalize("NFKD", texto)
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = re.sub(r"[^\w\s'-]", " ", texto)
+    return re.sub(r"\s+", " ", texto).strip(" '-")
+
+
+@dataclass
+class EntradaGlosario:
+    """Una entrada del glosario: 'termino → traduccion' más sus líneas de ejemplo."""
+    termino: str
+    traduccion: str
+    source: str
+    seccion: str = ""
+    categoria: str = ""
+    ejemplos: list[str] = field(default_factory=list)
+
+    def texto(self) -> str:
+        lineas = [f"- {self.termino} → {self.traduccion}"]
+        lineas += [f"  {e}" for e in self.ejemplos]
+        return "\n".join(lineas)
+
+
+def parsear_glosario(texto: str, source: str, sueltas: list | None = None) -> list[EntradaGlosario]:
+    """
+    Recorre un archivo de conocimiento y devuelve sus entradas.
+    Reconoce '## secciones', líneas 'termino → traduccion' (con o sin '- ')
+    y las líneas indentadas siguientes (Ejemplo: ..., (traducción)).
+    Si se pasa `sueltas`, se le agregan (seccion, linea) las líneas que no son de ninguna entrada.
+    """
+    entradas = []
+    seccion = ""
+    actual = None
+
+    for linea in texto.splitlines():
+        limpia = linea.strip()
+        if not limpia:
+            continue
+        if limpia.startswith("#"):
+            seccion = limpia.lstrip("#").strip()
+            actual = None
+            continue
+        if limpia.strip("-") == "":
+            actual = None  # separador '---'
+            continue
+
+        if "→" in limpia:
+            termino, _, traduccion = limpia.lstrip("-* ").partition("→")
+            termino = termino.strip().strip("“”\"")
+            traduccion = traduccion.strip()
+            match = _PATRON_CATEGORIA.match(traduccion)
+            actual = EntradaGlosario(
+                termino=termino,
+                traduccion=traduccion,
+                source=source,
+                seccion=seccion,
+                categoria=match.group(1).lower() if match else "",
+            )
+            entradas.append(actual)
+        elif actual is not None and linea[:1].isspace():
+            # línea indentada bajo una entrada: ejemplo o traducción del ejemplo
+            actual.ejemplos.append(limpia)
+        else:
+            actual = None
+            if sueltas is not None:
+                sueltas.append((seccion, limpia))
+
+    return entradas
+
+
+class _NodoTrie:
+    __slots__ = ("hijos", "clave")
+
+    def __init__(self):
+        self.hijos = {}
+        self.clave = None  # término normalizado que termina en este nodo
+
+
+class IndiceGlosario:
+    """
+    Índice léxico en memoria sobre las entradas del glosario:
+    mapa hash de términos normalizados + trie de prefijos.
+    """
+
+    def __init__(self):
+        self.terminos: dict[str, list[EntradaGlosario]] = {}
+        self.idiomas: dict[str, str] = {}  # source -> idioma de sus términos (para filtrar por idioma)
+        self._raiz = _NodoTrie()
+
+    def __len__(self):
+        return len(self.terminos)
+
+    def _indexar(self, clave: str, entrada: EntradaGlosario):
+        if not clave:
+            return
+        self.terminos.setdefault(clave, [])
+        if entrada not in self.terminos[clave]:
+            self.terminos[clave].append(entrada)
+        nodo = self._raiz
+        for c in clave:
+            nodo = nodo.hijos.setdefault(c, _NodoTrie())
+        nodo.clave = clave
+
+    def agregar(self, entrada: EntradaGlosario):
+        # "mother / mom" -> se indexan ambas variantes
+        for variante in entrada.termino.split("/"):
+            self._indexar(normalizar(variante), entrada)
+        # sin categoría gramatical la traducción también es corta: se indexa en ambos sentidos
+        if not entrada.categoria:
+            for variante in entrada.traduccion.split("/"):
+                self._indexar(normalizar(variante), entrada)
+
+    def agregar_texto(self, texto: str, source: str):
+        for entrada in parsear_glosario(texto, source):
+            self.agregar(entrada)
+
+    def buscar_prefijo(self, prefijo: str, limite: int = 5) -> list[str]:
+        """Términos indexados que empiezan con el prefijo dado."""
+        nodo = self._raiz
+        for c in normalizar(prefijo):
+            nodo = nodo.hijos.get(c)
+            if nodo is None:
+                return []
+        encontrados, pila = [], [nodo]
+        while pila and len(encontrados) < limite:
+            nodo = pila.pop()
+            if nodo.clave:
+                encontrados.append(nodo.clave)
+            pila.extend(nodo.hijos[c] for c in sorted(nodo.hijos, reverse=True))
+        return encontrados
+
+    def _raiz_mas_larga(self, clave: str) -> str | None:
+        """Término indexado más largo que es prefijo de la clave ('florblined' -> 'florblin')."""
+        nodo, mejor = self._raiz, None
+        for c in clave:
+            nodo = nodo.hijos.get(c)
+            if nodo is None:
+                break
+            if nodo.clave:
+                mejor = nodo.clave
+        return mejor
+
+    def buscar(self, palabra: str, idioma: str | None = None) -> list[EntradaGlosario]:
+        """
+        Coincidencia exacta; si no hay, prueba formas flexionadas ('mirged')
+        y prefijos inequívocos ('florb'). Devuelve [] si no hay nada confiable.
+        Con `idioma`, solo entradas de archivos de ese idioma.
+        """
+        entradas = self._buscar(palabra)
+        if idioma is None:
+            return entradas
+        return [e for e in entradas if self.idiomas.get(e.source, idioma) == idioma]
+
+    def _buscar(self, palabra: str) -> list[EntradaGlosario]:
+        clave = normalizar(palabra)
+        if not clave:
+            return []
+        if clave in self.terminos:
+            return list(self.terminos[clave])
+        if len(clave) < 4:
+            return []
+
+        raiz = self._raiz_mas_larga(clave)
+        if raiz and len(raiz) >= 4 and len(clave) - len(raiz) <= 3:
+            return list(self.terminos[raiz])
+
+        candidatos = self.buscar_prefijo(clave, limite=2)
+        if len(candidatos) == 1:
+            return list(self.terminos[candidatos[0]])
+        return []
@@ -0,0 +1,232 @@
+# asistente_idiomas/tools/notion_outbox.py
+import os
+import json
+import time
+import random
+import sqlite3
+import hashlib
+import threading
+
+OUTBOX_FILE = "data/notion_outbox.db"
+
+
+def clave_idempotencia(datos: dict) -> str:
+    """Misma palabra + idioma + fecha -> misma clave: encolarla dos veces no duplica la página."""
+    base = "|".join(str(datos.get(c, "")).strip().lower() for c in ("palabra", "idioma", "fecha"))
+    return hashlib.sha256(base.encode("utf-8")).hexdigest()
+
+
+def _contenido(datos: dict) -> list[str]:
+    """Lo que termina en la página: si cambia, el registro es una corrección y hay que reenviarlo."""
+    return [str(datos.get(c, "")).strip().lower() for c in ("palabra", "traduccion", "ejemplo", "idioma", "fecha")]
+
+
+def _enviar_a_notion(datos: dict) -> str:
+    # import diferido: el outbox no necesita el cliente de Notion hasta enviar
+    from asistente_idiomas.tools.notion_tool import buscar_registro, crear_pagina_notion, actualizar_pagina_notion
+    campos = [datos.get(c, "") for c in ("palabra", "traduccion", "ejemplo", "idioma", "fecha")]
+    # se vuelve a consultar el índice al enviar: la página pudo crearse mientras esto esperaba en la cola
+    page_id = datos.get("page_id") or buscar_registro(datos.get("palabra", ""), datos.get("idioma", ""))
+    if page_id:
+        return actualizar_pagina_notion(page_id, *campos)
+    return crear_pagina_notion(*campos)
+
+
+class NotionOutbox:
+    """
+    Cola persistente (SQLite) de registros pendientes de enviar a Notion.
+    El grafo solo encola; un hilo en segundo plano vacía la cola respetando
+    el límite de Notion (~3 req/s) y reintenta con backoff exponencial.
+    Nada se pierde si Notion está caído: las filas quedan 'pendiente'. Tras max_intentos
+    pasan a 'fallido', pero el worker las sigue reintentando cada backoff_max segundos
+    y flush() las vuelve a poner en 'pendiente'.
+    """
+
+    def __init__(
+        self,
+        ruta: str = OUTBOX_FILE,
+        enviar=_enviar_a_notion,
+        max_por_segundo: float = 3.0,
+        tam_lote: int = 10,
+        max_intentos: int = 8,
+        backoff_base: float = 2.0,
+        backoff_max: float = 300.0,
+    ):
+        self.enviar = enviar
+        self.intervalo_min = 1.0 / max_por_segundo
+        self.tam_lote = tam_lote
+        self.max_intentos = max_intentos
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._ultimo_envio = 0.0
+
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                clave TEXT NOT NULL UNIQUE,
+                payload TEXT NOT NULL,
+                estado TEXT NOT NULL DEFAULT 'pendiente',
+                intentos INTEGER NOT NULL DEFAULT 0,
+                proximo_intento REAL NOT NULL DEFAULT 0,
+                creado REAL NOT NULL,
+                actualizado REAL NOT NULL,
+                resultado TEXT,
+                error TEXT
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_estado ON outbox (estado, proximo_intento)")
+        self._conn.commit()
+
+    # ---------- productor ----------
+    def encolar(self, datos: dict) -> tuple[str, str]:
+        """
+        Guarda el registro en la cola. Devuelve (clave, resultado):
+        - 'nuevo': primera vez de esa palabra ese día;
+        - 'actualizado': corrige el registro del día (si ya se había enviado, se reenvía);
+        - 'en_cola': ya había uno idéntico esperando su envío;
+        - 'enviado': ya se había enviado uno idéntico, no hay nada que hacer.
+        """
+        clave = clave_idempotencia(datos)
+        payload = json.dumps(datos, ensure_ascii=False)
+        ahora = time.time()
+        with self._lock:
+            fila = self._conn.execute("SELECT payload, estado FROM outbox WHERE clave = ?", (clave,)).fetchone()
+            if fila is None:
+                self._conn.execute(
+                    "INSERT INTO outbox (clave, payload, creado, actualizado) VALUES (?, ?, ?, ?)",
+                    (clave, payload, ahora, ahora),
+                )
+                resultado = "nuevo"
+            elif _contenido(json.loads(fila[0])) == _contenido(datos):
+                resultado = "enviado" if fila[1] == "enviado" else "en_cola"
+            else:
+                self._conn.execute(
+                    "UPDATE outbox SET payload = ?, estado = 'pendiente', intentos = 0, proximo_intento = 0, "
+                    "resultado = NULL, error = NULL, actualizado = ? WHERE clave = ?",
+                    (payload, ahora, clave),
+                )
+                resultado = "actualizado"
+            self._conn.commit()
+        if resultado in ("nuevo", "actualizado"):
+            self._despertar.set()
+        return clave, resultado
+
+    # ---------- consumidor ----------
+    def _esperar_turno(self):
+        """Limitador simple: como mucho max_por_segundo envíos por segundo."""
+        espera = self._ultimo_envio + self.intervalo_min - time.monotonic()
+        if espera > 0:
+            time.sleep(espera)
+        self._ultimo_envio = time.monotonic()
+
+    def _backoff(self, intentos: int) -> float:
+        # exponencial con jitter para no sincronizar reintentos
+        return min(self.backoff_max, self.backoff_base ** intentos) * random.uniform(0.5, 1.0)
+
+    def drenar(self) -> int:
+        """Envía un lote de registros listos para enviarse. Devuelve cuántos se procesaron."""
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT id, payload, intentos FROM outbox "
+                "WHERE estado IN ('pendiente', 'fallido') AND proximo_intento <= ? ORDER BY id LIMIT ?",
+                (time.time(), self.tam_lote),
+            ).fetchall()
+
+        for id_fila, payload, intentos in filas:
+            if self._detener.is_set():
+                break
+            self._esperar_turno()
+            try:
+                resultado = self.enviar(json.loads(payload))
+                cambios = ("enviado", intentos + 1, 0, str(resultado), None)
+            except Exception as e:
+                intentos += 1
+                estado = "fallido" if intentos >= self.max_intentos else "pendiente"
+                # un 'fallido' no es definitivo: se reintenta con el backoff ya en su tope
+                espera = self.backoff_max if estado == "fallido" else self._backoff(intentos)
+                cambios = (estado, intentos, time.time() + espera, None, str(e))
+                print(f"⚠️ Notion: intento {intentos} fallido ({e}); estado -> {estado}")
+            # si se corrigió mientras se enviaba, la fila queda pendiente con el payload nuevo
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE outbox SET estado = ?, intentos = ?, proximo_intento = ?, resultado = ?, "
+                    "error = ?, actualizado = ? WHERE id = ? AND payload = ?",
+                    (*cambios, time.time(), id_fila, payload),
+                )
+                self._conn.commit()
+        return len(filas)
+
+    def _ciclo(self, intervalo: float):
+        while not self._detener.is_set():
+            self._despertar.clear()
+            try:
+                procesados = self.drenar()
+            except Exception as e:
+                print(f"⚠️ Error en el worker del outbox de Notion: {e}")
+                procesados = 0
+            if not procesados:
+                self._despertar.wait(intervalo)
+
+    def iniciar(self, intervalo: float = 2.0):
+        """Arranca el hilo que vacía la cola en segundo plano."""
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._ciclo, args=(intervalo,), name="notion-outbox", daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout: float = 5.0):
+        self._detener.set()
+        self._despertar.set()
+        if self._hilo:
+            self._hilo.join(timeout)
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """
+        Reintenta YA todo lo pendiente y lo fallido (ignorando el backoff) hasta vaciar
+        la cola o agotar el timeout. Devuelve True si no quedó nada pendiente.
+        """
+        with self._lock:
+            self._conn.execute("UPDATE outbox SET proximo_intento = 0 WHERE estado = 'pendiente'")
+            # los fallidos vuelven a la cola con sus intentos en cero
+            self._conn.execute(
+                "UPDATE outbox SET estado = 'pendiente', intentos = 0, proximo_intento = 0 WHERE estado = 'fallido'"
+            )
+            self._conn.commit()
+        limite = time.time() + timeout
+        while time.time() < limite:
+            if self._hilo and self._hilo.is_alive():
+                self._despertar.set()
+                time.sleep(0.1)
+            elif not self.drenar():
+                time.sleep(0.1)
+            if self.estado()["pendiente"] == 0:
+                return True
+        return False
+
+    def estado(self) -> dict:
+        """Cantidad de registros por estado y los últimos errores."""
+        with self._lock:
+            conteos = dict(self._conn.execute("SELECT estado, COUNT(*) FROM outbox GROUP BY estado").fetchall())
+            errores = self._conn.execute(
+                "SELECT payload, error FROM outbox WHERE error IS NOT NULL AND estado != 'enviado' "
+                "ORDER BY actualizado DESC LIMIT 3"
+            ).fetchall()
+        return {
+            "pendiente": conteos.get("pendiente", 0),
+            "enviado": conteos.get("enviado", 0),
+            "fallido": conteos.get("fallido", 0),
+            "ultimos_errores": [
+                f"{json.loads(payload).get('palabra', '?')}: {error}" for payload, error in errores
+            ],
+        }
@@ -1,16 +1,112 @@
 import os
-from notion_client import Client
+import threading
 from datetime import datetime
 from dotenv import load_dotenv
+from asistente_idiomas.tools.glosario import normalizar
+from asistente_idiomas.utils.metricas import span, evento
 
 # 🧩 Carga las variables del entorno (.env)
 load_dotenv()
 
-# ✅ Inicializa el cliente de Notion
+# ✅ Cliente de Notion: se crea en el primer uso, no al importar el módulo
 NOTION_TOKEN = os.getenv("NOTION_TOKEN")
 NOTION_DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
 
-notion = Client(auth=NOTION_TOKEN)
+_notion = None
+_lock_cliente = threading.Lock()
+
+
+def cliente_notion():
+    global _notion
+    with _lock_cliente:
+        if _notion is None:
+            from notion_client import Client
+            _notion = Client(auth=NOTION_TOKEN)
+    return _notion
+
+
+# 🗂️ Índice local de palabras ya registradas: (palabra, idioma) normalizados -> ID de página
+_registradas: dict[tuple[str, str], str] = {}
+_lock_registradas = threading.Lock()
+
+
+def _clave_registro(palabra: str, idioma: str) -> tuple[str, str]:
+    return normalizar(palabra), normalizar(idioma)
+
+
+def _texto_propiedad(propiedad: dict) -> str:
+    """Texto plano de una propiedad title/rich_text devuelta por la API."""
+    fragmentos = propiedad.get("title") or propiedad.get("rich_text") or []
+    return "".join(f.get("plain_text", "") for f in fragmentos)
+
+
+def cargar_registradas() -> int:
+    """
+    Recorre (paginado) la base de Notion y llena el índice local de palabras registradas.
+    Se llama una vez al iniciar; después lo mantienen crear_pagina_notion y actualizar_pagina_notion.
+    """
+    cursor = None
+    total = 0
+    while True:
+        kwargs = {"database_id": NOTION_DATABASE_ID, "page_size": 100}
+        if cursor:
+            kwargs["start_cursor"] = cursor
+        with span("notion", operacion="databases.query"):
+            respuesta = cliente_notion().databases.query(**kwargs)
+        with _lock_registradas:
+            for pagina in respuesta.get("results", []):
+                props = pagina.get("properties", {})
+                palabra = _texto_propiedad(props.get("Palabra", {}))
+                idioma = _texto_propiedad(props.get("Idioma", {}))
+                if palabra:
+                    _registradas[_clave_registro(palabra, idioma)] = pagina["id"]
+                    total += 1
+        if not respuesta.get("has_more"):
+            break
+        cursor = respuesta.get("next_cursor")
+    print(f"🗂️ Índice de Notion cargado: {total} palabras registradas.")
+    return total
+
+
+def buscar_registro(palabra: str, idioma: str) -> str | None:
+    """ID de la página si la palabra ya está registrada en ese idioma (sin llamar a la red)."""
+    return _registradas.get(_clave_registro(palabra, idioma))
+
+
+def _propiedades(palabra: str, traduccion: str, ejemplo: str, idioma: str, fecha: str) -> dict:
+    # Si la fecha viene como string, convertirla a formato ISO
+    fecha_iso = datetime.fromisoformat(fecha).date().isoformat() if fecha else datetime.now().date().isoformat()
+    return {
+        "Palabra": {"title": [{"text": {"content": palabra[:2000]}}]},
+        "Traducción": {"rich_text": [{"text": {"content": traduccion[:2000]}}]},
+        "Ejemplo de uso": {"rich_text": [{"text": {"content": ejemplo[:2000]}}]},
+        "Idioma": {"rich_text": [{"text": {"content": idioma[:2000]}}]},
+        "Fecha": {"date": {"start": fecha_iso}},
+    }
+
+
+def crear_pagina_notion(palabra: str, traduccion: str, ejemplo: str, idioma: str, fecha: str) -> str:
+    """
+    Crea la página en la base de Notion y devuelve su ID.
+    A diferencia de guardar_en_notion, propaga los errores (lo usa el outbox para reintentar).
+    """
+    with span("notion", operacion="pages.create"):
+        response = cliente_notion().pages.create(
+            parent={"database_id": NOTION_DATABASE_ID},
+            properties=_propiedades(palabra, traduccion, ejemplo, idioma, fecha),
+        )
+    with _lock_registradas:
+        _registradas[_clave_registro(palabra, idioma)] = response["id"]
+    return response["id"]
+
+
+def actualizar_pagina_notion(page_id: str, palabra: str, traduccion: str, ejemplo: str, idioma: str, fecha: str) -> str:
+    """Actualiza una página existente en lugar de crear otra fila para la misma palabra."""
+    with span("notion", operacion="pages.update"):
+        cliente_notion().pages.update(page_id=page_id, properties=_propiedades(palabra, traduccion, ejemplo, idioma, fecha))
+    with _lock_registradas:
+        _registradas[_clave_registro(palabra, idioma)] = page_id
+    return page_id
 
 
 def guardar_en_notion(palabra: str, traduccion: str, ejemplo: str, idioma: str, fecha: str):
@@ -19,20 +115,12 @@ def guardar_en_notion(palabra: str, traduccion: str, ejemplo: str, idioma: str,
     Palabra, Traducción, Ejemplo de uso, Idioma, Fecha de estudio.
     """
     try:
-        # Si la fecha viene como string, convertirla a formato ISO
-        fecha_iso = datetime.fromisoformat(fecha).date().isoformat() if fecha else datetime.now().date().isoformat()
-
-        response = notion.pages.create(
-            parent={"database_id": NOTION_DATABASE_ID},
-            properties={
-                "Palabra": {"title": [{"text": {"content": palabra[:2000]}}]},
-                "Traducción": {"rich_text": [{"text": {"content": traduccion[:2000]}}]},
-                "Ejemplo de uso": {"rich_text": [{"text": {"content": ejemplo[:2000]}}]},
-                "Idioma": {"rich_text": [{"text": {"content": idioma[:2000]}}]},
-                "Fecha": {"date": {"start": fecha_iso}},
-            }
-        )
-        return f"✅ Registro guardado en Notion (ID: {response['id']})"
+        page_id = buscar_registro(palabra, idioma)
+        if page_id:
+            actualizar_pagina_notion(page_id, palabra, traduccion, ejemplo, idioma, fecha)
+            return f"✅ Registro actualizado en Notion (ID: {page_id})"
+        page_id = crear_pagina_notion(palabra, traduccion, ejemplo, idioma, fecha)
+        return f"✅ Registro guardado en Notion (ID: {page_id})"
     except Exception as e:
-        print(f"\nDEBUG: Error al guardar en Notion -> {e}\n")
+        evento("notion.error_guardado", nivel="error", palabra=palabra, error=str(e))
         return f"❌ Error al guardar en Notion: {e}"
@@ -6,14 +6,40 @@ warnings.filterwarnings("ignore", category=DeprecationWarning)
 import json
 import hashlib
 import shutil
+import threading
 from dotenv import load_dotenv
-from langchain.schema import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from asistente_idiomas.tools.glosario import IndiceGlosario, parsear_glosario
+from asistente_idiomas.tools.bm25 import IndiceBM25, tiene_terminos_significativos
+from asistente_idiomas.tools.chunker import CHUNKER_VERSION, IDIOMA_ORIGEN, dividir, detectar_par_idiomas
+from asistente_idiomas.utils.metricas import span, contar
 
-FINGERPRINT_FILE = "data/chroma_db/_docs_fingerprint.json"
+FINGERPRINT_NAME = "_docs_fingerprint.json"
+UMBRAL_NAME = "_umbral.json"  # umbral de similitud calibrado (utils/calibrar_umbral.py)
+# backend de vectores -> carpeta donde persiste (RAG_BACKEND en el .env elige uno)
+PERSIST_DIRS = {
+    "chroma": "data/chroma_db",
+    "numpy": "data/numpy_db",
+}
+EMBEDDING_MODEL = "models/gemini-embedding-001"
+KNOWLEDGE_DIR = "asistente_idiomas/knowledge"
 vectorstore = None  # variable global
+indice_lexico = None  # índice exacto del glosario (sin embeddings)
+indices_bm25 = None  # idioma -> BM25 sobre los chunks de ese idioma (los mismos del vectorstore)
+_embeddings = None
+_pendiente = None  # (backend, persist_dir) de un vectorstore al día que aún no se abrió
+_indice_pendiente = False  # el índice léxico se construye en el primer uso
+_lock_carga = threading.Lock()
+_lock_indice = threading.Lock()  # aparte: el índice léxico no espera a que abra Chroma
+_lock_bm25 = threading.Lock()
+_persist_dir = None  # carpeta del backend activo
+_umbral = None
+_huella = None  # hash del fingerprint del conocimiento indexado
+TOP_K = 3
+CANDIDATOS = 10  # candidatos de cada ranking antes de fusionar
+RRF_K = 60  # constante de reciprocal rank fusion
+UMBRAL_SIMILITUD = 0.70  # similitud coseno mínima si no hay calibración ni RAG_UMBRAL_SIMILITUD
+COBERTURA_MINIMA = 0.5  # fracción de la consulta que un chunk debe contener para aceptarse por BM25
 
 def setup_environment():
     load_dotenv()
@@ -21,8 +47,8 @@ def setup_environment():
         raise ValueError("La variable GEMINI_API_KEY no está configurada en el archivo .env")
     print("✅ Variables de entorno cargadas correctamente.")
 
-def load_documents() -> list[Document]:
-    knowledge_dir = "asistente_idiomas/knowledge"
+def load_documents(verbose: bool = True) -> list[Document]:
+    knowledge_dir = KNOWLEDGE_DIR
     if not os.path.exists(knowledge_dir):
         raise FileNotFoundError(f"No se encontró la carpeta: {knowledge_dir}")
 
@@ -37,16 +63,44 @@ def load_documents() -> list[Document]:
                 if text:
                     documents.append(Document(page_content=text, metadata={"source": filename}))
                     total_chars += len(text)
-                    print(f"📘 Documento cargado: {filename} ({len(text)} caracteres)")
+                    if verbose:
+                        print(f"📘 Documento cargado: {filename} ({len(text)} caracteres)")
                 else:
                     print(f"⚠️ Archivo vacío omitido: {filename}")
 
     if not documents:
         raise ValueError("No se encontraron archivos .txt con contenido en la carpeta 'knowledge'.")
 
-    print(f"📚 Total de documentos cargados: {len(documents)} ({total_chars} caracteres en total)")
+    if verbose:
+        print(f"📚 Total de documentos cargados: {len(documents)} ({total_chars} caracteres en total)")
     return documents
 
+def construir_indice_lexico(docs: list[Document], verbose: bool = True) -> IndiceGlosario:
+    """Parsea las entradas 'termino → traduccion' de los documentos en un índice en memoria."""
+    indice = IndiceGlosario()
+    for doc in docs:
+        source = doc.metadata.get("source", "sin fuente")
+        entradas = parsear_glosario(doc.page_content, source)
+        for entrada in entradas:
+            indice.agregar(entrada)
+        indice.idiomas[source] = detectar_par_idiomas(entradas)[0]
+    if verbose:
+        print(f"🔤 Índice léxico construido: {len(indice)} términos.")
+    return indice
+
+def _crear_embeddings():
+    """Gemini embeddings detrás de la caché en disco (imports pesados: solo al primer uso)."""
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    from asistente_idiomas.tools.embedding_cache import EmbeddingCache
+    # los embeddings pasan por una caché en disco: solo se paga por textos nuevos
+    return EmbeddingCache(
+        GoogleGenerativeAIEmbeddings(
+            model=EMBEDDING_MODEL,
+            google_api_key=os.getenv("GEMINI_API_KEY")
+        ),
+        nombre_modelo=EMBEDDING_MODEL,
+    )
+
 # ---------- fingerprint helpers ----------
 def _file_hash(path: str) -> str:
     h = hashlib.sha256()
@@ -60,60 +114,74 @@ def _file_hash(path: str) -> str:
 
 def _compute_docs_fingerprint(knowledge_dir: str) -> dict:
     files = sorted([f for f in os.listdir(knowledge_dir) if f.endswith(".txt")])
-    fp = {}
+    fp = {"_chunker": CHUNKER_VERSION}  # las claves con "_" no son archivos
     for fn in files:
         path = os.path.join(knowledge_dir, fn)
         fp[fn] = _file_hash(path)
     return fp
 
-def _read_saved_fingerprint() -> dict | None:
-    if os.path.exists(FINGERPRINT_FILE):
+def _archivos(fp: dict) -> dict:
+    return {k: v for k, v in fp.items() if not k.startswith("_")}
+
+def _estado(fp: dict) -> dict:
+    """Claves con "_" que guardan estado de otras fuentes (p. ej. "_notion"), no de 'knowledge/'."""
+    return {k: v for k, v in fp.items() if k.startswith("_") and k != "_chunker"}
+
+def _conocimiento(fp: dict) -> dict:
+    """La parte del fingerprint que se compara con 'knowledge/': archivos y versión del chunker."""
+    estado = _estado(fp)
+    return {k: v for k, v in fp.items() if k not in estado}
+
+def _read_saved_fingerprint(persist_dir: str = PERSIST_DIRS["chroma"]) -> dict | None:
+    ruta = os.path.join(persist_dir, FINGERPRINT_NAME)
+    if os.path.exists(ruta):
         try:
-            with open(FINGERPRINT_FILE, "r", encoding="utf-8") as fh:
+            with open(ruta, "r", encoding="utf-8") as fh:
                 return json.load(fh)
         except Exception:
             return None
     return None
 
-def _save_fingerprint(fp: dict):
-    os.makedirs(os.path.dirname(FINGERPRINT_FILE), exist_ok=True)
-    with open(FINGERPRINT_FILE, "w", encoding="utf-8") as fh:
+def _save_fingerprint(fp: dict, persist_dir: str = PERSIST_DIRS["chroma"]):
+    os.makedirs(persist_dir, exist_ok=True)
+    with open(os.path.join(persist_dir, FINGERPRINT_NAME), "w", encoding="utf-8") as fh:
         json.dump(fp, fh, ensure_ascii=False, indent=2)
 
-# ---------- vectorstore creation / load ----------
-def create_or_load_vectorstore(docs, embedding_model, force_rebuild: bool = False):
-    # splitter apropiado para glosarios
-    splitter = RecursiveCharacterTextSplitter(
-        separators=["\n- ", "\n", ".", " "],
-        chunk_size=150,
-        chunk_overlap=20
-    )
-    splits = splitter.split_documents(docs)
+# ---------- chunk helpers ----------
+def _chunk_id(doc: Document) -> str:
+    """ID estable de un chunk: hash de su archivo de origen + contenido."""
+    source = (doc.metadata or {}).get("source", "")
+    return hashlib.sha256(f"{source}\n{doc.page_content}".encode("utf-8")).hexdigest()
 
-    persist_dir = "data/chroma_db"
-    knowledge_dir = "asistente_idiomas/knowledge"
-    current_fp = _compute_docs_fingerprint(knowledge_dir)
-    saved_fp = _read_saved_fingerprint()
+def _splits_con_ids(splits: list[Document]) -> tuple[list[Document], list[str]]:
+    """Asigna un ID por hash a cada chunk, descartando chunks repetidos."""
+    docs, ids, vistos = [], [], set()
+    for doc in splits:
+        cid = _chunk_id(doc)
+        if cid in vistos:
+            continue
+        vistos.add(cid)
+        docs.append(doc)
+        ids.append(cid)
+    return docs, ids
 
-    # decide si reconstruir
-    should_rebuild = force_rebuild
-    if not should_rebuild:
-        if saved_fp is None:
-            print("⚠️ No se encontró fingerprint previo: se reconstruirá vectorstore.")
-            should_rebuild = True
-        elif saved_fp != current_fp:
-            print("⚠️ Cambios detectados en 'knowledge/' -> se reconstruirá vectorstore.")
-            should_rebuild = True
-        else:
-            should_rebuild = False
-
-    if not should_rebuild and os.path.exists(persist_dir):
-        print("💾 Cargando vectorstore existente desde disco...")
+# ---------- vectorstore creation / load ----------
+def _abrir_vectorstore(backend: str, embedding_model, persist_dir: str):
+    if backend == "numpy":
+        from asistente_idiomas.tools.vector_numpy import NumpyVectorStore
+        return NumpyVectorStore(
+            embedding_function=embedding_model,
+            persist_directory=persist_dir,
+            dtype=os.getenv("RAG_NUMPY_DTYPE", "float32"),
+        )
+    if backend == "chroma":
+        # import diferido: Chroma es pesado y no hace falta con el backend numpy
+        from langchain_chroma import Chroma
         # algunos wrappers esperan embedding_function, otros embedding=modelo; esto funciona en la mayoría
-        vectorstore = Chroma(persist_directory=persist_dir, embedding_function=embedding_model)
-        return vectorstore
+        return Chroma(persist_directory=persist_dir, embedding_function=embedding_model)
+    raise ValueError(f"Backend de vectores desconocido: '{backend}'. Opciones: {', '.join(PERSIST_DIRS)}")
 
-    # Si llegamos acá, creamos el vectorstore nuevo
+def _reconstruir_vectorstore(splits, embedding_model, persist_dir: str, backend: str = "chroma"):
     if os.path.exists(persist_dir):
         # eliminar DB previa para evitar mezcla con embeddings antiguos
         try:
@@ -122,12 +190,9 @@ def create_or_load_vectorstore(docs, embedding_model, force_rebuild: bool = Fals
             print("⚠️ No se pudo eliminar el persist_dir previo:", e)
 
     print("🧠 Creando vectorstore nuevo (esto puede tardar un poco)...")
-    # from_documents suele crear y persistir según la versión
-    vectorstore = Chroma.from_documents(
-        documents=splits,
-        embedding=embedding_model,
-        persist_directory=persist_dir
-    )
+    docs, ids = _splits_con_ids(splits)
+    vectorstore = _abrir_vectorstore(backend, embedding_model, persist_dir)
+    vectorstore.add_documents(docs, ids=ids)
 
     # Algunas versiones antiguas/objetos tienen `.persist()`, otras no.
     if hasattr(vectorstore, "persist"):
@@ -136,46 +201,462 @@ def create_or_load_vectorstore(docs, embedding_model, force_rebuild: bool = Fals
         except Exception as e:
             print("⚠️ vectorstore.persist() falló:", e)
     else:
-        print("ℹ️ Nota: objeto Chroma no tiene método persist(); asumo que from_documents ya persistió la DB.")
+        print("ℹ️ Nota: objeto Chroma no tiene método persist(); asumo que add_documents ya persistió la DB.")
+    return vectorstore
+
+def _actualizar_vectorstore(vectorstore, splits, saved_fp: dict, current_fp: dict):
+    """
+    Reindexado incremental: solo toca los chunks de los archivos nuevos,
+    modificados o eliminados. Los chunks que no cambiaron conservan su vector.
+    """
+    saved_fp, current_fp = _archivos(saved_fp), _archivos(current_fp)
+    cambiados = {fn for fn, h in current_fp.items() if saved_fp.get(fn) != h}
+    eliminados = set(saved_fp) - set(current_fp)
+
+    # IDs que hoy existen en la DB para los archivos afectados
+    ids_existentes = set()
+    for fn in cambiados | eliminados:
+        ids_existentes.update(vectorstore.get(where={"source": fn}, include=[])["ids"])
+
+    # IDs que deberían existir según los archivos actuales
+    docs, ids = _splits_con_ids([d for d in splits if d.metadata.get("source") in cambiados])
+    nuevos = [(doc, cid) for doc, cid in zip(docs, ids) if cid not in ids_existentes]
+    obsoletos = ids_existentes - set(ids)
+
+    if obsoletos:
+        vectorstore.delete(ids=list(obsoletos))
+    if nuevos:
+        vectorstore.add_documents([doc for doc, _ in nuevos], ids=[cid for _, cid in nuevos])
 
-    # guardamos fingerprint
-    _save_fingerprint(current_fp)
-    print("✅ Vectorstore creado y fingerprint guardado.")
+    print(
+        f"🔁 Reindexado incremental: {len(cambiados)} archivo(s) modificado(s), "
+        f"{len(eliminados)} eliminado(s) -> {len(nuevos)} chunk(s) embebido(s), {len(obsoletos)} borrado(s)."
+    )
+    return vectorstore
+
+def _dividir(docs: list[Document]) -> list[Document]:
+    # un chunk por entrada del glosario (ver tools/chunker.py), sin cortes ni solapamiento
+    return dividir(docs)
+
+def create_or_load_vectorstore(docs, embedding_model, force_rebuild: bool = False, backend: str = "chroma"):
+    """docs puede ser None: los documentos solo se cargan y dividen si hay que (re)indexar."""
+    if backend not in PERSIST_DIRS:
+        raise ValueError(f"Backend de vectores desconocido: '{backend}'. Opciones: {', '.join(PERSIST_DIRS)}")
+    persist_dir = PERSIST_DIRS[backend]
+    current_fp = _compute_docs_fingerprint(KNOWLEDGE_DIR)
+    saved_fp = _read_saved_fingerprint(persist_dir)
+
+    # sin DB previa (o forzado) no hay nada que reutilizar: reconstrucción completa
+    otro_chunker = saved_fp is not None and saved_fp.get("_chunker") != CHUNKER_VERSION
+    if force_rebuild or saved_fp is None or otro_chunker or not os.path.exists(persist_dir):
+        if otro_chunker and not force_rebuild:
+            print(f"⚠️ El índice se creó con otro chunker: se reconstruirá con '{CHUNKER_VERSION}'.")
+        elif not force_rebuild:
+            print("⚠️ No se encontró fingerprint previo: se reconstruirá vectorstore.")
+        splits = _dividir(docs or load_documents())
+        vectorstore = _reconstruir_vectorstore(splits, embedding_model, persist_dir, backend)
+        _save_fingerprint(current_fp, persist_dir)
+        print("✅ Vectorstore creado y fingerprint guardado.")
+        return vectorstore
+
+    print(f"💾 Cargando vectorstore existente desde disco ({backend})...")
+    vectorstore = _abrir_vectorstore(backend, embedding_model, persist_dir)
+
+    if _conocimiento(saved_fp) != current_fp:
+        print("⚠️ Cambios detectados en 'knowledge/' -> se actualizarán solo los chunks afectados.")
+        splits = _dividir(docs or load_documents())
+        vectorstore = _actualizar_vectorstore(vectorstore, splits, saved_fp, current_fp)
+        # el estado de otras fuentes (Notion) sigue valiendo: sus chunks no se tocaron
+        _save_fingerprint({**_estado(saved_fp), **current_fp}, persist_dir)
+        print("✅ Vectorstore actualizado y fingerprint guardado.")
     return vectorstore
 
-def inicializar_rag(force_rebuild: bool = False):
-    global vectorstore
+def inicializar_rag(force_rebuild: bool = False, backend: str | None = None):
+    """
+    Carga el conocimiento y deja listo el vectorstore global.
+    backend: "chroma" (por defecto) o "numpy"; si es None se lee RAG_BACKEND del .env.
+    Si el índice en disco está al día, no se lee ningún documento: el vectorstore y
+    el índice léxico se abren en el primer uso (o antes, con precargar()).
+    """
+    global vectorstore, indice_lexico, indices_bm25, _embeddings, _huella, _pendiente, _indice_pendiente
+    global _persist_dir, _umbral
     setup_environment()
+    backend = backend or os.getenv("RAG_BACKEND", "chroma")
+    if backend not in PERSIST_DIRS:
+        raise ValueError(f"Backend de vectores desconocido: '{backend}'. Opciones: {', '.join(PERSIST_DIRS)}")
+    persist_dir = PERSIST_DIRS[backend]
 
-    embedding_model = GoogleGenerativeAIEmbeddings(
-        model="models/gemini-embedding-001",
-        google_api_key=os.getenv("GEMINI_API_KEY")
+    al_dia = (
+        not force_rebuild
+        and os.path.exists(persist_dir)
+        and _conocimiento(_read_saved_fingerprint(persist_dir) or {}) == _compute_docs_fingerprint(KNOWLEDGE_DIR)
     )
-
-    docs = load_documents()
-    vectorstore = create_or_load_vectorstore(docs, embedding_model, force_rebuild=force_rebuild)
+    with _lock_carga:
+        if al_dia:
+            print(f"⚡ Vectorstore al día ({backend}): se abrirá en el primer uso.")
+            vectorstore, indice_lexico, _embeddings = None, None, None
+            _pendiente = (backend, persist_dir)
+            _indice_pendiente = True
+        else:
+            embedding_model = _embeddings = _crear_embeddings()
+            docs = load_documents()
+            indice_lexico = construir_indice_lexico(docs)
+            vectorstore = create_or_load_vectorstore(docs, embedding_model, force_rebuild=force_rebuild, backend=backend)
+            _pendiente, _indice_pendiente = None, False
+            print(f"🗃️ Caché de embeddings: {embedding_model.estadisticas()}")
+        indices_bm25, _umbral, _persist_dir = None, None, persist_dir
+        # la huella sigue a 'knowledge/'; sincronizar Notion no invalida la caché de respuestas
+        fp = _conocimiento(_read_saved_fingerprint(persist_dir) or {})
+        _huella = hashlib.sha256(json.dumps(fp, sort_keys=True).encode("utf-8")).hexdigest()
     print("🌐 RAG de idioma inicializado correctamente con todos los archivos .txt.")
 
-def buscar_vocabulario(palabra: str):
-    global vectorstore
+def _obtener_embeddings():
+    global _embeddings
+    with _lock_carga:
+        if _embeddings is None:
+            _embeddings = _crear_embeddings()
+    return _embeddings
+
+def _obtener_vectorstore():
+    """Abre el vectorstore diferido la primera vez que se necesita."""
+    global vectorstore, _pendiente
+    if vectorstore is None and _pendiente is not None:
+        embeddings = _obtener_embeddings()
+        with _lock_carga:
+            if vectorstore is None and _pendiente is not None:
+                backend, persist_dir = _pendiente
+                vectorstore = _abrir_vectorstore(backend, embeddings, persist_dir)
+                _pendiente = None
     if vectorstore is None:
         raise ValueError("Vectorstore no inicializado. Ejecuta inicializar_rag() primero.")
+    return vectorstore
+
+def _obtener_indice_lexico() -> IndiceGlosario | None:
+    """Construye el índice léxico diferido la primera vez que se necesita."""
+    global indice_lexico, _indice_pendiente
+    with _lock_indice:
+        if _indice_pendiente:
+            indice_lexico = construir_indice_lexico(load_documents(verbose=False), verbose=False)
+            _indice_pendiente = False
+    return indice_lexico
+
+def _obtener_bm25() -> dict[str, IndiceBM25]:
+    """
+    Indexa con BM25 los chunks del vectorstore (mismos IDs) la primera vez que se necesita,
+    un índice por idioma: una búsqueda solo recorre el vocabulario de su idioma.
+    """
+    global indices_bm25
+    with _lock_bm25:
+        if indices_bm25 is None:
+            datos = _obtener_vectorstore().get(include=["documents", "metadatas"])
+            por_idioma = {}
+            for cid, texto, meta in zip(datos["ids"], datos["documents"], datos["metadatas"]):
+                meta = meta or {}
+                ids, docs = por_idioma.setdefault(meta.get("idioma") or IDIOMA_ORIGEN, ([], []))
+                ids.append(cid)
+                docs.append(Document(page_content=texto, metadata=meta))
+            indices = {}
+            for idioma, (ids, docs) in por_idioma.items():
+                indices[idioma] = IndiceBM25()
+                indices[idioma].agregar(ids, docs)
+            indices_bm25 = indices
+    return indices_bm25
+
+def _particiones_bm25() -> dict[str, IndiceBM25]:
+    """Copia del dict de particiones: upsert_chunks puede sumar una mientras se lo recorre."""
+    indices = _obtener_bm25()
+    with _lock_bm25:
+        return dict(indices)
+
+def idiomas_indexados() -> list[str]:
+    """Idiomas con chunks en el índice (las particiones del vectorstore)."""
+    return sorted(_particiones_bm25())
+
+def _buscar_bm25(consulta: str, k: int, idioma: str | None = None) -> list[tuple[Document, float, float]]:
+    """Candidatos BM25 del idioma pedido o, sin idioma, de todos (ordenados por cobertura y puntaje)."""
+    indices = _particiones_bm25()
+    if idioma is not None:
+        return indices[idioma].buscar(consulta, k=k) if idioma in indices else []
+    candidatos = [c for indice in indices.values() for c in indice.buscar(consulta, k=k)]
+    return sorted(candidatos, key=lambda c: (c[2], c[1]), reverse=True)[:k]
+
+def precargar():
+    """
+    Deja listo lo que el arranque rápido difirió (índice léxico, vectorstore, BM25 y
+    cliente de embeddings). Pensado para correr en un hilo mientras el usuario escribe.
+    """
+    _obtener_indice_lexico()
+    if vectorstore is not None or _pendiente is not None:
+        _obtener_bm25()
+
+def huella_conocimiento() -> str | None:
+    """Identifica la versión del conocimiento indexado (cambia si cambia 'knowledge/')."""
+    return _huella
+
+# ---------- escritura incremental (fuentes fuera de 'knowledge/') ----------
+def leer_estado_indice(clave: str) -> dict:
+    """Estado guardado por una fuente externa en el fingerprint (p. ej. el cursor de Notion)."""
+    return (_read_saved_fingerprint(_persist_dir or PERSIST_DIRS["chroma"]) or {}).get(clave, {})
+
+def guardar_estado_indice(clave: str, valor: dict):
+    if not clave.startswith("_") or clave == "_chunker":
+        raise ValueError(f"Clave de estado inválida: '{clave}' (debe empezar con '_').")
+    persist_dir = _persist_dir or PERSIST_DIRS["chroma"]
+    with _lock_carga:
+        fp = _read_saved_fingerprint(persist_dir) or {}
+        fp[clave] = valor
+        _save_fingerprint(fp, persist_dir)
+
+def upsert_chunks(ids: list[str], docs: list[Document], persistir: bool = True) -> int:
+    """
+    Agrega o reemplaza chunks con IDs propios ('notion:<page_id>', hash del contenido...).
+    Solo se embeben los que son nuevos o cambiaron de texto; el BM25 en memoria se
+    actualiza en el momento. Devuelve cuántos chunks se embebieron.
+    """
+    vs = _obtener_vectorstore()
+    unicos = dict(zip(ids, docs))
+    actuales = vs.get(ids=list(unicos), include=["documents"])
+    previos = dict(zip(actuales["ids"], actuales["documents"]))
+    cambios = [(cid, doc) for cid, doc in unicos.items() if previos.get(cid) != doc.page_content]
+    if not cambios:
+        return 0
+
+    textos = [doc.page_content for _, doc in cambios]
+    metadatas = [doc.metadata for _, doc in cambios]
+    cids = [cid for cid, _ in cambios]
+    vectores = _obtener_embeddings().embed_documents(textos)
+    if hasattr(vs, "add_vectores"):
+        vs.add_vectores(textos, vectores, metadatas=metadatas, ids=cids, persistir=persistir)
+    else:
+        vs._collection.upsert(ids=cids, embeddings=vectores, documents=textos, metadatas=metadatas)
+
+    with _lock_bm25:
+        if indices_bm25 is not None:
+            for indice in indices_bm25.values():
+                indice.eliminar(cids)  # un chunk que cambió de idioma no debe quedar en su partición vieja
+            for cid, doc in cambios:
+                idioma = doc.metadata.get("idioma") or IDIOMA_ORIGEN
+                indices_bm25.setdefault(idioma, IndiceBM25()).agregar([cid], [doc])
+    return len(cambios)
+
+def eliminar_chunks(ids: list[str]):
+    if not ids:
+        return
+    _obtener_vectorstore().delete(ids=list(ids))
+    with _lock_bm25:
+        if indices_bm25 is not None:
+            for indice in indices_bm25.values():
+                indice.eliminar(ids)
+
+# ---------- umbral de similitud ----------
+def leer_calibracion(persist_dir: str | None = None) -> dict | None:
+    ruta = os.path.join(persist_dir or _persist_dir or PERSIST_DIRS["chroma"], UMBRAL_NAME)
+    if os.path.exists(ruta):
+        try:
+            with open(ruta, "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except Exception:
+            return None
+    return None
+
+def guardar_calibracion(datos: dict, persist_dir: str | None = None):
+    global _umbral
+    persist_dir = persist_dir or _persist_dir or PERSIST_DIRS["chroma"]
+    os.makedirs(persist_dir, exist_ok=True)
+    with open(os.path.join(persist_dir, UMBRAL_NAME), "w", encoding="utf-8") as fh:
+        json.dump(datos, fh, ensure_ascii=False, indent=2)
+    _umbral = None
+
+def umbral_similitud() -> float:
+    """
+    Similitud mínima para aceptar un chunk solo por vectores. Prioridad:
+    RAG_UMBRAL_SIMILITUD del .env > calibración guardada para este modelo > UMBRAL_SIMILITUD.
+    """
+    global _umbral
+    if _umbral is None:
+        if os.getenv("RAG_UMBRAL_SIMILITUD"):
+            _umbral = float(os.getenv("RAG_UMBRAL_SIMILITUD"))
+        else:
+            calibracion = leer_calibracion()
+            modelo = getattr(_obtener_embeddings(), "nombre_modelo", EMBEDDING_MODEL)
+            if calibracion and calibracion.get("modelo") == modelo:
+                _umbral = float(calibracion["umbral"])
+            else:
+                _umbral = UMBRAL_SIMILITUD
+    return _umbral
+
+def _formatear(doc) -> str:
+    return f"[{getattr(doc, 'metadata', {}).get('source', 'sin fuente')}] {getattr(doc, 'page_content', str(doc))}"
+
+def _similitudes_chroma(coleccion, distancias: list[float]) -> list[float]:
+    """Distancia de Chroma -> similitud coseno (asume vectores normalizados, como los de Gemini)."""
+    espacio = (getattr(coleccion, "metadata", None) or {}).get("hnsw:space")
+    if espacio is None:
+        try:
+            espacio = coleccion.configuration.get("hnsw", {}).get("space")
+        except Exception:
+            espacio = None
+    if (espacio or "l2") == "l2":
+        return [1 - d / 2 for d in distancias]  # L2 al cuadrado entre vectores unitarios = 2 - 2·cos
+    return [1 - d for d in distancias]  # cosine / ip
+
+def _buscar_por_vectores(
+    vectores: list[list[float]], k: int = TOP_K, idioma: str | None = None
+) -> list[list[tuple[Document, float | None]]]:
+    """
+    Top-k con su similitud coseno para varios vectores de consulta en una sola consulta a la colección.
+    Con `idioma`, solo dentro de esa partición (filtro por metadatos).
+    """
+    vectorstore = _obtener_vectorstore()
+    filtro = {"idioma": idioma} if idioma else None
+    if hasattr(vectorstore, "similarity_search_by_vectors_with_scores"):
+        return vectorstore.similarity_search_by_vectors_with_scores(vectores, k=k, filter=filtro)
+    coleccion = getattr(vectorstore, "_collection", None)
+    if coleccion is None:
+        # sin acceso a los puntajes: el umbral no puede filtrar estos resultados
+        return [[(doc, None) for doc in vectorstore.similarity_search_by_vector(v, k=k, filter=filtro)] for v in vectores]
+    res = coleccion.query(
+        query_embeddings=vectores, n_results=k, where=filtro, include=["documents", "metadatas", "distances"]
+    )
+    return [
+        [
+            (Document(id=cid, page_content=texto, metadata=meta or {}), similitud)
+            for cid, texto, meta, similitud in zip(ids, textos, metas, _similitudes_chroma(coleccion, distancias))
+        ]
+        for ids, textos, metas, distancias in zip(res["ids"], res["documents"], res["metadatas"], res["distances"])
+    ]
+
+def _embeber_consultas(consultas: list[str]) -> list[list[float]]:
+    embeddings = _obtener_embeddings()
+    if hasattr(embeddings, "embed_queries"):
+        return embeddings.embed_queries(consultas)
+    return [embeddings.embed_query(c) for c in consultas]
+
+def _fusionar(lexicos: list, vectoriales: list, umbral: float) -> list[Document]:
+    """
+    Reciprocal rank fusion de ambos rankings (1 / (RRF_K + posición)). Solo entran los chunks
+    que pasan el umbral por algún lado, así que el resultado puede quedar vacío.
+    """
+    puntajes, docs, aceptados = {}, {}, set()
+    for posicion, (doc, _, cobertura) in enumerate(lexicos, start=1):
+        puntajes[doc.id] = puntajes.get(doc.id, 0.0) + 1 / (RRF_K + posicion)
+        docs.setdefault(doc.id, doc)
+        if cobertura >= COBERTURA_MINIMA:
+            aceptados.add(doc.id)
+    for posicion, (doc, similitud) in enumerate(vectoriales, start=1):
+        clave = doc.id or _chunk_id(doc)
+        puntajes[clave] = puntajes.get(clave, 0.0) + 1 / (RRF_K + posicion)
+        docs.setdefault(clave, doc)
+        if similitud is None or similitud >= umbral:
+            aceptados.add(clave)
+    return [docs[c] for c in sorted(aceptados, key=puntajes.get, reverse=True)[:TOP_K]]
+
+def _pasadas(idioma: str | None, entre_idiomas: bool) -> list:
+    # primero la partición del idioma; si algo no aparece, todas (p. ej. una palabra en inglés en una sesión de francés)
+    return [idioma, None] if idioma is not None and entre_idiomas else [idioma]
+
+def _atajo_bm25(consulta: str, idioma: str | None = None) -> list[Document]:
+    """Chunks que contienen todos los términos de la consulta: se aceptan sin embeddings."""
+    if not tiene_terminos_significativos(consulta):
+        # 'the' aparece en casi todos los chunks: cobertura completa sin decir nada de la consulta
+        return []
+    completos = [doc for doc, _, cobertura in _buscar_bm25(consulta, CANDIDATOS, idioma) if cobertura >= 1.0]
+    if completos:
+        contar("recuperacion_bm25", resultado="atajo")
+    return completos[:TOP_K]
+
+def en_glosario(palabra: str, idioma: str | None = None, entre_idiomas: bool = True) -> bool:
+    """Coincidencia exacta en el glosario (O(1)); sirve para no embeber lo que ya está resuelto."""
+    indice = _obtener_indice_lexico()
+    return indice is not None and bool(indice.buscar(palabra, None if entre_idiomas else idioma))
+
+def buscar_lexico(
+    palabras: list[str], idioma: str | None = None, entre_idiomas: bool = True
+) -> dict[str, list[str]]:
+    """
+    La parte local de la búsqueda: glosario exacto y, si no, los chunks de BM25 que contienen
+    toda la consulta. Sin llamadas remotas; devuelve solo las palabras encontradas.
+    """
+    with span("recuperacion", via="lexico"):
+        indice = _obtener_indice_lexico()
+        if vectorstore is None and indice is None and _pendiente is None:
+            raise ValueError("Vectorstore no inicializado. Ejecuta inicializar_rag() primero.")
+
+        resultados = {}
+        for n, idioma_pasada in enumerate(_pasadas(idioma, entre_idiomas)):
+            for palabra in dict.fromkeys(palabras):
+                if palabra in resultados:
+                    continue
+                entradas = indice.buscar(palabra, idioma_pasada) if indice is not None else []
+                contar("recuperacion_lexico", resultado="hit" if entradas else "miss")
+                if entradas:
+                    textos = [f"[{e.source}] {e.texto()}" for e in entradas]
+                elif vectorstore is not None or _pendiente is not None:
+                    textos = [_formatear(doc) for doc in _atajo_bm25(palabra, idioma_pasada)]
+                else:
+                    textos = []
+                if textos:
+                    resultados[palabra] = textos
+                    if n:
+                        contar("recuperacion_entre_idiomas", idioma=idioma)
+        return resultados
+
+def sin_candidatos_lexicos(palabras: list[str]) -> bool:
+    """
+    Ninguna de las palabras aparece en el BM25 de ningún idioma: una palabra nueva o inventada,
+    que los vectores tampoco van a encontrar. Con algún candidato (aunque no cubra toda la
+    consulta), la búsqueda vectorial suele encontrarla.
+    """
+    if vectorstore is None and _pendiente is None:
+        return True
+    return not any(_buscar_bm25(palabra, 1) for palabra in dict.fromkeys(palabras))
+
+def buscar_vectorial(
+    palabras: list[str], idioma: str | None = None, entre_idiomas: bool = True
+) -> dict[str, list[str]]:
+    """
+    La parte remota: embebe todas las palabras en UNA llamada y fusiona (RRF) sus vecinos con
+    los candidatos de BM25, filtrando por el umbral calibrado. Los vectores se reutilizan en la
+    pasada entre idiomas. Una lista vacía significa "no está en el RAG".
+    """
+    consultas = list(dict.fromkeys(palabras))
+    if not consultas:
+        return {}
+    with span("recuperacion", via="vectorial"):
+        umbral = umbral_similitud()
+        vectores = dict(zip(consultas, _embeber_consultas(consultas)))
+        resultados = {}
+        for n, idioma_pasada in enumerate(_pasadas(idioma, entre_idiomas)):
+            pendientes = [c for c in consultas if not resultados.get(c)]
+            if not pendientes:
+                break
+            vecinos = _buscar_por_vectores([vectores[c] for c in pendientes], CANDIDATOS, idioma_pasada)
+            for consulta, vectoriales in zip(pendientes, vecinos):
+                docs = _fusionar(_buscar_bm25(consulta, CANDIDATOS, idioma_pasada), vectoriales, umbral)
+                contar("recuperacion_hibrida", resultado="hit" if docs else "vacio")
+                resultados[consulta] = [_formatear(doc) for doc in docs]
+                if n and docs:
+                    contar("recuperacion_entre_idiomas", idioma=idioma)
+        return resultados
+
+def buscar_vocabulario(palabra: str, idioma: str | None = None, entre_idiomas: bool = True):
+    return buscar_vocabulario_lote([palabra], idioma=idioma, entre_idiomas=entre_idiomas)[palabra]
 
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 3})
-    # warning: get_relevant_documents puede estar deprecado en tu versión; lo usamos por compatibilidad
-    try:
-        results = retriever.get_relevant_documents(palabra)
-    except Exception:
-        # fallback a invoke si la versión nueva lo exige
-        results = retriever.invoke({"input": palabra}).get("output", [])
-
-   # print(f"🔍 Búsqueda realizada: '{palabra}' → {len(results)} resultados relevantes.")
-    for i, doc in enumerate(results):
-        meta = getattr(doc, "metadata", {}) or {}
-        source = meta.get("source", "sin fuente")
-        preview = getattr(doc, "page_content", str(doc))[:200]
-        
-    return [f"[{getattr(doc, 'metadata', {}).get('source', 'sin fuente')}] {getattr(doc, 'page_content', str(doc))}" for doc in results]
+def buscar_vocabulario_lote(
+    palabras: list[str], idioma: str | None = None, entre_idiomas: bool = True
+) -> dict[str, list[str]]:
+    """
+    Busca varias palabras a la vez. Las que están en el glosario (o enteras en un chunk,
+    según BM25) se resuelven localmente; solo el resto se embebe, en UNA llamada en lote.
+    Una palabra sin resultados vuelve con la lista vacía.
+    Con `idioma` se busca primero en esa partición; si algo no aparece y `entre_idiomas`
+    es True, se reintenta en todas.
+    """
+    with span("recuperacion", via="lote" if len(palabras) > 1 else "individual"):
+        encontrados = buscar_lexico(palabras, idioma=idioma, entre_idiomas=entre_idiomas)
+        pendientes = [p for p in palabras if p not in encontrados]
+        vectoriales = buscar_vectorial(pendientes, idioma=idioma, entre_idiomas=entre_idiomas)
+        return {palabra: encontrados.get(palabra) or vectoriales.get(palabra, []) for palabra in palabras}
 
 def off_topic_tool():
     return "❗ Lo siento, solo puedo ayudarte con temas de idiomas. Por favor, haz preguntas relacionadas con vocabulario, frases o traducciones."
\ No newline at end of file
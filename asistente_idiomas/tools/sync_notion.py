@@ -0,0 +1,121 @@
+# asistente_idiomas/tools/sync_notion.py
+import os
+import threading
+from asistente_idiomas.tools import rag_idioma, notion_tool
+from asistente_idiomas.tools.glosario import EntradaGlosario
+from asistente_idiomas.tools.chunker import IDIOMA_ORIGEN, IDIOMA_DESTINO, chunk_de_entrada, codigo_idioma
+from asistente_idiomas.utils.metricas import span, contar, evento
+
+# 🔄 Las palabras que los estudiantes registran en Notion vuelven al RAG como entradas del glosario.
+# Solo se piden las filas editadas desde la última sincronización (cursor por last_edited_time)
+# y solo se embeben las que cambiaron de texto: sincronizar seguido cuesta casi nada.
+ESTADO_NOTION = "_notion"  # clave del cursor en el fingerprint del vectorstore
+SECCION_NOTION = "Registradas en Notion"
+INTERVALO_SYNC = float(os.getenv("NOTION_SYNC_INTERVALO", "300"))  # segundos; 0 lo desactiva
+
+_lock_sync = threading.Lock()  # una sincronización a la vez (comando manual y periódica)
+
+
+def chunk_id(page_id: str) -> str:
+    # ID estable por página: editar la fila en Notion reemplaza su chunk en lugar de sumar otro
+    return f"notion:{page_id}"
+
+
+def entrada_de_pagina(pagina: dict) -> tuple[EntradaGlosario, str] | None:
+    """Página de la base de Notion -> (entrada del glosario, código de idioma); None si no tiene palabra."""
+    props = pagina.get("properties", {})
+    palabra = notion_tool._texto_propiedad(props.get("Palabra", {})).strip()
+    if not palabra:
+        return None
+    idioma = codigo_idioma(notion_tool._texto_propiedad(props.get("Idioma", {}))) or IDIOMA_ORIGEN
+    ejemplo = notion_tool._texto_propiedad(props.get("Ejemplo de uso", {})).strip()
+    entrada = EntradaGlosario(
+        termino=palabra,
+        traduccion=notion_tool._texto_propiedad(props.get("Traducción", {})).strip(),
+        source=f"notion/{idioma}",
+        seccion=SECCION_NOTION,
+        ejemplos=[f"Ejemplo: {ejemplo}"] if ejemplo else [],
+    )
+    return entrada, idioma
+
+
+def _consultar(desde: str | None, cursor: str | None) -> dict:
+    kwargs = {
+        "database_id": notion_tool.NOTION_DATABASE_ID,
+        "page_size": 100,
+        "sorts": [{"timestamp": "last_edited_time", "direction": "ascending"}],
+    }
+    if desde:
+        # on_or_after: Notion redondea last_edited_time al minuto; lo repetido no se vuelve a embeber
+        kwargs["filter"] = {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": desde}}
+    if cursor:
+        kwargs["start_cursor"] = cursor
+    with span("notion", operacion="databases.query"):
+        return notion_tool.cliente_notion().databases.query(**kwargs)
+
+
+def sincronizar_notion() -> dict:
+    """
+    Trae de Notion las filas nuevas o editadas desde la última vez y las deja en el RAG
+    (vectorstore y BM25). El cursor se guarda después de cada página de resultados,
+    así que una sincronización cortada se retoma sin repetir lo ya hecho.
+    """
+    with _lock_sync:
+        desde = hasta = rag_idioma.leer_estado_indice(ESTADO_NOTION).get("hasta")
+        stats = {"leidas": 0, "embebidas": 0, "borradas": 0}
+        cursor = None
+        while True:
+            respuesta = _consultar(desde, cursor)
+            ids, docs, borrar = [], [], []
+            for pagina in respuesta.get("results", []):
+                stats["leidas"] += 1
+                editada = pagina.get("last_edited_time")
+                if editada and (hasta is None or editada > hasta):
+                    hasta = editada
+                convertida = None if pagina.get("archived") or pagina.get("in_trash") else entrada_de_pagina(pagina)
+                if convertida is None:
+                    borrar.append(chunk_id(pagina["id"]))
+                    continue
+                entrada, idioma = convertida
+                destino = IDIOMA_DESTINO if idioma != IDIOMA_DESTINO else IDIOMA_ORIGEN
+                ids.append(chunk_id(pagina["id"]))
+                docs.append(chunk_de_entrada(entrada, idioma, destino))
+
+            if borrar:
+                rag_idioma.eliminar_chunks(borrar)
+                stats["borradas"] += len(borrar)
+            if ids:
+                stats["embebidas"] += rag_idioma.upsert_chunks(ids, docs)
+            if hasta:
+                rag_idioma.guardar_estado_indice(ESTADO_NOTION, {"hasta": hasta})
+
+            if not respuesta.get("has_more"):
+                break
+            cursor = respuesta.get("next_cursor")
+
+    contar("notion_sync_filas", valor=stats["leidas"])
+    contar("notion_sync_embebidas", valor=stats["embebidas"])
+    return stats
+
+
+def _bucle(intervalo: float, detener: threading.Event):
+    # la primera vuelta es inmediata: lo registrado desde la última sesión queda buscable al arrancar
+    while True:
+        try:
+            stats = sincronizar_notion()
+            if stats["embebidas"] or stats["borradas"]:
+                print(f"🔄 Notion → RAG: {stats['embebidas']} palabra(s) nuevas o editadas, {stats['borradas']} borrada(s).")
+        except Exception as e:
+            evento("notion.error_sync", nivel="error", error=str(e))
+        if detener.wait(intervalo):
+            return
+
+
+def iniciar_sincronizacion_periodica(intervalo: float | None = None) -> threading.Event | None:
+    """Sincroniza cada `intervalo` segundos en un hilo daemon; devuelve el Event para detenerlo."""
+    intervalo = INTERVALO_SYNC if intervalo is None else intervalo
+    if intervalo <= 0 or not notion_tool.NOTION_DATABASE_ID:
+        return None
+    detener = threading.Event()
+    threading.Thread(target=_bucle, args=(intervalo, detener), name="sync-notion", daemon=True).start()
+    return detener
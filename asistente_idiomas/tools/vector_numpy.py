@@ -0,0 +1,284 @@
+# asistente_idiomas/tools/vector_numpy.py
+import os
+import json
+import uuid
+import threading
+from typing import NamedTuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+_MATRIZ = "vectores.npy"
+_ESCALAS = "escalas.npy"
+_DOCUMENTOS = "documentos.json"
+_BLOQUE = 8192  # filas que se decuantizan por vez en float16/int8
+
+
+class _Instantanea(NamedTuple):
+    """Estado coherente del store en un momento dado; las escrituras publican una nueva, nunca la modifican."""
+    ids: list
+    textos: list
+    metadatas: list
+    matriz: np.ndarray | None
+    escalas: np.ndarray | None
+    filas_por_filtro: dict
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Vectorstore en memoria: todos los vectores (normalizados) viven en una única
+    matriz contigua guardada como .npy y abierta con mmap. La búsqueda top-k es
+    un producto matricial + argpartition, también para lotes de consultas.
+    dtype puede ser float32, float16 o int8 (cuantización por fila).
+    Con un filtro por metadatos ({"idioma": "fr"}) solo se puntúan las filas de esa partición.
+    Las escrituras se serializan con un lock y reemplazan los arreglos en vez de modificarlos;
+    cada búsqueda toma una instantánea y trabaja sobre ella sin bloquear a las demás.
+    """
+
+    def __init__(self, embedding_function, persist_directory: str | None = None, dtype: str = "float32"):
+        if dtype not in ("float32", "float16", "int8"):
+            raise ValueError(f"dtype no soportado: {dtype}")
+        self._embedding = embedding_function
+        self.persist_directory = persist_directory
+        self.dtype = dtype
+
+        self._ids: list[str] = []
+        self._textos: list[str] = []
+        self._metadatas: list[dict] = []
+        self._matriz = None
+        self._escalas = None
+        self._filas_por_filtro: dict[tuple, np.ndarray] = {}
+        self._lock = threading.RLock()
+
+        if persist_directory and os.path.exists(os.path.join(persist_directory, _DOCUMENTOS)):
+            self._cargar()
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _instantanea(self) -> _Instantanea:
+        with self._lock:
+            return _Instantanea(self._ids, self._textos, self._metadatas, self._matriz, self._escalas,
+                                self._filas_por_filtro)
+
+    # ---------- persistencia ----------
+    def _cargar(self):
+        with open(os.path.join(self.persist_directory, _DOCUMENTOS), "r", encoding="utf-8") as fh:
+            datos = json.load(fh)
+        self.dtype = datos.get("dtype", self.dtype)
+        self._ids, self._textos, self._metadatas = datos["ids"], datos["textos"], datos["metadatas"]
+        if self._ids:
+            # mmap: el SO carga las páginas bajo demanda, el arranque no copia la matriz
+            self._matriz = np.load(os.path.join(self.persist_directory, _MATRIZ), mmap_mode="r")
+            if self.dtype == "int8":
+                self._escalas = np.load(os.path.join(self.persist_directory, _ESCALAS))
+
+    def _guardar_npy(self, nombre: str, arreglo: np.ndarray):
+        ruta = os.path.join(self.persist_directory, nombre)
+        with open(ruta + ".tmp", "wb") as fh:
+            np.save(fh, arreglo)
+        os.replace(ruta + ".tmp", ruta)
+
+    def persist(self):
+        if not self.persist_directory:
+            return
+        with self._lock:
+            self._persistir()
+
+    def _persistir(self):
+        os.makedirs(self.persist_directory, exist_ok=True)
+        if self._matriz is not None:
+            self._guardar_npy(_MATRIZ, np.ascontiguousarray(self._matriz))
+            if self._escalas is not None:
+                self._guardar_npy(_ESCALAS, self._escalas)
+        ruta = os.path.join(self.persist_directory, _DOCUMENTOS)
+        with open(ruta + ".tmp", "w", encoding="utf-8") as fh:
+            json.dump(
+                {"dtype": self.dtype, "ids": self._ids, "textos": self._textos, "metadatas": self._metadatas},
+                fh,
+                ensure_ascii=False,
+            )
+        os.replace(ruta + ".tmp", ruta)
+
+    # ---------- cuantización ----------
+    def _codificar(self, vectores: np.ndarray):
+        if self.dtype == "float32":
+            return vectores, None
+        if self.dtype == "float16":
+            return vectores.astype(np.float16), None
+        escalas = np.abs(vectores).max(axis=1) / 127.0
+        escalas[escalas == 0] = 1.0
+        codigos = np.round(vectores / escalas[:, None]).astype(np.int8)
+        return codigos, escalas.astype(np.float32)
+
+    @staticmethod
+    def _normalizar(vectores) -> np.ndarray:
+        vectores = np.asarray(vectores, dtype=np.float32)
+        normas = np.linalg.norm(vectores, axis=1, keepdims=True)
+        normas[normas == 0] = 1.0
+        return vectores / normas
+
+    def _puntajes(self, estado: _Instantanea, consultas: np.ndarray, filas: np.ndarray | None = None) -> np.ndarray:
+        """Similitud coseno (n_filas, n_consultas) entre la matriz (o solo `filas`) y las consultas."""
+        total = len(estado.ids) if filas is None else len(filas)
+        if estado.matriz.dtype == np.float32:
+            return (estado.matriz if filas is None else estado.matriz[filas]) @ consultas.T
+        puntajes = np.empty((total, len(consultas)), dtype=np.float32)
+        for i in range(0, total, _BLOQUE):
+            indices = slice(i, i + _BLOQUE) if filas is None else filas[i:i + _BLOQUE]
+            bloque = np.asarray(estado.matriz[indices], dtype=np.float32)
+            if estado.escalas is not None:
+                bloque *= estado.escalas[indices, None]
+            puntajes[i:i + _BLOQUE] = bloque @ consultas.T
+        return puntajes
+
+    @staticmethod
+    def _filas(estado: _Instantanea, filtro: dict | None) -> np.ndarray | None:
+        """Índices de las filas cuyos metadatos cumplen el filtro (cacheados hasta la próxima escritura)."""
+        if not filtro:
+            return None
+        clave = tuple(sorted(filtro.items()))
+        filas = estado.filas_por_filtro.get(clave)
+        if filas is None:
+            filas = np.array(
+                [i for i, meta in enumerate(estado.metadatas) if all(meta.get(k) == v for k, v in filtro.items())],
+                dtype=np.int64,
+            )
+            estado.filas_por_filtro[clave] = filas
+        return filas
+
+    # ---------- escritura ----------
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs) -> list[str]:
+        texts = list(texts)
+        vectores = self._embedding.embed_documents(texts)
+        return self.add_vectores(texts, vectores, metadatas=metadatas, ids=ids)
+
+    def add_vectores(self, texts, vectores, metadatas=None, ids=None, persistir: bool = True) -> list[str]:
+        """
+        Agrega (o reemplaza, si el ID ya existe) textos con vectores ya calculados.
+        Con persistir=False no se escribe a disco: para cargas en lote que llaman a persist() al final.
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in texts]
+        ids = list(ids)
+        codigos, escalas = self._codificar(self._normalizar(vectores))
+
+        with self._lock:
+            existentes = set(ids) & set(self._ids)
+            if existentes:
+                self.delete(list(existentes), persistir=False)
+
+            if self._matriz is None or not len(self._ids):
+                matriz, escalas_nuevas = codigos, escalas
+            else:
+                matriz = np.concatenate([self._matriz, codigos])
+                escalas_nuevas = np.concatenate([self._escalas, escalas]) if escalas is not None else None
+            self._publicar(self._ids + ids, self._textos + texts, self._metadatas + [dict(m or {}) for m in metadatas],
+                           matriz, escalas_nuevas)
+            if persistir:
+                self.persist()
+        return ids
+
+    def _publicar(self, ids, textos, metadatas, matriz, escalas):
+        # listas y arreglos nuevos: una búsqueda en curso sigue viendo los anteriores, todos del mismo momento
+        self._ids, self._textos, self._metadatas = ids, textos, metadatas
+        self._matriz, self._escalas = matriz, escalas
+        self._filas_por_filtro = {}
+
+    def delete(self, ids=None, persistir: bool = True, **kwargs):
+        if not ids:
+            return
+        borrar = set(ids)
+        with self._lock:
+            conservar = [i for i, cid in enumerate(self._ids) if cid not in borrar]
+            if len(conservar) == len(self._ids):
+                return
+            self._publicar(
+                [self._ids[i] for i in conservar],
+                [self._textos[i] for i in conservar],
+                [self._metadatas[i] for i in conservar],
+                self._matriz[conservar] if conservar else None,
+                self._escalas[conservar] if self._escalas is not None and conservar else None,
+            )
+            if persistir:
+                self.persist()
+
+    # ---------- lectura ----------
+    def get(self, ids=None, where: dict | None = None, include=None, **kwargs) -> dict:
+        """Misma forma de respuesta que Chroma.get (ids, documents, metadatas)."""
+        estado = self._instantanea()
+        if ids is not None:
+            buscados = set(ids)
+            filas = [i for i, cid in enumerate(estado.ids) if cid in buscados]
+        else:
+            filas = range(len(estado.ids))
+        filas = [i for i in filas if not where or all(estado.metadatas[i].get(k) == v for k, v in where.items())]
+        return {
+            "ids": [estado.ids[i] for i in filas],
+            "documents": [estado.textos[i] for i in filas],
+            "metadatas": [estado.metadatas[i] for i in filas],
+        }
+
+    def _top_k_por_vectores(self, vectores, k: int, filtro: dict | None = None) -> list[list[tuple[Document, float]]]:
+        estado = self._instantanea()
+        filas_filtro = self._filas(estado, filtro)
+        total = len(estado.ids) if filas_filtro is None else len(filas_filtro)
+        if not total:
+            return [[] for _ in vectores]
+        consultas = self._normalizar(vectores)
+        puntajes = self._puntajes(estado, consultas, filas_filtro)
+        k = min(k, total)
+        # argpartition: O(n) para separar el top-k, luego se ordenan solo esos k
+        candidatos = np.argpartition(-puntajes, k - 1, axis=0)[:k]
+        resultados = []
+        for j in range(len(consultas)):
+            filas = candidatos[:, j]
+            filas = filas[np.argsort(-puntajes[filas, j])]
+            resultados.append([
+                (self._documento(estado, i if filas_filtro is None else int(filas_filtro[i])), float(puntajes[i, j]))
+                for i in filas
+            ])
+        return resultados
+
+    @staticmethod
+    def _documento(estado: _Instantanea, i: int) -> Document:
+        return Document(id=estado.ids[i], page_content=estado.textos[i], metadata=estado.metadatas[i])
+
+    def similarity_search_by_vectors(self, embeddings, k: int = 4, filter: dict | None = None) -> list[list[Document]]:
+        """Top-k para un lote de vectores de consulta con un único producto matricial."""
+        return [[doc for doc, _ in res] for res in self._top_k_por_vectores(embeddings, k, filter)]
+
+    def similarity_search_by_vectors_with_scores(
+        self, embeddings, k: int = 4, filter: dict | None = None
+    ) -> list[list[tuple[Document, float]]]:
+        """Como similarity_search_by_vectors, con la similitud coseno de cada resultado."""
+        return self._top_k_por_vectores(embeddings, k, filter)
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, filter: dict | None = None, **kwargs) -> list[Document]:
+        return self.similarity_search_by_vectors([embedding], k=k, filter=filter)[0]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: dict | None = None, **kwargs
+    ) -> list[tuple[Document, float]]:
+        return self._top_k_por_vectores([self._embedding.embed_query(query)], k, filter)[0]
+
+    def similarity_search(self, query: str, k: int = 4, filter: dict | None = None, **kwargs) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def _select_relevance_score_fn(self):
+        # similitud coseno [-1, 1] -> relevancia [0, 1]
+        return lambda puntaje: min(1.0, max(0.0, (puntaje + 1) / 2))
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, persist_directory=None, dtype="float32", **kwargs):
+        store = cls(embedding, persist_directory=persist_directory, dtype=dtype)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
@@ -0,0 +1,363 @@
+# utils/bench_carga.py
+"""
+Prueba de carga y de resistencia (soak) del grafo compilado con SqliteSaver, con
+dobles locales (ModeloFalso, EmbeddingsHash, NotionFalso) y latencias configurables.
+
+1. Reproduce transcripciones (grabadas en un JSONL o la conversación sintética de
+   bench_offline) en N thread_id concurrentes, una sesión por estudiante.
+2. Dos drivers: 'hilos' (un hilo por sesión llamando a app.stream, como la consola)
+   y 'asyncio' (las sesiones como corrutinas sobre ServidorLuna.turno, el mismo
+   camino que el servidor WebSocket, con su semáforo y su pool de hilos).
+3. El lock del SqliteSaver se reemplaza por uno medido: cuánto se espera para entrar
+   al checkpointer y qué fracción del tiempo está tomado.
+4. Con --duracion cada sesión repite su transcripción hasta agotar el tiempo y el
+   reporte incluye ventanas (throughput, p95, memoria) para ver si algo se degrada.
+
+Reporta throughput, latencia por turno p50/p95/p99, tiempo al primer token, espera
+del lock de checkpoints y tasa de errores por tipo. El JSON sale por stdout.
+
+Uso: python -m asistente_idiomas.utils.bench_carga [--sesiones 16] [--driver hilos|asyncio]
+     [--concurrencia 16] [--duracion 0] [--ventana 10] [--transcripciones archivo.jsonl]
+     [--pausa 0] [--latencia-llm 0.05] [--latencia-token 0.002] [--latencia-embeddings 0.02]
+     [--latencia-notion 0.1] [--tasa-errores-llm 0] [--despachador] [--backend numpy]
+     [--outbox] [--salida reporte.json]
+
+Formato de --transcripciones: una conversación por línea, como lista JSON de mensajes
+o como objeto {"mensajes": [...]}.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import resource
+import tempfile
+import threading
+import statistics
+from collections import Counter
+from contextlib import redirect_stdout
+from datetime import datetime
+
+from langchain_core.messages import HumanMessage
+
+from asistente_idiomas.tools import rag_idioma
+from asistente_idiomas.tools.notion_outbox import NotionOutbox
+from asistente_idiomas.tools.despachador_llm import crear_despachador
+from asistente_idiomas.agentes.tutor import Tutor
+from asistente_idiomas.agentes.registrador import Registrador
+from asistente_idiomas.agentes.pool_tutores import PoolTutores
+from asistente_idiomas.grafo import construir_grafo
+from asistente_idiomas.utils.checkpoints import abrir_checkpointer
+from asistente_idiomas.utils.bench_offline import CONVERSACION, preparar_entorno, _percentil
+from asistente_idiomas.utils.calibrar_umbral import calibrar
+from asistente_idiomas.utils.metricas import LLMInstrumentado, REGISTRO
+
+
+class LockMedido:
+    """
+    Reemplazo del lock de SqliteSaver (checkpointer.lock) que mide la espera de cada
+    acceso y el tiempo que queda tomado. SqliteSaver solo usa `with self.lock:`.
+    """
+
+    def __init__(self, lock=None):
+        self._lock = lock or threading.Lock()
+        self._mutex = threading.Lock()
+        self._tomado_desde = 0.0
+        self.esperas: list[float] = []
+        self.retenido = 0.0
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        inicio = time.perf_counter()
+        ok = self._lock.acquire(blocking, timeout)
+        ahora = time.perf_counter()
+        if ok:
+            self._tomado_desde = ahora
+        with self._mutex:
+            self.esperas.append(ahora - inicio)
+        REGISTRO.observar("checkpoint_lock_espera_segundos", ahora - inicio)
+        return ok
+
+    def release(self):
+        retenido = time.perf_counter() - self._tomado_desde  # solo lo escribe quien tiene el lock
+        self._lock.release()
+        with self._mutex:
+            self.retenido += retenido
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def resumen(self, segundos: float) -> dict:
+        with self._mutex:
+            esperas, retenido = list(self.esperas), self.retenido
+        return {
+            "accesos": len(esperas),
+            "espera_total_s": round(sum(esperas), 4),
+            "espera_p50_ms": round(_percentil(esperas, 50) * 1000, 3),
+            "espera_p95_ms": round(_percentil(esperas, 95) * 1000, 3),
+            "espera_p99_ms": round(_percentil(esperas, 99) * 1000, 3),
+            "espera_max_ms": round(max(esperas, default=0.0) * 1000, 3),
+            "contendidos": sum(e > 0.001 for e in esperas),  # más de 1 ms esperando
+            "ocupacion": round(retenido / max(segundos, 1e-9), 3),  # cerca de 1 = el checkpointer es el techo
+        }
+
+
+# ---------- transcripciones ----------
+def cargar_transcripciones(ruta: str | None) -> list[list[str]]:
+    if not ruta:
+        return [[mensaje for _, mensaje in CONVERSACION]]
+    transcripciones = []
+    with open(ruta, "r", encoding="utf-8") as fh:
+        for linea in fh:
+            if not linea.strip():
+                continue
+            datos = json.loads(linea)
+            mensajes = datos.get("mensajes", []) if isinstance(datos, dict) else datos
+            if mensajes:
+                transcripciones.append([str(m) for m in mensajes])
+    if not transcripciones:
+        raise ValueError(f"No hay transcripciones en {ruta}")
+    return transcripciones
+
+
+def _guion(sesion: int, transcripciones: list[list[str]], fin: float | None):
+    """Mensajes de una sesión: su transcripción una vez o, en modo soak, en bucle hasta `fin`."""
+    transcripcion = transcripciones[sesion % len(transcripciones)]
+    while True:
+        for mensaje in transcripcion:
+            if fin is not None and time.perf_counter() >= fin:
+                return
+            yield mensaje
+        if fin is None:
+            return
+
+
+class Carga:
+    """Corre las sesiones contra `app` y junta un registro por turno."""
+
+    def __init__(self, app, transcripciones: list[list[str]], sesiones: int, duracion: float = 0.0, pausa: float = 0.0):
+        self.app = app
+        self.transcripciones = transcripciones
+        self.sesiones = sesiones
+        self.duracion = duracion
+        self.pausa = pausa
+        self.turnos: list[dict] = []
+        self._lock = threading.Lock()
+        self._fin = None
+
+    def _registrar(self, sesion: int, inicio: float, primer_token: float | None, error: Exception | None):
+        fin = time.perf_counter()
+        with self._lock:
+            self.turnos.append({
+                "sesion": sesion,
+                "fin": fin,
+                "total_s": fin - inicio,
+                "primer_token_s": primer_token,
+                "error": type(error).__name__ if error else None,
+            })
+
+    def _pausar(self, rng: random.Random):
+        if self.pausa > 0:
+            time.sleep(rng.expovariate(1 / self.pausa))  # tiempo que el estudiante tarda en escribir
+
+    # ---------- driver con hilos ----------
+    def _sesion_hilo(self, sesion: int):
+        rng = random.Random(sesion)
+        config = {"configurable": {"thread_id": f"carga-{sesion}"}}
+        for mensaje in _guion(sesion, self.transcripciones, self._fin):
+            inicio, primer_token, error = time.perf_counter(), None, None
+            try:
+                for _ in self.app.stream({"messages": [HumanMessage(content=mensaje)]}, config=config, stream_mode="custom"):
+                    if primer_token is None:
+                        primer_token = time.perf_counter() - inicio
+            except Exception as e:
+                error = e
+            self._registrar(sesion, inicio, primer_token, error)
+            self._pausar(rng)
+
+    def correr_hilos(self) -> float:
+        inicio = time.perf_counter()
+        self._fin = inicio + self.duracion if self.duracion > 0 else None
+        hilos = [
+            threading.Thread(target=self._sesion_hilo, args=(s,), name=f"carga-{s}", daemon=True)
+            for s in range(self.sesiones)
+        ]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return time.perf_counter() - inicio
+
+    # ---------- driver asyncio (camino del servidor) ----------
+    async def _sesion_async(self, servidor, sesion: int):
+        rng = random.Random(sesion)
+        for mensaje in _guion(sesion, self.transcripciones, self._fin):
+            inicio, error = time.perf_counter(), None
+            primer_token = []
+
+            async def enviar(_datos):
+                if not primer_token:
+                    primer_token.append(time.perf_counter() - inicio)
+
+            try:
+                await servidor.turno(f"carga-{sesion}", mensaje, enviar)
+            except Exception as e:
+                error = e
+            self._registrar(sesion, inicio, primer_token[0] if primer_token else None, error)
+            if self.pausa > 0:
+                await asyncio.sleep(rng.expovariate(1 / self.pausa))
+
+    def correr_asyncio(self, pool: PoolTutores, concurrencia: int) -> float:
+        from asistente_idiomas.servidor import ServidorLuna
+
+        async def _todas():
+            servidor = ServidorLuna(self.app, pool, concurrencia=concurrencia)
+            await asyncio.gather(*(self._sesion_async(servidor, s) for s in range(self.sesiones)))
+
+        inicio = time.perf_counter()
+        self._fin = inicio + self.duracion if self.duracion > 0 else None
+        asyncio.run(_todas())
+        return time.perf_counter() - inicio
+
+
+# ---------- reporte ----------
+def _latencias(valores: list[float]) -> dict:
+    return {
+        "media_ms": round(statistics.fmean(valores) * 1000, 3) if valores else 0.0,
+        "p50_ms": round(_percentil(valores, 50) * 1000, 3),
+        "p95_ms": round(_percentil(valores, 95) * 1000, 3),
+        "p99_ms": round(_percentil(valores, 99) * 1000, 3),
+        "max_ms": round(max(valores, default=0.0) * 1000, 3),
+    }
+
+
+def _muestrear(muestras: list[dict], ruta_db: str, pool: PoolTutores, ventana: float, detener: threading.Event):
+    """Memoria, sesiones vivas y tamaño de checkpoints.db cada `ventana` segundos."""
+    inicio = time.perf_counter()
+    while not detener.wait(ventana):
+        tamano = sum(os.path.getsize(ruta_db + s) for s in ("", "-wal") if os.path.exists(ruta_db + s))
+        muestras.append({
+            "t_s": round(time.perf_counter() - inicio, 1),
+            "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "sesiones_vivas": len(pool),
+            "checkpoints_mb": round(tamano / 2**20, 2),
+        })
+
+
+def resumir(turnos: list[dict], segundos: float, inicio: float, ventana: float, muestras: list[dict]) -> dict:
+    correctos = [t for t in turnos if t["error"] is None]
+    errores = Counter(t["error"] for t in turnos if t["error"])
+    resumen = {
+        "turnos": len(turnos),
+        "segundos": round(segundos, 3),
+        "turnos_por_s": round(len(turnos) / max(segundos, 1e-9), 2),
+        "latencia_turno": _latencias([t["total_s"] for t in correctos]),
+        "primer_token": _latencias([t["primer_token_s"] for t in correctos if t["primer_token_s"] is not None]),
+        "errores": {"total": sum(errores.values()), "tasa": round(sum(errores.values()) / max(len(turnos), 1), 4), "por_tipo": dict(errores)},
+    }
+    if ventana > 0 and segundos > ventana:
+        ventanas = []
+        for i in range(int(segundos // ventana) + 1):
+            grupo = [t for t in turnos if i * ventana <= t["fin"] - inicio < (i + 1) * ventana]
+            if not grupo:
+                continue
+            ventanas.append({
+                "desde_s": i * ventana,
+                "turnos_por_s": round(len(grupo) / max(min(ventana, segundos - i * ventana), 1e-9), 2),
+                "p95_ms": round(_percentil([t["total_s"] for t in grupo if t["error"] is None], 95) * 1000, 3),
+                "errores": sum(t["error"] is not None for t in grupo),
+                **(muestras[i] if i < len(muestras) else {}),
+            })
+        resumen["ventanas"] = ventanas
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del grafo con sesiones concurrentes (sin Gemini ni Notion).")
+    parser.add_argument("--sesiones", type=int, default=16, help="thread_id concurrentes.")
+    parser.add_argument("--driver", choices=["hilos", "asyncio"], default="hilos")
+    parser.add_argument("--concurrencia", type=int, default=16, help="Límite de turnos simultáneos (driver asyncio).")
+    parser.add_argument("--duracion", type=float, default=0.0, help="Segundos de soak; 0 = cada sesión una vez.")
+    parser.add_argument("--ventana", type=float, default=10.0, help="Segundos por ventana del reporte de soak.")
+    parser.add_argument("--transcripciones", help="JSONL con conversaciones grabadas.")
+    parser.add_argument("--pausa", type=float, default=0.0, help="Pausa media entre turnos de una sesión (s).")
+    parser.add_argument("--backend", choices=sorted(rag_idioma.PERSIST_DIRS), default="numpy")
+    parser.add_argument("--latencia-llm", type=float, default=0.05)
+    parser.add_argument("--latencia-token", type=float, default=0.002)
+    parser.add_argument("--latencia-embeddings", type=float, default=0.02)
+    parser.add_argument("--latencia-notion", type=float, default=0.1)
+    parser.add_argument("--tasa-errores-llm", type=float, default=0.0, help="Fracción de llamadas al modelo que fallan con 429.")
+    parser.add_argument("--despachador", action="store_true", help="El modelo detrás del despachador (tools/despachador_llm.py).")
+    parser.add_argument("--outbox", action="store_true", help="Registrar vía outbox en lugar de en línea.")
+    parser.add_argument("--salida", help="Además de imprimirlo, guarda el JSON en este archivo.")
+    args = parser.parse_args()
+
+    transcripciones = cargar_transcripciones(args.transcripciones)
+    with tempfile.TemporaryDirectory() as carpeta, redirect_stdout(sys.stderr):
+        modelo, embeddings, notion = preparar_entorno(carpeta, args)
+        modelo.tasa_errores = args.tasa_errores_llm
+        llm = LLMInstrumentado(modelo)
+        if args.despachador:
+            # mismo modelo falso en ambos niveles: se mide el despachador, no la diferencia entre modelos
+            llm = crear_despachador(lambda _nombre: LLMInstrumentado(modelo))
+        rag_idioma.inicializar_rag(force_rebuild=True, backend=args.backend)
+        calibrar()
+        rag_idioma.precargar()
+        REGISTRO.reiniciar()  # el reporte de métricas es solo de la carga
+
+        outbox = None
+        if args.outbox:
+            outbox = NotionOutbox(ruta=os.path.join(carpeta, "outbox.db"), max_por_segundo=1000)
+            outbox.iniciar(intervalo=0.05)
+        ruta_db = os.path.join(carpeta, "checkpoints.db")
+        checkpointer = abrir_checkpointer(ruta_db)
+        lock = checkpointer.lock = LockMedido(checkpointer.lock)
+        pool = PoolTutores(lambda: Tutor(llm), checkpointer=checkpointer, max_sesiones=max(args.sesiones, 1))
+        registrador = Registrador(outbox=outbox)
+        app = construir_grafo(pool, registrador).compile(checkpointer=checkpointer)
+
+        carga = Carga(app, transcripciones, args.sesiones, duracion=args.duracion, pausa=args.pausa)
+        muestras, detener = [], threading.Event()
+        threading.Thread(
+            target=_muestrear, args=(muestras, ruta_db, pool, args.ventana, detener), name="muestreo", daemon=True
+        ).start()
+        inicio = time.perf_counter()
+        if args.driver == "hilos":
+            segundos = carga.correr_hilos()
+        else:
+            segundos = carga.correr_asyncio(pool, args.concurrencia)
+        detener.set()
+        registrador.esperar(timeout=30)  # los registros se desprenden del turno
+        if outbox is not None:
+            outbox.flush(timeout=30)
+            outbox.detener()
+        checkpointer.conn.close()
+
+    reporte = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "config": dict(vars(args), transcripciones=len(transcripciones)),
+        "carga": resumir(carga.turnos, segundos, inicio, args.ventana if args.duracion > 0 else 0, muestras),
+        "checkpoint_lock": lock.resumen(segundos),
+        "modelo": dict(modelo.contadores(), errores_simulados=modelo.errores),
+        "despachador": llm.estado() if args.despachador else None,
+        "embeddings": {"llamadas": embeddings.llamadas},
+        "notion": dict(notion.llamadas, paginas=len(notion.paginas)),
+        "metricas": REGISTRO.snapshot(),
+        "memoria": {"max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)},
+    }
+    texto = json.dumps(reporte, indent=2, ensure_ascii=False)
+    print(texto)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as fh:
+            fh.write(texto)
+
+
+if __name__ == "__main__":
+    main()
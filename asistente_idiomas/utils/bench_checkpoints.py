@@ -0,0 +1,79 @@
+# utils/bench_checkpoints.py
+"""
+Mide cuántos bytes se escriben en checkpoints.db por turno de conversación,
+con un Tutor simulado (sin Gemini ni Notion).
+
+Con --historial-completo se reproduce el comportamiento anterior (enviar toda la
+lista de mensajes en cada invoke) para comparar: ahí los bytes por turno crecen
+con la sesión; enviando solo el mensaje nuevo se mantienen constantes.
+
+Uso: python -m asistente_idiomas.utils.bench_checkpoints [--turnos 60] [--historial-completo]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+
+from langchain_core.messages import HumanMessage
+
+from asistente_idiomas.grafo import construir_grafo
+from asistente_idiomas.agentes.registrador import Registrador
+from asistente_idiomas.utils.checkpoints import abrir_checkpointer
+
+
+class TutorSimulado:
+    """Responde siempre un texto fijo, con la misma interfaz de streaming que Tutor."""
+
+    def responder_stream(self, pregunta: str, diferir_consulta: bool = False):
+        respuesta = f"Respuesta a '{pregunta}'. " + "Texto de ejemplo. " * 20
+        yield respuesta
+        return {"respuesta": respuesta, "texto_para_guardar": None}
+
+
+def _bytes_guardados(checkpointer) -> int:
+    with checkpointer.cursor(transaction=False) as cur:
+        cur.execute("SELECT COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) FROM checkpoints")
+        checkpoints = cur.fetchone()[0]
+        cur.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM writes")
+        escrituras = cur.fetchone()[0]
+    return checkpoints + escrituras
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes escritos en checkpoints.db por turno.")
+    parser.add_argument("--turnos", type=int, default=60)
+    parser.add_argument("--historial-completo", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        checkpointer = abrir_checkpointer(os.path.join(carpeta, "checkpoints.db"))
+        app = construir_grafo(TutorSimulado(), Registrador()).compile(checkpointer=checkpointer)
+        config = {"configurable": {"thread_id": "bench"}}
+
+        historial, por_turno, anterior = [], [], 0
+        for turno in range(args.turnos):
+            mensaje = HumanMessage(content=f"Mensaje de prueba número {turno}")
+            if args.historial_completo:
+                historial.append(mensaje)
+                estado = app.invoke({"messages": historial}, config=config)
+                historial.append(estado["messages"][-1])
+            else:
+                app.invoke({"messages": [mensaje]}, config=config)
+            total = _bytes_guardados(checkpointer)
+            por_turno.append(total - anterior)
+            anterior = total
+        checkpointer.conn.close()
+
+    print(json.dumps({
+        "modo": "historial_completo" if args.historial_completo else "solo_mensaje_nuevo",
+        "turnos": args.turnos,
+        "bytes_primer_turno": por_turno[0],
+        "bytes_turno_medio": por_turno[len(por_turno) // 2],
+        "bytes_ultimo_turno": por_turno[-1],
+        "bytes_totales": sum(por_turno),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+# utils/bench_offline.py
+"""
+Benchmark sin red: mide el camino completo del asistente con dobles locales
+(ModeloFalso, EmbeddingsHash y NotionFalso de utils/dobles.py).
+
+1. Indexado: create_or_load_vectorstore en frío (reconstrucción) y en caliente,
+   más la calibración del umbral de similitud para los embeddings falsos.
+2. Búsqueda: buscar_vocabulario para términos del glosario y términos ajenos.
+3. Conversación guionada por el grafo compilado, pasando por todas las rutas
+   (saludo, definición con RAG, fallback, registro y charla libre).
+
+Reporta latencia por nodo y de punta a punta, tiempo al primer token, llamadas
+al modelo y tokens por turno, y memoria pico. El JSON sale por stdout (los logs
+del asistente van a stderr) para poder comparar corridas.
+
+Uso: python -m asistente_idiomas.utils.bench_offline [--backend numpy] [--repeticiones 3]
+     [--latencia-llm 0.05] [--latencia-token 0.002] [--latencia-embeddings 0.02]
+     [--latencia-notion 0.1] [--outbox] [--tracemalloc] [--salida reporte.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import statistics
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+
+from langchain_core.messages import HumanMessage
+
+from asistente_idiomas.tools import rag_idioma, notion_tool
+from asistente_idiomas.tools.embedding_cache import EmbeddingCache
+from asistente_idiomas.tools.notion_outbox import NotionOutbox
+from asistente_idiomas.agentes.tutor import Tutor, MARCA_DATOS
+from asistente_idiomas.agentes.registrador import Registrador
+from asistente_idiomas.agentes.pool_tutores import PoolTutores
+from asistente_idiomas.grafo import construir_grafo
+from asistente_idiomas.utils.checkpoints import abrir_checkpointer
+from asistente_idiomas.utils.dobles import ModeloFalso, EmbeddingsHash, NotionFalso
+from asistente_idiomas.utils.calibrar_umbral import calibrar
+from asistente_idiomas.utils.metricas import LLMInstrumentado, REGISTRO
+
+# (ruta esperada, mensaje del estudiante)
+CONVERSACION = [
+    ("saludo", "hola"),
+    ("definicion", "qué significa zorplin"),
+    ("registro", "guárdala, por favor"),
+    ("definicion", "qué significa glimpa y florblin"),
+    ("registro", "anótalas"),
+    ("fallback", "qué significa xylofrumpish"),
+    ("charla", "quiero practicar inglés"),
+    ("charla", "cómo se dice buenos días"),
+]
+
+TERMINOS_GLOSARIO = ["zorplin", "glimpa", "florblin", "apple", "hello"]
+TERMINOS_AJENOS = ["xylofrumpish", "quantum", "bicicleta azul"]
+
+
+def _percentil(valores: list[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def _resumen(valores: list[float]) -> dict:
+    return {
+        "media_ms": round(statistics.fmean(valores) * 1000, 3) if valores else 0.0,
+        "p50_ms": round(_percentil(valores, 50) * 1000, 3),
+        "p95_ms": round(_percentil(valores, 95) * 1000, 3),
+    }
+
+
+def _ruta_observada(llamadas: list[tuple[str, str]], nodos: dict) -> str:
+    """Deduce qué rama tomó el Tutor a partir de las llamadas que recibió el modelo."""
+    if any(p.startswith("Define y traduce") for _, p in llamadas):
+        return "fallback"
+    if any(MARCA_DATOS in p for _, p in llamadas):
+        return "definicion"
+    if "registrador" in nodos:
+        return "registro"
+    if any(tipo == "stream" for tipo, _ in llamadas):
+        return "charla"
+    return "saludo" if not llamadas else "otra"
+
+
+def preparar_entorno(carpeta: str, args) -> tuple[ModeloFalso, EmbeddingsHash, NotionFalso]:
+    """Apunta el RAG, las cachés y Notion a dobles locales dentro de `carpeta`."""
+    os.environ.setdefault("GEMINI_API_KEY", "offline")
+    rag_idioma.PERSIST_DIRS.update({b: os.path.join(carpeta, b) for b in rag_idioma.PERSIST_DIRS})
+
+    embeddings = EmbeddingsHash(latencia=args.latencia_embeddings)
+    rag_idioma._crear_embeddings = lambda: EmbeddingCache(
+        embeddings, nombre_modelo="hash", ruta=os.path.join(carpeta, "embeddings_cache.db")
+    )
+    notion = NotionFalso(latencia=args.latencia_notion)
+    notion_tool._notion = notion
+    notion_tool._registradas.clear()
+    modelo = ModeloFalso(latencia=args.latencia_llm, latencia_token=args.latencia_token)
+    return modelo, embeddings, notion
+
+
+def medir_indexado(backend: str, embeddings: EmbeddingsHash) -> dict:
+    llamadas_antes = embeddings.llamadas
+    inicio = time.perf_counter()
+    rag_idioma.inicializar_rag(force_rebuild=True, backend=backend)
+    reconstruccion = time.perf_counter() - inicio
+    llamadas_reconstruccion = embeddings.llamadas - llamadas_antes
+
+    inicio = time.perf_counter()
+    rag_idioma.inicializar_rag(backend=backend)
+    arranque = time.perf_counter() - inicio
+    rag_idioma.precargar()
+    caliente = time.perf_counter() - inicio
+    return {
+        "backend": backend,
+        "reconstruccion_s": round(reconstruccion, 4),
+        "llamadas_embeddings_reconstruccion": llamadas_reconstruccion,
+        "arranque_caliente_s": round(arranque, 4),
+        "arranque_caliente_con_precarga_s": round(caliente, 4),
+    }
+
+
+def medir_busqueda(repeticiones: int) -> dict:
+    resultado = {}
+    for nombre, terminos in (("glosario", TERMINOS_GLOSARIO), ("ajenos", TERMINOS_AJENOS)):
+        tiempos = []
+        for _ in range(repeticiones):
+            for termino in terminos:
+                inicio = time.perf_counter()
+                rag_idioma.buscar_vocabulario(termino)
+                tiempos.append(time.perf_counter() - inicio)
+        resultado[nombre] = _resumen(tiempos)
+    return resultado
+
+
+def medir_conversacion(modelo: ModeloFalso, app, repeticiones: int) -> list[dict]:
+    turnos = []
+    for rep in range(repeticiones):
+        config = {"configurable": {"thread_id": f"bench-{rep}"}}
+        for esperada, mensaje in CONVERSACION:
+            contadores_antes = modelo.contadores()
+            llamadas_antes = len(modelo.registro)
+            inicio = marca = time.perf_counter()
+            nodos, primer_token = {}, None
+            for modo, dato in app.stream(
+                {"messages": [HumanMessage(content=mensaje)]}, config=config, stream_mode=["updates", "custom"]
+            ):
+                ahora = time.perf_counter()
+                if modo == "custom":
+                    primer_token = primer_token if primer_token is not None else ahora - inicio
+                    continue
+                for nodo in dato:
+                    nodos[nodo] = ahora - marca
+                marca = ahora
+            total = time.perf_counter() - inicio
+
+            contadores = modelo.contadores()
+            turnos.append({
+                "repeticion": rep,
+                "mensaje": mensaje,
+                "ruta_esperada": esperada,
+                "ruta": _ruta_observada(modelo.registro[llamadas_antes:], nodos),
+                "total_s": total,
+                "primer_token_s": primer_token,
+                "nodos_s": nodos,
+                "llamadas_llm": contadores["llamadas"] - contadores_antes["llamadas"],
+                "tokens_entrada": contadores["tokens_entrada"] - contadores_antes["tokens_entrada"],
+                "tokens_salida": contadores["tokens_salida"] - contadores_antes["tokens_salida"],
+            })
+    return turnos
+
+
+def agregar_por_ruta(turnos: list[dict]) -> dict:
+    por_ruta = {}
+    for esperada in dict.fromkeys(t["ruta_esperada"] for t in turnos):
+        grupo = [t for t in turnos if t["ruta_esperada"] == esperada]
+        nodos = {}
+        for t in grupo:
+            for nodo, segundos in t["nodos_s"].items():
+                nodos.setdefault(nodo, []).append(segundos)
+        por_ruta[esperada] = {
+            "turnos": len(grupo),
+            "rutas_observadas": sorted({t["ruta"] for t in grupo}),
+            "total": _resumen([t["total_s"] for t in grupo]),
+            "primer_token": _resumen([t["primer_token_s"] for t in grupo if t["primer_token_s"] is not None]),
+            "nodos": {nodo: _resumen(valores) for nodo, valores in nodos.items()},
+            "llamadas_llm_por_turno": statistics.fmean(t["llamadas_llm"] for t in grupo),
+            "tokens_por_turno": statistics.fmean(t["tokens_entrada"] + t["tokens_salida"] for t in grupo),
+        }
+    return por_ruta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline del asistente (sin Gemini ni Notion).")
+    parser.add_argument("--backend", choices=sorted(rag_idioma.PERSIST_DIRS), default="numpy")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--latencia-llm", type=float, default=0.05)
+    parser.add_argument("--latencia-token", type=float, default=0.002)
+    parser.add_argument("--latencia-embeddings", type=float, default=0.02)
+    parser.add_argument("--latencia-notion", type=float, default=0.1)
+    parser.add_argument("--outbox", action="store_true", help="Registrar vía outbox en lugar de en línea.")
+    parser.add_argument("--tracemalloc", action="store_true", help="Mide el pico de memoria de Python (más lento).")
+    parser.add_argument("--salida", help="Además de imprimirlo, guarda el JSON en este archivo.")
+    args = parser.parse_args()
+
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    with tempfile.TemporaryDirectory() as carpeta, redirect_stdout(sys.stderr):
+        modelo, embeddings, notion = preparar_entorno(carpeta, args)
+        indexado = medir_indexado(args.backend, embeddings)
+        indexado["calibracion"] = calibrar()
+        busqueda = medir_busqueda(args.repeticiones)
+
+        outbox = None
+        if args.outbox:
+            outbox = NotionOutbox(ruta=os.path.join(carpeta, "outbox.db"), max_por_segundo=1000)
+            outbox.iniciar(intervalo=0.05)
+        checkpointer = abrir_checkpointer(os.path.join(carpeta, "checkpoints.db"))
+        # un Tutor nuevo por repetición (cada una es otro thread_id), como en el modo servidor
+        pool = PoolTutores(lambda: Tutor(LLMInstrumentado(modelo)))
+        registrador = Registrador(outbox=outbox)
+        app = construir_grafo(pool, registrador).compile(checkpointer=checkpointer)
+        turnos = medir_conversacion(modelo, app, args.repeticiones)
+        registrador.esperar(timeout=30)  # los registros se desprenden del turno
+        if outbox is not None:
+            outbox.flush(timeout=30)
+            outbox.detener()
+        checkpointer.conn.close()
+
+    reporte = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "config": vars(args),
+        "indexado": indexado,
+        "busqueda": busqueda,
+        "conversacion": {
+            "turnos": len(turnos),
+            "total": _resumen([t["total_s"] for t in turnos]),
+            "por_ruta": agregar_por_ruta(turnos),
+        },
+        "notion": dict(notion.llamadas, paginas=len(notion.paginas)),
+        "metricas": REGISTRO.snapshot(),
+        "memoria": {
+            "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "pico_tracemalloc_mb": round(tracemalloc.get_traced_memory()[1] / 2**20, 1) if args.tracemalloc else None,
+        },
+    }
+    texto = json.dumps(reporte, indent=2, ensure_ascii=False)
+    print(texto)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as fh:
+            fh.write(texto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# utils/bench_vectorstore.py
+"""
+Compara los backends de vectores (Chroma vs NumPy) sin llamar a la API de Gemini:
+usa embeddings deterministas falsos sobre los mismos chunks del conocimiento.
+
+Mide:
+1. Arranque en frío (abrir el índice persistido).
+2. Latencia de búsqueda top-k por consulta (p50 / p99).
+3. Búsqueda en lote (todas las consultas juntas).
+
+Uso: python -m asistente_idiomas.utils.bench_vectorstore [--dtype int8]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from asistente_idiomas.tools import rag_idioma
+
+
+def _percentil(valores: list[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def medir_backend(backend: str, splits, consultas: list[str], embeddings, carpeta: str, dtype: str) -> dict:
+    os.environ["RAG_NUMPY_DTYPE"] = dtype
+    persist_dir = os.path.join(carpeta, backend)
+    docs, ids = rag_idioma._splits_con_ids(splits)
+    rag_idioma._abrir_vectorstore(backend, embeddings, persist_dir).add_documents(docs, ids=ids)
+
+    inicio = time.perf_counter()
+    store = rag_idioma._abrir_vectorstore(backend, embeddings, persist_dir)
+    store.similarity_search("warm-up", k=3)
+    arranque_ms = (time.perf_counter() - inicio) * 1000
+
+    vectores = [embeddings.embed_query(c) for c in consultas]
+    latencias = []
+    for v in vectores:
+        t = time.perf_counter()
+        store.similarity_search_by_vector(v, k=3)
+        latencias.append((time.perf_counter() - t) * 1000)
+
+    t = time.perf_counter()
+    if hasattr(store, "similarity_search_by_vectors"):
+        store.similarity_search_by_vectors(vectores, k=3)
+    else:
+        store._collection.query(query_embeddings=vectores, n_results=3)
+    lote_ms = (time.perf_counter() - t) * 1000
+
+    return {
+        "backend": backend,
+        "chunks": len(docs),
+        "arranque_ms": round(arranque_ms, 3),
+        "busqueda_p50_ms": round(statistics.median(latencias), 4),
+        "busqueda_p99_ms": round(_percentil(latencias, 99), 4),
+        "lote_total_ms": round(lote_ms, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de backends de vectores.")
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16", "int8"])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--consultas", type=int, default=200)
+    args = parser.parse_args()
+
+    splits = rag_idioma.RecursiveCharacterTextSplitter(
+        separators=["\n- ", "\n", ".", " "], chunk_size=150, chunk_overlap=20
+    ).split_documents(rag_idioma.load_documents())
+    consultas = [d.page_content.split("→")[0][:40] for d in splits][: args.consultas]
+    embeddings = DeterministicFakeEmbedding(size=args.dim)
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        resultados = [medir_backend(b, splits, consultas, embeddings, carpeta, args.dtype) for b in ("chroma", "numpy")]
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# utils/calibrar_umbral.py
+"""
+Calibra el umbral de similitud de la recuperación híbrida (tools/rag_idioma.py)
+para el modelo de embeddings y el conocimiento actuales.
+
+1. Positivos: variantes de los términos del glosario que no coinciden literalmente
+   (una errata, la traducción) y cuya similitud se mide contra el chunk que los contiene.
+2. Negativos: palabras inventadas y temas ajenos que no aparecen en ningún chunk.
+3. Se elige el umbral que maximiza TPR - FPR y se guarda junto al vectorstore
+   (_umbral.json). RAG_UMBRAL_SIMILITUD en el .env sigue teniendo prioridad.
+
+Uso: python -m asistente_idiomas.utils.calibrar_umbral [--backend numpy] [--no-guardar]
+"""
+
+import random
+import argparse
+from datetime import datetime
+
+from asistente_idiomas.tools import rag_idioma
+from asistente_idiomas.tools.glosario import normalizar
+
+AJENOS = [
+    "quantum", "blockchain", "kubernetes", "fotosíntesis", "termodinámica", "hipoteca",
+    "criptografía", "volcán", "astrofísica", "impuestos", "algoritmo", "mitocondria",
+]
+SILABAS = ["xy", "lo", "frum", "pish", "qua", "zed", "brak", "tul", "vex", "om", "dri", "snor"]
+
+
+def _errata(termino: str, rng: random.Random) -> str | None:
+    """Intercambia dos letras vecinas del medio: 'florblin' -> 'flobrlin'."""
+    if len(termino) < 5 or " " in termino:
+        return None
+    i = rng.randrange(1, len(termino) - 2)
+    return termino[:i] + termino[i + 1] + termino[i] + termino[i + 2:]
+
+
+def muestras(semilla: int = 7, max_positivos: int = 200) -> tuple[list[tuple[str, str]], list[str]]:
+    """(consulta, término que debe contener el chunk relevante) y consultas negativas."""
+    rng = random.Random(semilla)
+    indice = rag_idioma._obtener_indice_lexico()
+    positivos = []
+    for clave, entradas in indice.terminos.items():
+        entrada = entradas[0]
+        if normalizar(entrada.termino.split("/")[0]) != clave:
+            continue  # una variante por entrada
+        errata = _errata(clave, rng)
+        if errata and not indice.buscar(errata):
+            positivos.append((errata, clave))
+        traduccion = entrada.traduccion.split("/")[0].strip()
+        if entrada.categoria == "" and traduccion:
+            positivos.append((traduccion, clave))
+    rng.shuffle(positivos)
+
+    inventadas = ["".join(rng.sample(SILABAS, 3)) for _ in range(24)]
+    # un negativo que aparece en algún chunk no es un negativo
+    negativos = [c for c in dict.fromkeys(AJENOS + inventadas) if not rag_idioma._buscar_bm25(c, k=1)]
+    return positivos[:max_positivos], negativos
+
+
+def _similitudes(consultas: list[str]) -> list[list[tuple]]:
+    vectores = rag_idioma._embeber_consultas(consultas)
+    return rag_idioma._buscar_por_vectores(vectores, rag_idioma.CANDIDATOS)
+
+
+def calibrar(guardar: bool = True) -> dict:
+    positivos, negativos = muestras()
+    if not positivos or not negativos:
+        raise ValueError("No hay suficientes muestras para calibrar (¿glosario vacío?).")
+
+    # positivo: similitud del chunk que contiene el término (-1 si no aparece entre los candidatos)
+    puntajes_pos = []
+    for (_, termino), resultados in zip(positivos, _similitudes([c for c, _ in positivos])):
+        relevantes = [s for doc, s in resultados if s is not None and termino in normalizar(doc.page_content)]
+        puntajes_pos.append(max(relevantes, default=-1.0))
+    # negativo: la mejor similitud que consigue (cualquier chunk aceptado sería un falso positivo)
+    puntajes_neg = [
+        max((s for _, s in resultados if s is not None), default=-1.0)
+        for resultados in _similitudes(negativos)
+    ]
+
+    mejor = None
+    for umbral in sorted(set(puntajes_pos + puntajes_neg)):
+        tpr = sum(p >= umbral for p in puntajes_pos) / len(puntajes_pos)
+        fpr = sum(n >= umbral for n in puntajes_neg) / len(puntajes_neg)
+        if mejor is None or tpr - fpr > mejor[1] - mejor[2]:
+            mejor = (umbral, tpr, fpr)
+    umbral, tpr, fpr = mejor
+    # el punto medio hasta el negativo más cercano por debajo deja margen a ambos lados
+    debajo = [n for n in puntajes_neg if n < umbral]
+    if debajo:
+        umbral = (umbral + max(debajo)) / 2
+
+    calibracion = {
+        "modelo": getattr(rag_idioma._obtener_embeddings(), "nombre_modelo", rag_idioma.EMBEDDING_MODEL),
+        "umbral": round(umbral, 4),
+        "tpr": round(tpr, 3),
+        "fpr": round(fpr, 3),
+        "positivos": len(puntajes_pos),
+        "negativos": len(puntajes_neg),
+        "huella": rag_idioma.huella_conocimiento(),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+    }
+    if guardar:
+        rag_idioma.guardar_calibracion(calibracion)
+    return calibracion
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibra el umbral de similitud del RAG.")
+    parser.add_argument("--backend", choices=sorted(rag_idioma.PERSIST_DIRS), default=None)
+    parser.add_argument("--no-guardar", action="store_true", help="Solo muestra el resultado.")
+    args = parser.parse_args()
+
+    rag_idioma.inicializar_rag(backend=args.backend)
+    calibracion = calibrar(guardar=not args.no_guardar)
+    print(
+        f"🎯 Umbral de similitud: {calibracion['umbral']} "
+        f"(TPR {calibracion['tpr']:.0%}, FPR {calibracion['fpr']:.0%}; "
+        f"{calibracion['positivos']} positivos, {calibracion['negativos']} negativos)"
+    )
+    if not args.no_guardar:
+        print("💾 Calibración guardada; el RAG la usará en las próximas búsquedas.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+utils/checkpoints.py
+
+Mantenimiento de la base de checkpoints de LangGraph (checkpoints.db):
+1. Abre el SqliteSaver con WAL y sincronización NORMAL (menos fsync por turno).
+2. Poda los checkpoints viejos de cada conversación, conservando solo los últimos N.
+3. Compacta el archivo (checkpoint del WAL + VACUUM) para devolver el espacio al disco.
+"""
+
+import sqlite3
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+
+def abrir_checkpointer(ruta: str = "checkpoints.db") -> SqliteSaver:
+    """Crea el SqliteSaver sobre una conexión en modo WAL."""
+    # check_same_thread=False es seguro: SqliteSaver serializa el acceso con su propio lock
+    conn = sqlite3.connect(ruta, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return SqliteSaver(conn)
+
+
+def podar_checkpoints(checkpointer: SqliteSaver, conservar: int = 5, thread_id: str | None = None) -> int:
+    """
+    Borra los checkpoints más antiguos de cada conversación (o solo de thread_id)
+    dejando los últimos `conservar`, junto con sus escrituras pendientes.
+    Devuelve la cantidad de checkpoints eliminados.
+    """
+    filtro, parametros = ("WHERE thread_id = ?", (thread_id,)) if thread_id else ("", ())
+    with checkpointer.cursor() as cur:
+        # los checkpoint_id son UUIDv6: el orden lexicográfico es el orden temporal
+        cur.execute(
+            f"""
+            DELETE FROM checkpoints
+            WHERE rowid IN (
+                SELECT rowid FROM (
+                    SELECT rowid, ROW_NUMBER() OVER (
+                        PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+                    ) AS orden
+                    FROM checkpoints {filtro}
+                ) WHERE orden > ?
+            )
+            """,
+            (*parametros, conservar),
+        )
+        eliminados = cur.rowcount
+        cur.execute(
+            """
+            DELETE FROM writes
+            WHERE NOT EXISTS (
+                SELECT 1 FROM checkpoints c
+                WHERE c.thread_id = writes.thread_id
+                  AND c.checkpoint_ns = writes.checkpoint_ns
+                  AND c.checkpoint_id = writes.checkpoint_id
+            )
+            """
+        )
+    return eliminados
+
+
+def compactar(checkpointer: SqliteSaver):
+    """Vuelca el WAL a la base y ejecuta VACUUM para recuperar el espacio liberado."""
+    with checkpointer.cursor(transaction=False) as cur:
+        cur.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        cur.execute("VACUUM")
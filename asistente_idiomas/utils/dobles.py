@@ -0,0 +1,254 @@
+"""
+utils/dobles.py
+
+Dobles locales de los servicios externos, para medir sin claves de Gemini ni Notion:
+1. ModeloFalso: chat model determinista con latencia configurable (invoke, stream
+   y with_structured_output), que cuenta llamadas y tokens. Si el prompt pide los datos
+   de las palabras tras MARCA_DATOS, los agrega al final como lo haría el modelo.
+2. EmbeddingsHash: embeddings deterministas por hash de trigramas de caracteres.
+3. NotionFalso: base de Notion en memoria con la misma API que usa notion_tool.
+"""
+
+import re
+import json
+import math
+import time
+import random
+import uuid
+import hashlib
+import threading
+from datetime import datetime, timezone
+from typing import get_args, get_origin
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, AIMessageChunk
+from pydantic import BaseModel
+
+from asistente_idiomas.agentes.contexto import estimar_tokens
+from asistente_idiomas.agentes.tutor import MARCA_DATOS
+
+
+def _texto(mensajes) -> str:
+    if isinstance(mensajes, str):
+        return mensajes
+    return "\n".join(getattr(m, "content", str(m)) for m in mensajes)
+
+
+def _terminos_citados(prompt: str) -> list[str]:
+    # los prompts del Tutor citan los términos entre comillas simples: 'glimpa, zorplin'
+    citado = re.search(r"'([^']+)'", prompt)
+    return [t.strip() for t in citado.group(1).split(",")] if citado else []
+
+
+class ModeloFalso:
+    """
+    Imita la interfaz de ChatGoogleGenerativeAI que usan Tutor y GestorContexto.
+    latencia: segundos por llamada (antes del primer token); latencia_token: por token en stream.
+    tasa_errores: fracción de llamadas que fallan con un 429 simulado (para probar reintentos).
+    """
+
+    model = "modelo-falso"
+
+    def __init__(self, latencia: float = 0.0, latencia_token: float = 0.0, tokens_respuesta: int = 40,
+                 tasa_errores: float = 0.0, semilla: int = 0):
+        self.latencia = latencia
+        self.latencia_token = latencia_token
+        self.tokens_respuesta = tokens_respuesta
+        self.tasa_errores = tasa_errores
+        self._rng = random.Random(semilla)
+        self._lock = threading.Lock()
+        self.llamadas = 0
+        self.tokens_entrada = 0
+        self.tokens_salida = 0
+        self.errores = 0
+        self.registro = []  # (tipo, prompt) de cada llamada, para saber qué ruta se tomó
+
+    def _contar(self, tipo: str, prompt: str, salida: str):
+        with self._lock:
+            self.llamadas += 1
+            self.tokens_entrada += estimar_tokens(prompt)
+            self.tokens_salida += estimar_tokens(salida)
+            self.registro.append((tipo, prompt))
+
+    def _quizas_fallar(self):
+        time.sleep(self.latencia)
+        with self._lock:
+            falla = self.tasa_errores and self._rng.random() < self.tasa_errores
+            if falla:
+                self.errores += 1
+        if falla:
+            raise RuntimeError("429 Resource exhausted (simulado)")
+
+    def contadores(self) -> dict:
+        with self._lock:
+            return {"llamadas": self.llamadas, "tokens_entrada": self.tokens_entrada, "tokens_salida": self.tokens_salida}
+
+    def _respuesta(self, prompt: str) -> str:
+        semilla = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        palabras = [semilla[i:i + 5] for i in range(0, 60, 5)]
+        texto = " ".join(palabras[i % len(palabras)] for i in range(self.tokens_respuesta))
+        if MARCA_DATOS in prompt:
+            datos = [
+                {"palabra": t, "traduccion": palabras[0], "ejemplo": f"{t} {palabras[1]}", "idioma": "inglés"}
+                for t in _terminos_citados(prompt)
+            ]
+            texto += f"\n{MARCA_DATOS}\n{json.dumps(datos, ensure_ascii=False)}"
+        return texto
+
+    def invoke(self, mensajes, **kwargs):
+        prompt = _texto(mensajes)
+        self._quizas_fallar()
+        salida = self._respuesta(prompt)
+        self._contar("invoke", prompt, salida)
+        return AIMessage(content=salida)
+
+    def stream(self, mensajes, **kwargs):
+        prompt = _texto(mensajes)
+        self._quizas_fallar()
+        salida = self._respuesta(prompt)
+        for i, token in enumerate(salida.split(" ")):
+            if self.latencia_token:
+                time.sleep(self.latencia_token)
+            yield AIMessageChunk(content=token if i == 0 else f" {token}")
+        self._contar("stream", prompt, salida)
+
+    def with_structured_output(self, schema, **kwargs):
+        return _SalidaEstructuradaFalsa(self, schema)
+
+
+class _SalidaEstructuradaFalsa:
+    """Devuelve una instancia del schema pydantic pedido, con una entrada por término citado."""
+
+    def __init__(self, modelo: ModeloFalso, schema):
+        self.modelo = modelo
+        self.schema = schema
+
+    def _instanciar(self, schema, texto: str, terminos: list[str]):
+        valores = {}
+        for nombre, campo in schema.model_fields.items():
+            anotacion = campo.annotation
+            interno = get_args(anotacion)[0] if get_origin(anotacion) is list and get_args(anotacion) else None
+            if isinstance(interno, type) and issubclass(interno, BaseModel):
+                valores[nombre] = [self._instanciar(interno, t, [t]) for t in terminos]
+            elif nombre in ("palabra", "termino"):
+                valores[nombre] = terminos[0] if terminos else texto
+            elif nombre == "idioma":
+                valores[nombre] = "inglés"
+            else:
+                valores[nombre] = texto
+        return schema(**valores)
+
+    def invoke(self, mensajes, **kwargs):
+        prompt = _texto(mensajes)
+        self.modelo._quizas_fallar()
+        terminos = _terminos_citados(prompt)
+        salida = self.modelo._respuesta(prompt)
+        self.modelo._contar("estructurada", prompt, salida)
+        return self._instanciar(self.schema, salida, terminos)
+
+
+class EmbeddingsHash(Embeddings):
+    """Vector = trigramas de caracteres hasheados a `dim` posiciones (normalizado). Sin red."""
+
+    def __init__(self, dim: int = 256, latencia: float = 0.0):
+        self.dim = dim
+        self.latencia = latencia
+        self.llamadas = 0
+        self.textos = 0
+
+    def _vector(self, texto: str) -> list[float]:
+        v = [0.0] * self.dim
+        texto = f"  {texto.lower()}  "
+        for i in range(len(texto) - 2):
+            h = int.from_bytes(hashlib.blake2b(texto[i:i + 3].encode("utf-8"), digest_size=4).digest(), "little")
+            v[h % self.dim] += 1.0 if h & 1 << 31 else -1.0
+        norma = math.sqrt(sum(x * x for x in v)) or 1.0
+        return [x / norma for x in v]
+
+    def embed_documents(self, texts: list[str], **kwargs) -> list[list[float]]:
+        time.sleep(self.latencia)
+        self.llamadas += 1
+        self.textos += len(texts)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+
+def _ahora_iso() -> str:
+    # mismo formato que los timestamps de la API: '2025-01-31T12:00:00.000Z'
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _como_api(properties: dict) -> dict:
+    """Como la API real, los fragmentos de texto vuelven con 'plain_text'."""
+    salida = {}
+    for nombre, valor in properties.items():
+        valor = dict(valor)
+        for tipo in ("title", "rich_text"):
+            if tipo in valor:
+                valor[tipo] = [dict(f, plain_text=f.get("text", {}).get("content", "")) for f in valor[tipo]]
+        salida[nombre] = valor
+    return salida
+
+
+class _PaginasFalsas:
+    def __init__(self, base):
+        self.base = base
+
+    def create(self, parent: dict, properties: dict) -> dict:
+        time.sleep(self.base.latencia)
+        page_id = str(uuid.uuid4())
+        ahora = _ahora_iso()
+        with self.base.lock:
+            self.base.paginas[page_id] = {
+                "id": page_id, "properties": _como_api(properties), "created_time": ahora, "last_edited_time": ahora,
+            }
+            self.base.llamadas["pages.create"] += 1
+        return {"id": page_id}
+
+    def update(self, page_id: str, properties: dict) -> dict:
+        time.sleep(self.base.latencia)
+        with self.base.lock:
+            if page_id not in self.base.paginas:
+                raise KeyError(f"Página inexistente: {page_id}")
+            self.base.paginas[page_id]["properties"].update(_como_api(properties))
+            self.base.paginas[page_id]["last_edited_time"] = _ahora_iso()
+            self.base.llamadas["pages.update"] += 1
+        return {"id": page_id}
+
+
+class _BasesFalsas:
+    def __init__(self, base):
+        self.base = base
+
+    def query(self, database_id: str, page_size: int = 100, start_cursor: str | None = None, **kwargs) -> dict:
+        time.sleep(self.base.latencia)
+        with self.base.lock:
+            paginas = list(self.base.paginas.values())
+            self.base.llamadas["databases.query"] += 1
+        # solo lo que usa el asistente: filtro on_or_after y orden por last_edited_time
+        desde = ((kwargs.get("filter") or {}).get("last_edited_time") or {}).get("on_or_after")
+        if desde:
+            paginas = [p for p in paginas if p["last_edited_time"] >= desde]
+        if kwargs.get("sorts"):
+            paginas.sort(key=lambda p: p["last_edited_time"])
+        inicio = int(start_cursor or 0)
+        fin = inicio + page_size
+        return {
+            "results": paginas[inicio:fin],
+            "has_more": fin < len(paginas),
+            "next_cursor": str(fin) if fin < len(paginas) else None,
+        }
+
+
+class NotionFalso:
+    """Reemplaza al Client de notion_client: notion_tool._notion = NotionFalso()."""
+
+    def __init__(self, latencia: float = 0.0):
+        self.latencia = latencia
+        self.lock = threading.Lock()
+        self.paginas: dict[str, dict] = {}
+        self.llamadas = {"pages.create": 0, "pages.update": 0, "databases.query": 0}
+        self.pages = _PaginasFalsas(self)
+        self.databases = _BasesFalsas(self)
@@ -0,0 +1,286 @@
+# utils/ingestar.py
+"""
+Ingesta en lote de corpus grandes (listas de frecuencia, glosarios bilingües) al
+vectorstore del RAG, sin cargar los archivos enteros en memoria:
+
+1. Recorre las carpetas recursivamente (.txt, .md con el formato de glosario y
+   .tsv 'termino<TAB>traduccion[<TAB>ejemplo]').
+2. Lee cada archivo por bloques de ~1 MB cortados en límites de entrada y los
+   trocea con el chunker del glosario en un pool de procesos.
+3. Embebe en lotes de tamaño fijo (solo los chunks que aún no están) y hace upsert.
+4. Guarda el progreso por archivo y bloque: si se corta, se retoma donde quedó
+   (con otro --bloque-mb los números de bloque no coinciden: el archivo se empieza de nuevo).
+
+Una carpeta con nombre de idioma ('fr', 'fr-es') fija el par de idiomas de lo que contiene.
+Los chunks quedan con source = ruta relativa ('corpus/fr/frecuencias.tsv').
+
+Uso: python -m asistente_idiomas.utils.ingestar CARPETA [CARPETA ...] [--backend numpy]
+     [--lote 64] [--procesos 4] [--bloque-mb 1] [--desde-cero]
+"""
+
+import os
+import re
+import json
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_core.documents import Document
+
+from asistente_idiomas.tools import rag_idioma
+from asistente_idiomas.tools.chunker import dividir_glosario
+
+PROGRESO_NAME = "_ingesta.json"
+EXTENSIONES = (".txt", ".md", ".tsv")
+_CARPETA_IDIOMA = re.compile(r"^[a-z]{2}(-[a-z]{2})?$")
+
+
+# ---------- lectura ----------
+def recorrer(raiz: str):
+    """Archivos ingeribles bajo `raiz`, en orden estable: (ruta, source)."""
+    base = os.path.dirname(os.path.abspath(raiz))
+    for carpeta, subcarpetas, archivos in os.walk(raiz):
+        subcarpetas.sort()
+        for nombre in sorted(archivos):
+            if nombre.endswith(EXTENSIONES):
+                ruta = os.path.join(carpeta, nombre)
+                yield ruta, os.path.relpath(os.path.abspath(ruta), base).replace(os.sep, "/")
+
+
+def par_de_carpeta(source: str) -> str:
+    """'corpus/fr/lista.tsv' -> 'fr'; '' si ninguna carpeta indica el idioma."""
+    for parte in reversed(source.split("/")[:-1]):
+        if _CARPETA_IDIOMA.match(parte.lower()):
+            return parte.lower()
+    return ""
+
+
+def _linea_tsv(linea: str) -> str:
+    columnas = [c.strip() for c in linea.rstrip("\n").split("\t")]
+    if len(columnas) < 2 or not columnas[1] or columnas[1].replace(".", "").isdigit():
+        return columnas[0] + "\n"  # lista de frecuencias: la segunda columna es un conteo
+    extra = "".join(f"  {c}\n" for c in columnas[2:] if c)
+    return f"- {columnas[0]} → {columnas[1]}\n{extra}"
+
+
+def bloques(ruta: str, max_bytes: int):
+    """
+    Lee línea a línea y corta en bloques de ~max_bytes. Solo se corta antes de una línea
+    sin indentar (nunca en medio de una entrada) y se repite el título de la sección vigente.
+    """
+    seccion, lineas, tamano = "", [], 0
+    tsv = ruta.endswith(".tsv")
+    with open(ruta, "r", encoding="utf-8", errors="replace") as fh:
+        for linea in fh:
+            if tsv:
+                linea = _linea_tsv(linea)
+            limpia = linea.strip()
+            es_titulo = limpia.startswith("#")
+            if tamano >= max_bytes and not linea[:1].isspace():
+                yield "".join(lineas)
+                lineas = [f"## {seccion}\n"] if seccion and not es_titulo else []
+                tamano = 0
+            if es_titulo:
+                seccion = limpia.lstrip("#").strip()
+            lineas.append(linea)
+            tamano += len(linea)
+    if lineas:
+        yield "".join(lineas)
+
+
+def _trocear(tarea: tuple) -> tuple:
+    """Corre en el pool: bloque de texto -> [(id, texto, metadatos)]."""
+    source, indice, ultimo, texto, par = tarea
+    metadata = {"source": source, "par_idiomas": par} if par else {"source": source}
+    chunks = dividir_glosario(Document(page_content=texto, metadata=metadata))
+    return source, indice, ultimo, [(rag_idioma._chunk_id(c), c.page_content, c.metadata) for c in chunks]
+
+
+def _en_paralelo(fn, tareas, procesos: int):
+    """Como map(), en orden, con a lo sumo 2 tareas por proceso en vuelo (memoria acotada)."""
+    if procesos <= 1:
+        yield from map(fn, tareas)
+        return
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        en_vuelo = deque()
+        for tarea in tareas:
+            en_vuelo.append(pool.submit(fn, tarea))
+            if len(en_vuelo) >= procesos * 2:
+                yield en_vuelo.popleft().result()
+        while en_vuelo:
+            yield en_vuelo.popleft().result()
+
+
+# ---------- progreso ----------
+def _firma(ruta: str) -> list:
+    st = os.stat(ruta)
+    return [st.st_size, int(st.st_mtime)]
+
+
+def leer_progreso(persist_dir: str) -> dict:
+    ruta = os.path.join(persist_dir, PROGRESO_NAME)
+    if os.path.exists(ruta):
+        try:
+            with open(ruta, "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except Exception:
+            pass
+    return {"archivos": {}}
+
+
+def guardar_progreso(progreso: dict, persist_dir: str):
+    os.makedirs(persist_dir, exist_ok=True)
+    ruta = os.path.join(persist_dir, PROGRESO_NAME)
+    with open(ruta + ".tmp", "w", encoding="utf-8") as fh:
+        json.dump(progreso, fh, ensure_ascii=False, indent=2)
+    os.replace(ruta + ".tmp", ruta)
+
+
+# ---------- ingesta ----------
+class Ingesta:
+    def __init__(self, vectorstore, persist_dir: str, lote: int = 64,
+                 procesos: int = 4, bloque_bytes: int = 2**20, desde_cero: bool = False,
+                 guardar_cada: float = 5.0):
+        self.vectorstore = vectorstore
+        self.persist_dir = persist_dir
+        self.lote = lote
+        self.procesos = procesos
+        self.bloque_bytes = bloque_bytes
+        self.guardar_cada = guardar_cada  # segundos entre escrituras del progreso
+        self.progreso = {"archivos": {}} if desde_cero else leer_progreso(persist_dir)
+        self.stats = {"archivos": 0, "omitidos": 0, "chunks": 0, "nuevos": 0, "lotes": 0}
+        self._inicio = self._ultimo_reporte = self._ultimo_guardado = 0.0
+
+    def _tareas(self, raices: list[str]):
+        """Bloques pendientes de todos los archivos, saltando lo que el progreso ya cubre."""
+        for raiz in raices:
+            for ruta, source in recorrer(raiz):
+                firma = _firma(ruta)
+                estado = self.progreso["archivos"].get(source)
+                if estado and estado["firma"] == firma and estado.get("completo"):
+                    self.stats["omitidos"] += 1
+                    continue
+                # los números de bloque solo valen con el mismo tamaño de bloque
+                if estado is None or estado["firma"] != firma or estado.get("bloque_bytes") != self.bloque_bytes:
+                    if estado is not None:
+                        # el archivo cambió (o sus bloques): sus chunks viejos se borran y se empieza de nuevo
+                        if estado["firma"] == firma:
+                            print(f"♻️ '{source}' se había empezado con otro tamaño de bloque: se ingiere de nuevo.")
+                        viejos = self.vectorstore.get(where={"source": source}, include=[])["ids"]
+                        if viejos:
+                            self.vectorstore.delete(ids=viejos)
+                    estado = self.progreso["archivos"][source] = {
+                        "firma": firma, "bloque_bytes": self.bloque_bytes, "bloques": 0, "completo": False,
+                    }
+                self.stats["archivos"] += 1
+                par = par_de_carpeta(source)
+                anterior = None
+                for i, texto in enumerate(bloques(ruta, self.bloque_bytes)):
+                    if i < estado["bloques"]:
+                        continue
+                    if anterior is not None:
+                        yield anterior
+                    anterior = (source, i, False, texto, par)
+                if anterior is not None:
+                    yield anterior[:2] + (True,) + anterior[3:]
+                else:
+                    # nada pendiente (o archivo vacío): igual hay que marcarlo completo
+                    yield source, estado["bloques"], True, "", par
+
+    def _upsert(self, lote: list[tuple]):
+        # los IDs son hashes del contenido: solo se embebe lo que aún no está
+        nuevos = rag_idioma.upsert_chunks(
+            [cid for cid, _, _ in lote],
+            [Document(page_content=texto, metadata=meta) for _, texto, meta in lote],
+            persistir=False,
+        )
+        self.stats["chunks"] += len(lote)
+        self.stats["nuevos"] += nuevos
+        self.stats["lotes"] += 1
+
+    def _confirmar(self, confirmables: list[tuple], forzar: bool = False):
+        """Marca bloques como hechos; el progreso en disco nunca va por delante del vectorstore."""
+        for source, indice, ultimo in confirmables:
+            estado = self.progreso["archivos"][source]
+            estado["bloques"] = indice + 1
+            estado["completo"] = ultimo
+        ahora = time.perf_counter()
+        if forzar or ahora - self._ultimo_guardado >= self.guardar_cada:
+            if hasattr(self.vectorstore, "add_vectores"):
+                self.vectorstore.persist()
+            guardar_progreso(self.progreso, self.persist_dir)
+            self._ultimo_guardado = ahora
+
+    def _reportar(self, final: bool = False):
+        ahora = time.perf_counter()
+        if not final and ahora - self._ultimo_reporte < 2:
+            return
+        self._ultimo_reporte = ahora
+        s = self.stats
+        velocidad = s["chunks"] / max(ahora - self._inicio, 1e-9)
+        print(
+            f"{'✅' if final else '📥'} {s['archivos']} archivo(s) ({s['omitidos']} ya ingeridos), "
+            f"{s['chunks']} chunks ({s['nuevos']} nuevos) en {s['lotes']} lote(s) — {velocidad:.0f} chunks/s"
+        )
+
+    def ejecutar(self, raices: list[str]) -> dict:
+        self._inicio = self._ultimo_guardado = time.perf_counter()
+        pendientes, por_confirmar = [], deque()  # por_confirmar: (chunks hasta ese bloque, source, i, ultimo)
+        encolados = enviados = 0
+        for source, indice, ultimo, chunks in _en_paralelo(_trocear, self._tareas(raices), self.procesos):
+            pendientes.extend(chunks)
+            encolados += len(chunks)
+            por_confirmar.append((encolados, source, indice, ultimo))
+            while len(pendientes) >= self.lote:
+                self._upsert(pendientes[:self.lote])
+                del pendientes[:self.lote]
+                enviados += self.lote
+                self._confirmar(self._listos(por_confirmar, enviados))
+                self._reportar()
+        if pendientes:
+            self._upsert(pendientes)
+            enviados += len(pendientes)
+        self._confirmar(self._listos(por_confirmar, enviados), forzar=True)
+        self._reportar(final=True)
+        return dict(self.stats, segundos=round(time.perf_counter() - self._inicio, 3))
+
+    @staticmethod
+    def _listos(por_confirmar: deque, enviados: int) -> list[tuple]:
+        listos = []
+        while por_confirmar and por_confirmar[0][0] <= enviados:
+            _, source, indice, ultimo = por_confirmar.popleft()
+            listos.append((source, indice, ultimo))
+        return listos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingesta en lote de corpus al RAG de idiomas.")
+    parser.add_argument("carpetas", nargs="+")
+    parser.add_argument("--backend", choices=sorted(rag_idioma.PERSIST_DIRS), default=None)
+    parser.add_argument("--lote", type=int, default=64, help="Chunks por llamada de embeddings.")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1, help="Procesos para leer y trocear.")
+    parser.add_argument("--bloque-mb", type=float, default=1.0, help="Tamaño de los bloques de lectura.")
+    parser.add_argument("--desde-cero", action="store_true", help="Ignora el progreso guardado.")
+    args = parser.parse_args()
+
+    for carpeta in args.carpetas:
+        if not os.path.isdir(carpeta):
+            raise FileNotFoundError(f"No se encontró la carpeta: {carpeta}")
+
+    rag_idioma.inicializar_rag(backend=args.backend)
+    ingesta = Ingesta(
+        rag_idioma._obtener_vectorstore(),
+        rag_idioma._persist_dir,
+        lote=args.lote,
+        procesos=args.procesos,
+        bloque_bytes=int(args.bloque_mb * 2**20),
+        desde_cero=args.desde_cero,
+    )
+    resultado = ingesta.ejecutar(args.carpetas)
+    print(f"📊 {json.dumps(resultado, ensure_ascii=False)}")
+    print("ℹ️ Reinicia el asistente para que el índice BM25 incluya lo ingerido.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+utils/metricas.py
+
+Instrumentación local, sin LangSmith ni servicios de red:
+1. Registro de métricas en memoria: contadores e histogramas con etiquetas.
+2. Spans (`with span("nodo", nodo="tutor")`) que miden duración y cuentan errores.
+3. Eventos estructurados y muestreados (reemplazan a los print de DEBUG).
+4. Exportación a un JSONL rotativo y a un endpoint de texto de Prometheus.
+
+Configuración (.env): METRICAS_JSONL, METRICAS_MUESTREO, METRICAS_PUERTO, METRICAS_INTERVALO.
+"""
+
+import os
+import json
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIJO = "luna"
+# límites (segundos) de los histogramas de duración
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_logger = logging.getLogger("asistente_idiomas.metricas")
+_logger.propagate = False
+_muestreo = 0.1  # fracción de eventos "debug" que se escriben; los de error se escriben siempre
+
+
+class RegistroMetricas:
+    """Contadores e histogramas en memoria, indexados por (nombre, etiquetas)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.contadores: dict[tuple, float] = {}
+        self.histogramas: dict[tuple, dict] = {}
+
+    @staticmethod
+    def _clave(nombre: str, etiquetas: dict) -> tuple:
+        return nombre, tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+    def contar(self, nombre: str, valor: float = 1, **etiquetas):
+        clave = self._clave(nombre, etiquetas)
+        with self._lock:
+            self.contadores[clave] = self.contadores.get(clave, 0) + valor
+
+    def observar(self, nombre: str, valor: float, **etiquetas):
+        clave = self._clave(nombre, etiquetas)
+        with self._lock:
+            h = self.histogramas.get(clave)
+            if h is None:
+                h = self.histogramas[clave] = {"buckets": [0] * len(BUCKETS), "suma": 0.0, "cuenta": 0}
+            for i, limite in enumerate(BUCKETS):
+                if valor <= limite:
+                    h["buckets"][i] += 1
+            h["suma"] += valor
+            h["cuenta"] += 1
+
+    def reiniciar(self):
+        with self._lock:
+            self.contadores.clear()
+            self.histogramas.clear()
+
+    def snapshot(self) -> dict:
+        """Resumen serializable: contadores y, por histograma, cuenta/suma/media."""
+        with self._lock:
+            contadores = {_nombre_plano(n, e): v for (n, e), v in self.contadores.items()}
+            histogramas = {
+                _nombre_plano(n, e): {
+                    "cuenta": h["cuenta"],
+                    "suma": round(h["suma"], 6),
+                    "media": round(h["suma"] / h["cuenta"], 6) if h["cuenta"] else 0.0,
+                }
+                for (n, e), h in self.histogramas.items()
+            }
+        return {"contadores": contadores, "histogramas": histogramas}
+
+    def texto_prometheus(self) -> str:
+        """Formato de exposición de texto de Prometheus."""
+        lineas, tipos = [], set()
+        with self._lock:
+            for (nombre, etiquetas), valor in sorted(self.contadores.items()):
+                metrica = f"{PREFIJO}_{nombre}_total"
+                if metrica not in tipos:
+                    tipos.add(metrica)
+                    lineas.append(f"# TYPE {metrica} counter")
+                lineas.append(f"{metrica}{_etiquetas(etiquetas)} {valor}")
+            for (nombre, etiquetas), h in sorted(self.histogramas.items()):
+                metrica = f"{PREFIJO}_{nombre}"
+                if metrica not in tipos:
+                    tipos.add(metrica)
+                    lineas.append(f"# TYPE {metrica} histogram")
+                for limite, cuenta in zip(BUCKETS, h["buckets"]):
+                    lineas.append(f"{metrica}_bucket{_etiquetas(etiquetas + (('le', str(limite)),))} {cuenta}")
+                lineas.append(f"{metrica}_bucket{_etiquetas(etiquetas + (('le', '+Inf'),))} {h['cuenta']}")
+                lineas.append(f"{metrica}_sum{_etiquetas(etiquetas)} {h['suma']}")
+                lineas.append(f"{metrica}_count{_etiquetas(etiquetas)} {h['cuenta']}")
+        return "\n".join(lineas) + "\n"
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(etiquetas: tuple) -> str:
+    if not etiquetas:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in etiquetas) + "}"
+
+
+def _nombre_plano(nombre: str, etiquetas: tuple) -> str:
+    return nombre + "".join(f"|{k}={v}" for k, v in etiquetas)
+
+
+# Registro global del proceso
+REGISTRO = RegistroMetricas()
+
+
+def contar(nombre: str, valor: float = 1, **etiquetas):
+    REGISTRO.contar(nombre, valor, **etiquetas)
+
+
+def observar(nombre: str, valor: float, **etiquetas):
+    REGISTRO.observar(nombre, valor, **etiquetas)
+
+
+def evento(nombre: str, nivel: str = "debug", **campos):
+    """Evento estructurado al JSONL. Los 'debug' se muestrean; los 'error' se escriben siempre."""
+    if not _logger.handlers:
+        return
+    if nivel == "debug" and random.random() >= _muestreo:
+        return
+    registro = {"ts": round(time.time(), 3), "tipo": "evento", "nombre": nombre, "nivel": nivel}
+    registro.update(campos)
+    _logger.info(json.dumps(registro, ensure_ascii=False, default=str))
+
+
+@contextmanager
+def span(nombre: str, **etiquetas):
+    """
+    Mide un bloque: histograma `<nombre>_segundos`, contador `<nombre>_errores`
+    si lanza una excepción, y un evento muestreado con la duración.
+    """
+    inicio = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = e
+        contar(f"{nombre}_errores", **etiquetas)
+        raise
+    finally:
+        duracion = time.perf_counter() - inicio
+        observar(f"{nombre}_segundos", duracion, **etiquetas)
+        if error is not None:
+            evento(nombre, nivel="error", duracion_s=round(duracion, 6), error=str(error), **etiquetas)
+        else:
+            evento(nombre, duracion_s=round(duracion, 6), **etiquetas)
+
+
+# ---------- LLM instrumentado ----------
+def _tokens(texto: str) -> int:
+    from asistente_idiomas.agentes.contexto import estimar_tokens
+    return estimar_tokens(texto)
+
+
+def _texto_mensajes(mensajes) -> str:
+    if isinstance(mensajes, str):
+        return mensajes
+    return "\n".join(str(getattr(m, "content", m)) for m in mensajes)
+
+
+def _contar_tokens(operacion: str, mensajes, uso: dict | None, salida: str):
+    """Usa usage_metadata del proveedor si viene; si no, una estimación local."""
+    entrada = (uso or {}).get("input_tokens") or _tokens(_texto_mensajes(mensajes))
+    generados = (uso or {}).get("output_tokens") or _tokens(salida)
+    contar("llm_tokens", entrada, tipo="entrada", operacion=operacion)
+    contar("llm_tokens", generados, tipo="salida", operacion=operacion)
+
+
+class LLMInstrumentado:
+    """Envuelve un chat model: cada invoke/stream/salida estructurada queda medido."""
+
+    def __init__(self, llm):
+        self._llm = llm
+
+    def __getattr__(self, nombre):
+        return getattr(self._llm, nombre)
+
+    def invoke(self, mensajes, **kwargs):
+        with span("llm", operacion="invoke"):
+            resultado = self._llm.invoke(mensajes, **kwargs)
+        contar("llm_llamadas", operacion="invoke")
+        _contar_tokens("invoke", mensajes, getattr(resultado, "usage_metadata", None),
+                       str(getattr(resultado, "content", resultado)))
+        return resultado
+
+    def stream(self, mensajes, **kwargs):
+        inicio = time.perf_counter()
+        partes, uso = [], None
+        with span("llm", operacion="stream"):
+            for chunk in self._llm.stream(mensajes, **kwargs):
+                if not partes:
+                    observar("llm_primer_token_segundos", time.perf_counter() - inicio)
+                partes.append(str(getattr(chunk, "content", chunk)))
+                uso = getattr(chunk, "usage_metadata", None) or uso
+                yield chunk
+        contar("llm_llamadas", operacion="stream")
+        _contar_tokens("stream", mensajes, uso, "".join(partes))
+
+    def with_structured_output(self, schema, **kwargs):
+        return _SalidaEstructuradaInstrumentada(self._llm.with_structured_output(schema, **kwargs))
+
+
+class _SalidaEstructuradaInstrumentada:
+    def __init__(self, runnable):
+        self._runnable = runnable
+
+    def invoke(self, mensajes, **kwargs):
+        with span("llm", operacion="estructurada"):
+            resultado = self._runnable.invoke(mensajes, **kwargs)
+        contar("llm_llamadas", operacion="estructurada")
+        salida = resultado.model_dump_json() if hasattr(resultado, "model_dump_json") else str(resultado)
+        _contar_tokens("estructurada", mensajes, None, salida)
+        return resultado
+
+
+# ---------- exportación ----------
+def volcar_snapshot():
+    """Escribe el estado actual del registro como una línea del JSONL."""
+    if _logger.handlers:
+        registro = {"ts": round(time.time(), 3), "tipo": "snapshot"}
+        registro.update(REGISTRO.snapshot())
+        _logger.info(json.dumps(registro, ensure_ascii=False))
+
+
+class _ManejadorPrometheus(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        cuerpo = REGISTRO.texto_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass  # sin una línea por cada scrape
+
+
+def servir_prometheus(puerto: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Expone /metrics en un hilo de fondo."""
+    servidor = ThreadingHTTPServer((host, puerto), _ManejadorPrometheus)
+    threading.Thread(target=servidor.serve_forever, name="metricas-http", daemon=True).start()
+    print(f"📈 Métricas en http://{host}:{puerto}/metrics")
+    return servidor
+
+
+def configurar_metricas(
+    ruta_jsonl: str | None = None,
+    muestreo: float | None = None,
+    puerto: int | None = None,
+    intervalo: float | None = None,
+    max_bytes: int = 5 * 2**20,
+    copias: int = 3,
+):
+    """
+    Activa la exportación. Sin llamar a esto, las métricas igual se acumulan en
+    memoria (REGISTRO) pero no se escribe nada a disco ni se abre ningún puerto.
+    """
+    global _muestreo
+    ruta_jsonl = ruta_jsonl if ruta_jsonl is not None else os.getenv("METRICAS_JSONL", "data/metricas.jsonl")
+    _muestreo = muestreo if muestreo is not None else float(os.getenv("METRICAS_MUESTREO", "0.1"))
+    puerto = puerto if puerto is not None else int(os.getenv("METRICAS_PUERTO", "0"))
+    intervalo = intervalo if intervalo is not None else float(os.getenv("METRICAS_INTERVALO", "60"))
+
+    if ruta_jsonl and not _logger.handlers:
+        os.makedirs(os.path.dirname(ruta_jsonl) or ".", exist_ok=True)
+        manejador = RotatingFileHandler(ruta_jsonl, maxBytes=max_bytes, backupCount=copias, encoding="utf-8")
+        manejador.setFormatter(logging.Formatter("%(message)s"))
+        _logger.addHandler(manejador)
+        _logger.setLevel(logging.INFO)
+
+        def _volcar_periodicamente():
+            while True:
+                time.sleep(intervalo)
+                volcar_snapshot()
+
+        threading.Thread(target=_volcar_periodicamente, name="metricas-snapshot", daemon=True).start()
+
+    if puerto:
+        servir_prometheus(puerto)
@@ -0,0 +1,77 @@
+"""
+utils/perfil_arranque.py
+
+Perfil del arranque de `python -m asistente_idiomas.main --profile-startup`:
+1. Tiempo de cada fase del arranque (y de la preparación en segundo plano).
+2. Tiempo de importación por paquete externo, atribuido al primer import hecho
+   desde el proyecto (incluye lo que ese paquete arrastra).
+"""
+
+import sys
+import time
+import builtins
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+PAQUETE_PROPIO = "asistente_idiomas"
+
+
+class PerfilArranque:
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.fases = []  # (nombre, segundos, hilo)
+        self.imports = defaultdict(float)
+        self.hilos_import = defaultdict(set)
+        self._local = threading.local()
+        self._original = None
+
+    # ---------- imports ----------
+    def instalar(self):
+        """Intercepta __import__ para medir los imports que se hagan desde ahora."""
+        if self._original is None:
+            self._original = builtins.__import__
+            builtins.__import__ = self._importar
+
+    def desinstalar(self):
+        if self._original is not None:
+            builtins.__import__ = self._original
+            self._original = None
+
+    def _importar(self, name, globals=None, locals=None, fromlist=(), level=0):
+        raiz = name.partition(".")[0]
+        # solo se mide el import más externo de un paquete ajeno que aún no está cargado
+        if level or raiz == PAQUETE_PROPIO or name in sys.modules or getattr(self._local, "midiendo", False):
+            return self._original(name, globals, locals, fromlist, level)
+        self._local.midiendo = True
+        t = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            self._local.midiendo = False
+            self.imports[raiz] += time.perf_counter() - t
+            self.hilos_import[raiz].add(threading.current_thread().name)
+
+    # ---------- fases ----------
+    @contextmanager
+    def fase(self, nombre: str):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.fases.append((nombre, time.perf_counter() - t, threading.current_thread().name))
+
+    def marcar(self, nombre: str):
+        """Registra un hito medido desde el inicio del perfil (p. ej. 'prompt listo')."""
+        self.fases.append((nombre, time.perf_counter() - self.inicio, "total"))
+
+    def reporte(self, max_imports: int = 15) -> str:
+        lineas = ["⏱️ Perfil de arranque", "  Fases:"]
+        for nombre, segundos, hilo in self.fases:
+            lineas.append(f"    {nombre:<34} {segundos * 1000:8.1f} ms  [{hilo}]")
+        lineas.append("  Imports (acumulado por paquete):")
+        ordenados = sorted(self.imports.items(), key=lambda x: x[1], reverse=True)
+        for raiz, segundos in ordenados[:max_imports]:
+            hilos = ", ".join(sorted(self.hilos_import[raiz]))
+            lineas.append(f"    {raiz:<34} {segundos * 1000:8.1f} ms  [{hilos}]")
+        return "\n".join(lineas)
@@ -0,0 +1,67 @@
+import threading
+
+from langchain_core.documents import Document
+
+from asistente_idiomas.tools import rag_idioma
+from asistente_idiomas.tools.bm25 import IndiceBM25, tiene_terminos_significativos
+
+TEXTOS = [
+    "the cat is on the mat",
+    "cozy means warm and comfortable: the room is cozy",
+    "the weather is nice in the spring",
+]
+
+
+def _indice():
+    indice = IndiceBM25()
+    indice.agregar([f"c{i}" for i in range(len(TEXTOS))], [Document(page_content=t) for t in TEXTOS])
+    return indice
+
+
+def test_cobertura_ignora_las_palabras_vacias():
+    doc, _, cobertura = _indice().buscar("the cozy", k=1)[0]
+    assert "cozy" in doc.page_content and cobertura == 1.0
+
+
+def test_consulta_de_solo_palabras_vacias():
+    assert not tiene_terminos_significativos("the")
+    assert not tiene_terminos_significativos("de la")
+    assert tiene_terminos_significativos("the cat")
+
+
+def test_el_atajo_no_acepta_consultas_de_solo_palabras_vacias(monkeypatch):
+    monkeypatch.setattr(rag_idioma, "_obtener_bm25", lambda: {"en": _indice()})
+    assert rag_idioma._atajo_bm25("the", "en") == []
+    assert [d.page_content for d in rag_idioma._atajo_bm25("cozy", "en")] == [TEXTOS[1]]
+
+
+def test_sin_candidatos_lexicos(monkeypatch):
+    monkeypatch.setattr(rag_idioma, "_obtener_bm25", lambda: {"en": _indice()})
+    monkeypatch.setattr(rag_idioma, "vectorstore", object())
+    assert rag_idioma.sin_candidatos_lexicos(["zorplin", "glimpa"])
+    # 'weather' no pasa el atajo de cobertura completa junto a 'cozy', pero tiene candidatos
+    assert not rag_idioma.sin_candidatos_lexicos(["zorplin", "weather"])
+
+
+def test_buscar_mientras_se_suman_particiones(monkeypatch):
+    monkeypatch.setattr(rag_idioma, "indices_bm25", {f"i{n}": _indice() for n in range(50)})
+    listo = threading.Event()
+
+    def sumar_particiones():  # lo que hace upsert_chunks con un idioma nuevo
+        for n in range(50, 5000):
+            with rag_idioma._lock_bm25:
+                rag_idioma.indices_bm25.setdefault(f"i{n}", IndiceBM25())
+        listo.set()
+
+    hilo = threading.Thread(target=sumar_particiones)
+    hilo.start()
+    while not listo.is_set():
+        rag_idioma._buscar_bm25("cozy", 1)  # sin la copia: 'dictionary changed size during iteration'
+    hilo.join()
+
+
+def test_eliminar_quita_el_chunk():
+    indice = _indice()
+    indice.eliminar(["c1"])
+    assert indice.buscar("cozy") == []
+    assert len(indice) == 2
@@ -0,0 +1,132 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from asistente_idiomas.tools.cache_respuestas import CacheRespuestas, clave_respuesta
+
+
+def _cache(tmp_path, **kwargs):
+    return CacheRespuestas(ruta=str(tmp_path / "respuestas.db"), **kwargs)
+
+
+class Calculo:
+    """Tarda `demora` y devuelve los valores en orden; cuenta cuántas veces se llamó."""
+
+    def __init__(self, *valores, demora=0.1):
+        self.valores = list(valores)
+        self.demora = demora
+        self.llamadas = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            valor = self.valores[min(self.llamadas, len(self.valores) - 1)]
+            self.llamadas += 1
+        time.sleep(self.demora)
+        return valor
+
+
+def _en_paralelo(cache, calcular, n=5):
+    with ThreadPoolExecutor(n) as pool:
+        return list(pool.map(lambda _: cache.obtener_o_calcular("k", calcular), range(n)))
+
+
+def test_la_clave_depende_del_contexto_y_la_version():
+    base = clave_respuesta("en:cozy", "ctx", "v1", "m")
+    assert base == clave_respuesta("en:cozy", "ctx", "v1", "m")
+    assert len({base, clave_respuesta("en:cozy", "otro", "v1", "m"), clave_respuesta("en:cozy", "ctx", "v2", "m")}) == 3
+
+
+def test_consultas_simultaneas_calculan_una_sola_vez(tmp_path):
+    cache = _cache(tmp_path)
+    calcular = Calculo({"respuesta": "r"})
+    resultados = _en_paralelo(cache, calcular)
+    assert calcular.llamadas == 1
+    assert sorted(en_cache for _, en_cache in resultados) == [False, True, True, True, True]
+    assert cache.estadisticas() == {"hits": 4, "misses": 1, "hit_rate": 0.8}
+
+
+def test_un_resultado_none_no_cuenta_como_hit(tmp_path):
+    cache = _cache(tmp_path)
+    calcular = Calculo(None, {"respuesta": "r"})
+    resultados = _en_paralelo(cache, calcular)
+    # el líder no obtuvo nada: los que esperaban calculan y reciben el valor, no None
+    assert [valor for valor, _ in resultados].count(None) == 1
+    assert not any(en_cache for _, en_cache in resultados)
+    assert cache.estadisticas()["hits"] == 0
+    assert cache.obtener("k") == {"respuesta": "r"}
+
+
+def test_el_error_del_lider_se_propaga(tmp_path):
+    cache = _cache(tmp_path)
+
+    def fallar():
+        time.sleep(0.1)
+        raise RuntimeError("429")
+
+    with ThreadPoolExecutor(3) as pool:
+        futuros = [pool.submit(cache.obtener_o_calcular, "k", fallar) for _ in range(3)]
+        for futuro in futuros:
+            with pytest.raises(RuntimeError):
+                futuro.result()
+    assert cache.obtener("k") is None
+
+
+class Generacion(Calculo):
+    """Como Calculo, pero emite el valor en fragmentos antes de devolverlo."""
+
+    def __call__(self):
+        valor = super().__call__()
+        yield from ["r", "e", "s"]
+        return valor
+
+
+def _consumir(generador):
+    fragmentos = []
+    try:
+        while True:
+            fragmentos.append(next(generador))
+    except StopIteration as fin:
+        return fragmentos, fin.value
+
+
+def test_en_streaming_solo_el_lider_llama_y_transmite(tmp_path):
+    cache = _cache(tmp_path)
+    generar = Generacion({"respuesta": "res"})
+    with ThreadPoolExecutor(4) as pool:
+        resultados = list(pool.map(lambda _: _consumir(cache.obtener_o_generar("k", generar)), range(4)))
+    assert generar.llamadas == 1
+    # el líder reenvía los fragmentos; los demás reciben el valor completo sin fragmentos
+    assert sorted(len(fragmentos) for fragmentos, _ in resultados) == [0, 0, 0, 3]
+    assert all(valor == ({"respuesta": "res"}, len(fragmentos) == 0) for fragmentos, valor in resultados)
+    assert cache.estadisticas()["hits"] == 3
+
+
+def test_si_el_lider_corta_el_stream_los_demas_generan(tmp_path):
+    cache = _cache(tmp_path)
+    generar = Generacion({"respuesta": "res"})
+    lider = cache.obtener_o_generar("k", generar)
+    next(lider)  # el líder ya transmite
+    with ThreadPoolExecutor(1) as pool:
+        seguidor = pool.submit(lambda: _consumir(cache.obtener_o_generar("k", generar)))
+        time.sleep(0.05)
+        lider.close()  # p. ej. el cliente se desconectó
+        fragmentos, valor = seguidor.result()
+    assert fragmentos == ["r", "e", "s"] and valor == ({"respuesta": "res"}, False)
+    assert generar.llamadas == 2
+
+
+def test_ttl_y_huella(tmp_path):
+    huella = ["a"]
+    cache = _cache(tmp_path, ttl=60, huella=lambda: huella[0])
+    assert cache.obtener("k") is None
+    cache.guardar("k", "v")
+    assert cache.obtener("k") == "v"
+    huella[0] = "b"  # cambió el conocimiento
+    assert cache.obtener("k") is None
+    cache = _cache(tmp_path, ttl=0, huella=lambda: huella[0])
+    cache.guardar("k", "v")
+    time.sleep(0.01)
+    assert cache.obtener("k") is None
@@ -0,0 +1,51 @@
+import time
+
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+
+from asistente_idiomas.agentes.contexto import GestorContexto
+from asistente_idiomas.utils.dobles import ModeloFalso
+
+
+def _gestor(modelo, max_tokens=100):
+    return GestorContexto(modelo, SystemMessage(content="Eres Luna."), max_tokens=max_tokens, min_mensajes=2)
+
+
+def _llenar(gestor, turnos=4):
+    for i in range(turnos):
+        gestor.agregar(HumanMessage(content=f"pregunta {i} " + "x" * 120))
+        gestor.agregar(AIMessage(content=f"respuesta {i} " + "y" * 120))
+
+
+def test_el_resumen_no_frena_el_turno():
+    modelo = ModeloFalso(latencia=0.3)
+    gestor = _gestor(modelo)
+    inicio = time.perf_counter()
+    _llenar(gestor)
+    assert time.perf_counter() - inicio < 0.2
+    # mientras se resume, lo desplazado sigue en la ventana
+    assert not gestor.resumen and len(gestor.mensajes()) == 9
+    gestor.esperar(timeout=5)
+    assert gestor.resumen
+    assert gestor.mensajes()[1].content.startswith("Resumen de la conversación")
+    assert len(gestor.recientes) < 8 and gestor.recientes[-1].content.startswith("respuesta 3")
+
+
+def test_el_resumen_se_aplica_en_el_turno_siguiente():
+    gestor = _gestor(ModeloFalso())
+    _llenar(gestor, turnos=2)
+    gestor._en_curso[1].result(timeout=5)
+    assert not gestor.resumen
+    mensajes = gestor.mensajes()  # el turno siguiente arma su prompt
+    assert gestor.resumen and len(mensajes) == len(gestor.recientes) + 2
+
+
+class ModeloCaido:
+    def invoke(self, mensajes):
+        raise RuntimeError("503")
+
+
+def test_sin_modelo_el_resumen_respeta_el_presupuesto():
+    gestor = _gestor(ModeloCaido())
+    _llenar(gestor, turnos=8)
+    gestor.esperar(timeout=5)
+    assert gestor.resumen and len(gestor.resumen) <= gestor.max_tokens * 4
@@ -0,0 +1,119 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessageChunk
+
+from asistente_idiomas.agentes.tutor import Tutor, MARCA_DATOS, consumir_stream
+from asistente_idiomas.tools import rag_idioma
+from asistente_idiomas.tools.bm25 import IndiceBM25
+from asistente_idiomas.tools.cache_respuestas import CacheRespuestas
+from asistente_idiomas.utils.dobles import ModeloFalso
+
+RESULTADOS = {"cozy": ["cozy: acogedor. A cozy room."]}
+
+
+def _tutor(tmp_path, modelo):
+    tutor = Tutor(modelo, cache_respuestas=CacheRespuestas(ruta=str(tmp_path / "respuestas.db")))
+    tutor.saludado = True
+    return tutor
+
+
+def _definir(tutor, texto="qué significa cozy"):
+    fragmentos = []
+    resultado = consumir_stream(
+        tutor.responder_consulta(tutor.preparar_consulta(texto), RESULTADOS), fragmentos.append
+    )
+    return fragmentos, resultado
+
+
+def test_la_definicion_se_transmite_por_tokens(tmp_path):
+    modelo = ModeloFalso(tokens_respuesta=20)
+    tutor = _tutor(tmp_path, modelo)
+    fragmentos, resultado = _definir(tutor)
+    assert len(fragmentos) >= 20
+    assert "".join(fragmentos).strip() == resultado["respuesta"]
+    assert MARCA_DATOS not in resultado["respuesta"]
+    # la explicación y los campos para guardarla salen de una sola llamada
+    assert [tipo for tipo, _ in modelo.registro] == ["stream"]
+    assert [e["palabra"] for e in tutor.ultimas_entradas] == ["cozy"]
+
+
+class _ModeloLetraPorLetra(ModeloFalso):
+    """Transmite la salida letra por letra, así la marca llega partida entre fragmentos."""
+
+    def __init__(self, salida: str):
+        super().__init__()
+        self.salida = salida
+
+    def stream(self, mensajes, **kwargs):
+        self._contar("stream", "", self.salida)
+        for letra in self.salida:
+            yield AIMessageChunk(content=letra)
+
+
+def test_la_marca_partida_no_se_filtra_al_usuario(tmp_path):
+    datos = '[{"palabra": "cozy", "traduccion": "acogedor", "ejemplo": "A cozy room.", "idioma": "inglés"}]'
+    tutor = _tutor(tmp_path, _ModeloLetraPorLetra(f"Cozy es acogedor.\n{MARCA_DATOS}\n{datos}"))
+    fragmentos, resultado = _definir(tutor)
+    assert "".join(fragmentos).strip() == resultado["respuesta"] == "Cozy es acogedor."
+    assert tutor.ultimas_entradas == [
+        {"palabra": "cozy", "traduccion": "acogedor", "ejemplo": "A cozy room.", "idioma": "inglés"}
+    ]
+
+
+def test_datos_mal_formados_no_dejan_entradas(tmp_path):
+    tutor = _tutor(tmp_path, _ModeloLetraPorLetra(f"Cozy es acogedor.\n{MARCA_DATOS}\n[{{palabra: cozy"))
+    fragmentos, resultado = _definir(tutor)
+    assert resultado["respuesta"] == "Cozy es acogedor."
+    assert tutor.ultimas_entradas == []
+
+
+def test_guardarla_despues_no_llama_al_modelo(tmp_path):
+    modelo = ModeloFalso()
+    tutor = _tutor(tmp_path, modelo)
+    _definir(tutor)
+    llamadas = modelo.llamadas
+    resultado = tutor.responder("guárdala")
+    assert resultado["texto_para_guardar"]["palabra"] == "cozy"
+    assert modelo.llamadas == llamadas
+
+
+def test_la_segunda_vez_sale_de_la_cache(tmp_path):
+    modelo = ModeloFalso()
+    primera = _definir(_tutor(tmp_path, modelo))[1]["respuesta"]
+    tutor = _tutor(tmp_path, modelo)
+    llamadas = modelo.llamadas
+    fragmentos, resultado = _definir(tutor)
+    assert fragmentos == [primera] and resultado["respuesta"] == primera
+    assert modelo.llamadas == llamadas
+    assert tutor.ultimas_entradas
+    assert tutor.cache_respuestas.estadisticas()["hits"] == 1
+
+
+def test_definiciones_simultaneas_comparten_el_stream(tmp_path):
+    modelo = ModeloFalso(latencia=0.1)
+    cache = CacheRespuestas(ruta=str(tmp_path / "respuestas.db"))
+    tutores = [Tutor(modelo, cache_respuestas=cache) for _ in range(3)]
+    for tutor in tutores:
+        tutor.saludado = True
+    with ThreadPoolExecutor(3) as pool:
+        resultados = list(pool.map(_definir, tutores))
+    assert modelo.llamadas == 1
+    assert len({resultado["respuesta"] for _, resultado in resultados}) == 1
+    assert all(tutor.ultimas_entradas for tutor in tutores)
+    assert cache.estadisticas() == {"hits": 2, "misses": 1, "hit_rate": 0.667}
+
+
+def test_solo_se_adelanta_el_respaldo_sin_candidatos(tmp_path, monkeypatch):
+    indice = IndiceBM25()
+    indice.agregar(["c0"], [Document(page_content="cozy means warm and comfortable")])
+    monkeypatch.setattr(rag_idioma, "_obtener_bm25", lambda: {"en": indice})
+    monkeypatch.setattr(rag_idioma, "vectorstore", object())
+    modelo = ModeloFalso()
+    tutor = _tutor(tmp_path, modelo)
+    tutor.especular_fallback(tutor.preparar_consulta("qué significa cozy"))
+    assert tutor._especulacion is None  # hay candidatos: se espera a los vectores
+    tutor.especular_fallback(tutor.preparar_consulta("qué significa zorplin"))
+    assert tutor._especulacion is not None
+    tutor._especulacion[1].result(timeout=5)
+    assert [tipo for tipo, _ in modelo.registro] == ["stream"]
@@ -0,0 +1,182 @@
+import threading
+import time
+
+import pytest
+
+from asistente_idiomas.tools.despachador_llm import (
+    Circuito, CircuitoAbierto, CuboTokens, Despachador, ModeloDespachado, es_transitorio,
+)
+from asistente_idiomas.utils.dobles import ModeloFalso
+
+
+class Lento:
+    """Chat model que tarda lo que indica `demoras` en cada llamada y registra cuántas corren a la vez."""
+
+    model = "lento"
+
+    def __init__(self, demoras):
+        self.demoras = list(demoras)
+        self.llamadas = 0
+        self.en_curso = 0
+        self.max_en_curso = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, mensajes):
+        with self._lock:
+            demora = self.demoras[min(self.llamadas, len(self.demoras) - 1)]
+            self.llamadas += 1
+            n = self.llamadas
+            self.en_curso += 1
+            self.max_en_curso = max(self.max_en_curso, self.en_curso)
+        time.sleep(demora)
+        with self._lock:
+            self.en_curso -= 1
+        return f"r{n}"
+
+
+def test_errores_transitorios():
+    assert es_transitorio(RuntimeError("429 Resource exhausted"))
+    assert es_transitorio(TimeoutError())
+    assert not es_transitorio(ValueError("400 Invalid argument"))
+
+
+def test_circuito_abre_y_usa_el_respaldo():
+    malo = ModeloFalso(tasa_errores=1.0)
+    principal = ModeloDespachado(malo, "p", max_intentos=1, backoff_base=0.001,
+                                 circuito=Circuito("p", umbral=2, enfriamiento=60))
+    despachador = Despachador(principal, ModeloDespachado(ModeloFalso(), "l"))
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            despachador.para("conversacion").invoke("hola")
+    assert principal.circuito.estado == "abierto"
+    assert despachador.para("conversacion").invoke("hola").content
+    assert malo.errores == 2  # con el circuito abierto ya no se lo llama
+
+
+def test_semiabierto_deja_pasar_una_sola_sonda():
+    circuito = Circuito("c", umbral=1, enfriamiento=0.0)
+    circuito.fallo()
+    circuito.permitir()
+    assert circuito.estado == "semiabierto"
+    with pytest.raises(CircuitoAbierto):
+        circuito.permitir()
+    circuito.exito()
+    assert circuito.estado == "cerrado"
+
+
+def test_cerrar_el_stream_durante_la_sonda_no_traba_el_circuito():
+    modelo = ModeloDespachado(ModeloFalso(tokens_respuesta=10), "s",
+                              circuito=Circuito("s", umbral=1, enfriamiento=0.0))
+    modelo.circuito.fallo()
+    stream = modelo.stream("hola")
+    next(stream)  # la sonda arrancó
+    stream.close()  # GeneratorExit a mitad de camino
+    assert modelo.circuito.estado == "cerrado"
+    assert list(modelo.stream("hola"))
+
+
+class StreamLento:
+    """Chat model de streaming: `pausas[n]` son las esperas antes de cada fragmento de la llamada n."""
+
+    model = "stream-lento"
+
+    def __init__(self, *pausas):
+        self.pausas = list(pausas)
+        self.llamadas = 0
+
+    def stream(self, mensajes, **kwargs):
+        pausas = self.pausas[min(self.llamadas, len(self.pausas) - 1)]
+        self.llamadas += 1
+        for i, pausa in enumerate(pausas):
+            time.sleep(pausa)
+            yield f"f{i}"
+
+
+def test_stream_sin_primer_fragmento_se_reintenta():
+    llm = StreamLento([0.3, 0.0], [0.0, 0.0])
+    modelo = ModeloDespachado(llm, "s", timeout_primer_fragmento=0.1, max_intentos=2, backoff_base=0.001,
+                              circuito=Circuito("s", umbral=5))
+    assert list(modelo.stream("x")) == ["f0", "f1"]
+    assert llm.llamadas == 2
+    assert modelo.circuito.fallos == 0  # el éxito posterior cierra el circuito
+
+
+def test_stream_que_se_queda_callado_corta_y_cuenta_como_fallo():
+    llm = StreamLento([0.0, 0.3, 0.0])
+    modelo = ModeloDespachado(llm, "s", concurrencia=1, timeout_inactividad=0.1,
+                              circuito=Circuito("s", umbral=1, enfriamiento=60))
+    recibidos = []
+    with pytest.raises(TimeoutError):
+        for chunk in modelo.stream("x"):
+            recibidos.append(chunk)
+    assert recibidos == ["f0"]
+    assert modelo.circuito.estado == "abierto"
+    # el stream abandonado conserva su lugar hasta que termina de verdad
+    assert _libres(modelo._semaforo) == 0
+    time.sleep(0.35)
+    assert _libres(modelo._semaforo) == 1
+
+
+def test_error_no_transitorio_no_se_reintenta():
+    class Malo400:
+        model = "m"
+        llamadas = 0
+
+        def invoke(self, mensajes):
+            self.llamadas += 1
+            raise ValueError("400 Invalid argument")
+
+    llm = Malo400()
+    modelo = ModeloDespachado(llm, "m", circuito=Circuito("m", umbral=1))
+    with pytest.raises(ValueError):
+        modelo.invoke("x")
+    assert llm.llamadas == 1
+    assert modelo.circuito.estado == "cerrado"
+
+
+def test_timeout_reintenta_sin_superar_la_concurrencia():
+    llm = Lento([0.3, 0.01])
+    modelo = ModeloDespachado(llm, "t", concurrencia=1, timeout=0.1, max_intentos=2, backoff_base=0.001)
+    assert modelo.invoke("x") == "r2"
+    # el reintento esperó a que la llamada abandonada liberara su lugar
+    assert llm.max_en_curso == 1
+
+
+def test_cobertura_gana_la_mas_rapida():
+    llm = Lento([0.3, 0.01])
+    modelo = ModeloDespachado(llm, "c", cobertura=0.05)
+    inicio = time.perf_counter()
+    assert modelo.invoke("x") == "r2"
+    assert time.perf_counter() - inicio < 0.25
+
+
+def _libres(semaforo) -> int:
+    tomados = 0
+    while semaforo.acquire(blocking=False):
+        tomados += 1
+    for _ in range(tomados):
+        semaforo.release()
+    return tomados
+
+
+def test_cobertura_descartada_conserva_su_lugar():
+    llm = Lento([0.3, 0.01])
+    modelo = ModeloDespachado(llm, "c", concurrencia=2, cobertura=0.05)
+    modelo.invoke("x")
+    assert _libres(modelo._semaforo) == 1  # la primera llamada sigue corriendo con su lugar
+    time.sleep(0.35)
+    assert _libres(modelo._semaforo) == 2
+
+
+def test_cobertura_sin_lugar_no_se_envia():
+    llm = Lento([0.2, 0.01])
+    modelo = ModeloDespachado(llm, "c", concurrencia=1, cobertura=0.05)
+    assert modelo.invoke("x") == "r1"
+    assert llm.llamadas == 1
+
+
+def test_cubo_de_tokens():
+    cubo = CuboTokens(60)  # 1 por segundo, capacidad 60
+    assert cubo.reservar(60) == 0.0
+    assert cubo.reservar(1) == pytest.approx(1.0, abs=0.05)
+    assert not cubo.intentar(1)
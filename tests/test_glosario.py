@@ -0,0 +1,80 @@
+import os
+
+import pytest
+from langchain_core.documents import Document
+
+from asistente_idiomas.tools.glosario import IndiceGlosario, normalizar, parsear_glosario
+from asistente_idiomas.tools.rag_idioma import construir_indice_lexico
+
+KNOWLEDGE = os.path.join(os.path.dirname(__file__), "..", "asistente_idiomas", "knowledge")
+
+GLOSARIO = """# Vocabulario
+
+## Palabras inventadas
+
+- florblin → verbo. Expresar confusión de forma divertida.
+  Ejemplo: “She just florblined and laughed.”
+- glimpa → sustantivo. Una pequeña idea repentina.
+- mother / mom → madre / mamá
+---
+Línea suelta sin flecha.
+"""
+
+
+def _indice():
+    indice = IndiceGlosario()
+    indice.agregar_texto(GLOSARIO, "fantasia.txt")
+    return indice
+
+
+def test_normalizar():
+    assert normalizar("¿Qué tal?") == "que tal"
+    assert normalizar("  Dépaysement! ") == "depaysement"
+    assert normalizar("don’t") == "don't"
+
+
+def test_parsear_entradas_y_lineas_sueltas():
+    sueltas = []
+    entradas = parsear_glosario(GLOSARIO, "fantasia.txt", sueltas)
+    assert [e.termino for e in entradas] == ["florblin", "glimpa", "mother / mom"]
+    assert entradas[0].categoria == "verbo" and entradas[0].seccion == "Palabras inventadas"
+    assert entradas[0].ejemplos == ["Ejemplo: “She just florblined and laughed.”"]
+    assert sueltas == [("Palabras inventadas", "Línea suelta sin flecha.")]
+
+
+@pytest.mark.parametrize("consulta, termino", [
+    ("glimpa", "glimpa"),
+    ("Glimpa", "glimpa"),
+    ("florblined", "florblin"),  # forma flexionada
+    ("florb", "florblin"),  # prefijo inequívoco
+    ("mom", "mother / mom"),  # variantes con '/'
+    ("mamá", "mother / mom"),  # sin categoría: también por la traducción
+])
+def test_buscar(consulta, termino):
+    assert [e.termino for e in _indice().buscar(consulta)] == [termino]
+
+
+@pytest.mark.parametrize("consulta", ["", "flo", "zorplin", "florblinization", "una"])
+def test_buscar_sin_resultado_confiable(consulta):
+    assert _indice().buscar(consulta) == []
+
+
+def test_buscar_prefijo():
+    assert _indice().buscar_prefijo("m") == ["madre", "mama", "mom", "mother"]
+
+
+def test_filtro_por_idioma():
+    indice = _indice()
+    indice.idiomas["fantasia.txt"] = "en"
+    assert indice.buscar("glimpa", "en")
+    assert indice.buscar("glimpa", "fr") == []
+
+
+def test_indice_sobre_el_conocimiento_real():
+    docs = []
+    for nombre in sorted(os.listdir(KNOWLEDGE)):
+        with open(os.path.join(KNOWLEDGE, nombre), encoding="utf-8") as fh:
+            docs.append(Document(page_content=fh.read(), metadata={"source": nombre}))
+    indice = construir_indice_lexico(docs, verbose=False)
+    for palabra in ("glimpa", "zorplin", "florblin", "trevlo"):
+        assert indice.buscar(palabra)[0].source == "fantasia.txt"
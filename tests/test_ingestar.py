@@ -0,0 +1,78 @@
+import pytest
+
+from asistente_idiomas.tools import rag_idioma
+from asistente_idiomas.tools.vector_numpy import NumpyVectorStore
+from asistente_idiomas.utils.dobles import EmbeddingsHash
+from asistente_idiomas.utils.ingestar import Ingesta, leer_progreso
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    carpeta = tmp_path / "corpus" / "fr"
+    carpeta.mkdir(parents=True)
+    lineas = "".join(f"mot{i}\tpalabra{i}\tUne phrase avec mot{i}.\n" for i in range(200))
+    (carpeta / "lista.tsv").write_text(lineas, encoding="utf-8")
+    monkeypatch.setattr(rag_idioma, "_embeddings", EmbeddingsHash(16))
+    monkeypatch.setattr(rag_idioma, "indices_bm25", None)
+    return tmp_path / "corpus"
+
+
+def _ingesta(tmp_path, nombre, monkeypatch, bloque_bytes, **kwargs):
+    store = NumpyVectorStore(rag_idioma._embeddings, persist_directory=str(tmp_path / nombre))
+    monkeypatch.setattr(rag_idioma, "vectorstore", store)
+    return Ingesta(store, str(tmp_path / nombre), lote=8, procesos=1, bloque_bytes=bloque_bytes,
+                   guardar_cada=0, **kwargs)
+
+
+def _cortar_despues_de(monkeypatch, lotes):
+    upsert, hechos = rag_idioma.upsert_chunks, []
+
+    def upsert_que_se_corta(*args, **kwargs):
+        if len(hechos) == lotes:
+            raise KeyboardInterrupt
+        hechos.append(1)
+        return upsert(*args, **kwargs)
+
+    monkeypatch.setattr(rag_idioma, "upsert_chunks", upsert_que_se_corta)
+    return lambda: monkeypatch.setattr(rag_idioma, "upsert_chunks", upsert)
+
+
+def _documentos(store) -> set:
+    return set(store.get()["documents"])
+
+
+def test_interrumpida_se_retoma_donde_quedo(corpus, tmp_path, monkeypatch):
+    completa = _ingesta(tmp_path, "completa", monkeypatch, bloque_bytes=1000)
+    completa.ejecutar([str(corpus)])
+    esperados = _documentos(completa.vectorstore)
+
+    restaurar = _cortar_despues_de(monkeypatch, 3)
+    ingesta = _ingesta(tmp_path, "cortada", monkeypatch, bloque_bytes=1000)
+    with pytest.raises(KeyboardInterrupt):
+        ingesta.ejecutar([str(corpus)])
+    restaurar()
+    estado = leer_progreso(str(tmp_path / "cortada"))["archivos"]["corpus/fr/lista.tsv"]
+    assert estado["bloques"] > 0 and not estado["completo"] and estado["bloque_bytes"] == 1000
+
+    retomada = _ingesta(tmp_path, "cortada", monkeypatch, bloque_bytes=1000)
+    stats = retomada.ejecutar([str(corpus)])
+    assert 0 < stats["chunks"] < len(esperados)  # no volvió a leer los bloques ya hechos
+    assert _documentos(retomada.vectorstore) == esperados
+
+
+def test_con_otro_tamano_de_bloque_se_empieza_de_nuevo(corpus, tmp_path, monkeypatch):
+    completa = _ingesta(tmp_path, "completa", monkeypatch, bloque_bytes=3000)
+    completa.ejecutar([str(corpus)])
+    esperados = _documentos(completa.vectorstore)
+
+    restaurar = _cortar_despues_de(monkeypatch, 3)
+    with pytest.raises(KeyboardInterrupt):
+        _ingesta(tmp_path, "cortada", monkeypatch, bloque_bytes=1000).ejecutar([str(corpus)])
+    restaurar()
+
+    retomada = _ingesta(tmp_path, "cortada", monkeypatch, bloque_bytes=3000)
+    stats = retomada.ejecutar([str(corpus)])
+    assert stats["chunks"] == len(esperados)
+    assert _documentos(retomada.vectorstore) == esperados
+    estado = leer_progreso(str(tmp_path / "cortada"))["archivos"]["corpus/fr/lista.tsv"]
+    assert estado["completo"] and estado["bloque_bytes"] == 3000
@@ -0,0 +1,108 @@
+import pytest
+
+from asistente_idiomas.agentes import intenciones
+from asistente_idiomas.agentes.intenciones import clasificar, palabras_consultadas
+from asistente_idiomas.agentes.tutor import Tutor
+from asistente_idiomas.tools.rag_idioma import off_topic_tool
+from asistente_idiomas.utils.dobles import ModeloFalso
+
+# oraciones de práctica que antes del enrutador iban al modelo y deben seguir yendo
+PRACTICA = [
+    "my name is Ana",
+    "la casa es grande",
+    "el perro está en la casa",
+    "what time is it",
+    "how much does it cost",
+    "what is your name",
+    "Qué tal estás hoy?",
+    "me gusta la música",
+    "quiero practicar inglés",
+    "cómo se dice buenos días",
+]
+
+
+@pytest.mark.parametrize("texto", PRACTICA)
+def test_practica_no_tiene_respuesta_fija(texto):
+    assert clasificar(texto).nombre == intenciones.CHARLA
+
+
+@pytest.mark.parametrize("texto", PRACTICA)
+def test_practica_llega_al_modelo(texto):
+    modelo = ModeloFalso()
+    tutor = Tutor(modelo)
+    tutor.saludado = True
+    respuesta = tutor.responder(texto)["respuesta"]
+    assert respuesta != off_topic_tool()
+    assert [tipo for tipo, _ in modelo.registro] == ["stream"]
+
+
+@pytest.mark.parametrize("texto", [
+    "dame una receta de lasaña",
+    "escribe un código en python",
+    "cuál es el precio del bitcoin",
+    "write a python script",
+])
+def test_fuera_de_tema_solo_por_patron(texto):
+    intencion = clasificar(texto)
+    assert (intencion.nombre, intencion.via) == (intenciones.FUERA_DE_TEMA, "patron")
+
+
+@pytest.mark.parametrize("texto", [
+    "cómo se dice receta de cocina en inglés",
+    "what's the Spanish word for bitcoin",
+    "how do you say stock market in French",
+    "cómo se dice programar en inglés",
+    "traduce 'síntomas de la gripe' al inglés",
+    "la palabra java en inglés",
+    "qué significa crypto",
+])
+def test_el_vocabulario_de_otros_temas_no_es_fuera_de_tema(texto):
+    assert clasificar(texto).nombre != intenciones.FUERA_DE_TEMA
+
+
+def test_fuera_de_tema_no_llama_al_modelo():
+    modelo = ModeloFalso()
+    tutor = Tutor(modelo)
+    tutor.saludado = True
+    assert tutor.responder("dame una receta de lasaña")["respuesta"] == off_topic_tool()
+    assert modelo.registro == []
+
+
+@pytest.mark.parametrize("texto, nombre", [
+    ("qué significa zorplin", intenciones.CONSULTA),
+    ("What does 'awkward' mean?", intenciones.CONSULTA),
+    ("que signifie dépaysement", intenciones.CONSULTA),
+    ("guárdala, por favor", intenciones.REGISTRO),
+    ("save it please", intenciones.REGISTRO),
+    ("hola luna", intenciones.SALUDO),
+    ("hola, qué significa zorplin", intenciones.CONSULTA),
+])
+def test_patrones(texto, nombre):
+    assert clasificar(texto).nombre == nombre
+
+
+def test_saludo_del_clasificador_va_al_modelo():
+    # 'holis' no está en el patrón: aunque el clasificador lo crea un saludo, no hay respuesta fija
+    assert clasificar("holis").nombre != intenciones.SALUDO
+
+
+@pytest.mark.parametrize("texto, palabras", [
+    ("¿Qué significa glimpa y florblin?", ["glimpa", "florblin"]),
+    ("qué significa glimpa, zorplin y florblin", ["glimpa", "zorplin", "florblin"]),
+    ("hola, qué significa zorplin", ["zorplin"]),
+    ("hello luna, what does cozy mean please", ["cozy"]),
+    ("Qu'est-ce que flâner veut dire ?", ["flâner"]),
+    ("what does it mean", []),
+    ("qué significa eso", []),
+])
+def test_palabras_consultadas(texto, palabras):
+    assert palabras_consultadas(texto) == palabras
+
+
+def test_consulta_sin_palabras_va_al_modelo():
+    modelo = ModeloFalso()
+    tutor = Tutor(modelo)
+    tutor.saludado = True
+    assert tutor.preparar_consulta("what does it mean") is None
+    tutor.responder("what does it mean")
+    assert [tipo for tipo, _ in modelo.registro] == ["stream"]
@@ -0,0 +1,100 @@
+from asistente_idiomas.tools.notion_outbox import NotionOutbox, clave_idempotencia
+
+
+class NotionIntermitente:
+    """Falla las primeras `fallas` llamadas y después registra lo enviado."""
+
+    def __init__(self, fallas=0):
+        self.fallas = fallas
+        self.enviados = []
+
+    def __call__(self, datos):
+        if self.fallas:
+            self.fallas -= 1
+            raise RuntimeError("503 Service unavailable")
+        self.enviados.append(datos["palabra"])
+        return f"pagina-{len(self.enviados)}"
+
+
+def _outbox(tmp_path, enviar, **kwargs):
+    opciones = dict(max_por_segundo=1000, backoff_base=0.001, backoff_max=0.001)
+    opciones.update(kwargs)
+    return NotionOutbox(ruta=str(tmp_path / "outbox.db"), enviar=enviar, **opciones)
+
+
+def _datos(palabra, fecha="2025-01-31", traduccion="t"):
+    return {"palabra": palabra, "traduccion": traduccion, "ejemplo": "e", "idioma": "inglés", "fecha": fecha}
+
+
+def test_misma_palabra_el_mismo_dia_no_se_duplica(tmp_path):
+    notion = NotionIntermitente()
+    outbox = _outbox(tmp_path, notion)
+    assert outbox.encolar(_datos("cozy"))[1] == "nuevo"
+    assert outbox.encolar(_datos(" Cozy "))[1] == "en_cola"
+    assert outbox.encolar(_datos("cozy", fecha="2025-02-01"))[1] == "nuevo"
+    assert outbox.flush(timeout=2)
+    assert notion.enviados == ["cozy", "cozy"]
+    assert outbox.encolar(_datos("cozy"))[1] == "enviado"
+    assert clave_idempotencia(_datos("cozy")) == clave_idempotencia(_datos("COZY"))
+
+
+def test_una_correccion_del_mismo_dia_no_se_pierde(tmp_path):
+    enviados = []
+    outbox = _outbox(tmp_path, lambda datos: enviados.append(datos["traduccion"]))
+    outbox.encolar(_datos("cozy", traduccion="acogedr"))
+    # corregida antes del envío: se manda solo la versión nueva
+    assert outbox.encolar(_datos("cozy", traduccion="acogedor"))[1] == "actualizado"
+    assert outbox.flush(timeout=2)
+    assert enviados == ["acogedor"]
+    # corregida después del envío: se vuelve a enviar
+    assert outbox.encolar(_datos("cozy", traduccion="cómodo"))[1] == "actualizado"
+    assert outbox.flush(timeout=2)
+    assert enviados == ["acogedor", "cómodo"]
+    assert outbox.estado()["enviado"] == 1
+
+
+def test_la_correccion_durante_el_envio_queda_pendiente(tmp_path):
+    enviados = []
+
+    def enviar(datos):
+        if not enviados:  # el usuario corrige mientras el primer envío está en vuelo
+            outbox.encolar(_datos("cozy", traduccion="acogedor"))
+        enviados.append(datos["traduccion"])
+
+    outbox = _outbox(tmp_path, enviar)
+    outbox.encolar(_datos("cozy", traduccion="acogedr"))
+    outbox.drenar()
+    assert outbox.estado()["pendiente"] == 1
+    assert outbox.flush(timeout=2)
+    assert enviados == ["acogedr", "acogedor"]
+
+
+def test_error_transitorio_se_reintenta(tmp_path):
+    notion = NotionIntermitente(fallas=2)
+    outbox = _outbox(tmp_path, notion)
+    outbox.encolar(_datos("cozy"))
+    assert outbox.flush(timeout=2)
+    assert notion.enviados == ["cozy"]
+    assert outbox.estado()["enviado"] == 1
+
+
+def test_fallido_vuelve_a_la_cola_al_sincronizar(tmp_path):
+    notion = NotionIntermitente(fallas=2)
+    outbox = _outbox(tmp_path, notion, max_intentos=2, backoff_max=60)
+    outbox.encolar(_datos("cozy"))
+    outbox.drenar()
+    outbox._conn.execute("UPDATE outbox SET proximo_intento = 0")
+    outbox.drenar()
+    assert outbox.estado()["fallido"] == 1
+    assert outbox.drenar() == 0  # el worker lo reintenta recién después de backoff_max
+    assert outbox.flush(timeout=2)
+    assert outbox.estado() == {"pendiente": 0, "enviado": 1, "fallido": 0, "ultimos_errores": []}
+
+
+def test_persiste_entre_sesiones(tmp_path):
+    _outbox(tmp_path, NotionIntermitente(fallas=1)).encolar(_datos("cozy"))
+    notion = NotionIntermitente()
+    outbox = _outbox(tmp_path, notion)
+    assert outbox.estado()["pendiente"] == 1
+    assert outbox.flush(timeout=2)
+    assert notion.enviados == ["cozy"]
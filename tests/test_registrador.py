@@ -0,0 +1,40 @@
+from asistente_idiomas.agentes.registrador import Registrador
+from asistente_idiomas.grafo import nodo_registrador
+from asistente_idiomas.tools.notion_outbox import NotionOutbox
+from asistente_idiomas.utils.metricas import REGISTRO
+
+
+class OutboxFalso:
+    def __init__(self):
+        self.encolados = []
+
+    def encolar(self, datos):
+        self.encolados.append(datos)
+        return "clave", "nuevo"
+
+
+def _cuenta(nombre):
+    return REGISTRO.snapshot()["histogramas"].get(nombre, {}).get("cuenta", 0)
+
+
+def test_el_nodo_mide_el_encolado_y_la_escritura_tiene_su_span():
+    outbox = OutboxFalso()
+    registrador = Registrador(outbox=outbox)
+    nodo, escritura = _cuenta("nodo_segundos|nodo=registrador"), _cuenta("notion_registro_segundos")
+    datos = {"palabra": "cozy", "traduccion": "acogedor", "ejemplo": "a cozy room", "idioma": "inglés"}
+    assert nodo_registrador({"texto_para_registrar": datos}, registrador) == {"texto_para_registrar": None}
+    assert registrador.esperar(timeout=5)
+    assert _cuenta("nodo_segundos|nodo=registrador") == nodo + 1
+    assert _cuenta("notion_registro_segundos") == escritura + 1
+    assert [d["palabra"] for d in outbox.encolados] == ["cozy"]
+
+
+def test_el_mensaje_refleja_lo_que_paso_en_la_cola(tmp_path):
+    outbox = NotionOutbox(ruta=str(tmp_path / "outbox.db"), enviar=lambda datos: "pagina", max_por_segundo=1000)
+    registrador = Registrador(outbox=outbox)
+    datos = {"palabra": "zorplin", "traduccion": "acogedr", "ejemplo": "a zorplin room", "idioma": "inglés"}
+    assert "en cola" in registrador.registrar(datos)
+    assert "ya estaba en la cola" in registrador.registrar(datos)
+    assert outbox.flush(timeout=2)
+    assert "ya estaba guardada" in registrador.registrar(datos)
+    assert "corregido" in registrador.registrar({**datos, "traduccion": "acogedor"})
@@ -0,0 +1,32 @@
+from asistente_idiomas.agentes.tutor import Tutor, confirmar_registro
+from asistente_idiomas.tools import notion_tool
+from asistente_idiomas.utils.dobles import ModeloFalso
+
+
+def _tutor_con_entradas(entradas):
+    tutor = Tutor(ModeloFalso())
+    tutor.saludado = True
+    tutor.ultimas_entradas = entradas
+    return tutor
+
+
+def test_palabra_nueva_se_confirma(monkeypatch):
+    monkeypatch.setattr(notion_tool, "_registradas", {})
+    tutor = _tutor_con_entradas([{"palabra": "cozy", "idioma": "inglés"}])
+    respuesta = tutor.responder("guárdala")["respuesta"]
+    assert respuesta.startswith("✅") and "cozy" in respuesta
+
+
+def test_palabra_ya_guardada_avisa_al_estudiante(monkeypatch):
+    monkeypatch.setattr(notion_tool, "_registradas", {("cozy", "ingles"): "pagina-1"})
+    tutor = _tutor_con_entradas([{"palabra": "Cozy", "idioma": "Inglés"}])
+    respuesta = tutor.responder("guárdala")["respuesta"]
+    assert "ya estaba guardada" in respuesta
+    assert "✅" not in respuesta
+
+
+def test_varias_palabras_se_separan(monkeypatch):
+    monkeypatch.setattr(notion_tool, "_registradas", {("cozy", "ingles"): "pagina-1"})
+    respuesta = confirmar_registro([{"palabra": "cozy", "idioma": "inglés"}, {"palabra": "awkward", "idioma": "inglés"}])
+    assert "✅ La palabra **awkward**" in respuesta
+    assert "ℹ️ **cozy** ya estaba guardada" in respuesta
@@ -0,0 +1,58 @@
+import hashlib
+import shutil
+from pathlib import Path
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from asistente_idiomas.tools import rag_idioma
+
+KNOWLEDGE = Path(__file__).resolve().parent.parent / "asistente_idiomas" / "knowledge"
+
+
+class EmbeddingsContadas(Embeddings):
+    """Vectores deterministas por hash; cuenta cuántos textos se embebieron."""
+
+    def __init__(self):
+        self.textos = 0
+
+    def embed_documents(self, texts):
+        self.textos += len(texts)
+        return [[b / 255 for b in hashlib.sha256(t.encode("utf-8")).digest()[:16]] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+@pytest.fixture
+def conocimiento(tmp_path, monkeypatch):
+    """Copia de 'knowledge/' en una carpeta temporal: el índice se crea en tmp_path/data."""
+    carpeta = tmp_path / "asistente_idiomas" / "knowledge"
+    shutil.copytree(KNOWLEDGE, carpeta)
+    monkeypatch.chdir(tmp_path)
+    return carpeta
+
+
+@pytest.mark.parametrize("backend", ["numpy", "chroma"])
+def test_editar_una_linea_reembebe_un_solo_chunk(conocimiento, backend):
+    embeddings = EmbeddingsContadas()
+    store = rag_idioma.create_or_load_vectorstore(rag_idioma.load_documents(), embeddings, backend=backend)
+    total = len(store.get()["ids"])
+    assert embeddings.textos == total
+
+    # sin cambios: no se embebe nada
+    rag_idioma.create_or_load_vectorstore(rag_idioma.load_documents(), embeddings, backend=backend)
+    assert embeddings.textos == total
+
+    archivo = conocimiento / "fantasia.txt"
+    texto = archivo.read_text(encoding="utf-8")
+    original = "- glimpa → sustantivo. Una pequeña idea o inspiración repentina."
+    assert original in texto
+    archivo.write_text(texto.replace(original, "- glimpa → sustantivo. Una idea repentina y brillante."), encoding="utf-8")
+
+    store = rag_idioma.create_or_load_vectorstore(rag_idioma.load_documents(), embeddings, backend=backend)
+    assert embeddings.textos == total + 1
+    datos = store.get()
+    assert len(datos["ids"]) == total
+    assert any("idea repentina y brillante" in d for d in datos["documents"])
+    assert not any("pequeña idea o inspiración" in d for d in datos["documents"])
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+
+from asistente_idiomas import servidor
+from asistente_idiomas.servidor import ServidorLuna
+
+
+class AppLenta:
+    """Grafo falso: emite tokens despacio y registra cuántos turnos corren a la vez por sesión."""
+
+    def __init__(self, tokens=5, demora=0.02):
+        self.tokens = tokens
+        self.demora = demora
+        self.en_curso = 0
+        self.max_en_curso = 0
+        self.terminados = 0
+        self._lock = threading.Lock()
+
+    def stream(self, entrada, config, stream_mode):
+        with self._lock:
+            self.en_curso += 1
+            self.max_en_curso = max(self.max_en_curso, self.en_curso)
+        try:
+            for i in range(self.tokens):
+                time.sleep(self.demora)
+                yield {"token": f"t{i}"}
+        finally:
+            with self._lock:
+                self.en_curso -= 1
+                self.terminados += 1
+
+
+class PoolFalso:
+    def evictar_inactivos(self):
+        return 0
+
+    def __len__(self):
+        return 0
+
+
+class ClienteCaido(Exception):
+    pass
+
+
+def test_el_lock_de_la_sesion_se_suelta_cuando_termina_el_turno():
+    app = AppLenta()
+    srv = ServidorLuna(app, PoolFalso(), concurrencia=4)
+
+    async def enviar_y_caer(datos):
+        raise ClienteCaido()
+
+    async def escenario():
+        enviados = []
+
+        async def enviar(datos):
+            enviados.append(datos)
+
+        try:
+            await srv.turno("s1", "hola", enviar_y_caer)
+        except ClienteCaido:
+            pass
+        # el cliente se fue, pero turno() no volvió hasta que el hilo terminó
+        assert app.terminados == 1
+        assert not srv._locks_sesion["s1"].locked()
+        await asyncio.gather(srv.turno("s1", "a", enviar), srv.turno("s1", "b", enviar))
+        return enviados
+
+    enviados = asyncio.run(escenario())
+    assert len(enviados) == 2 * app.tokens
+    assert app.max_en_curso == 1  # nunca dos turnos de la misma sesión a la vez
+
+
+def test_mantenimiento_poda_los_checkpoints(monkeypatch):
+    podas = []
+    monkeypatch.setattr(servidor, "podar_checkpoints", lambda checkpointer, conservar: podas.append(conservar) or 0)
+    srv = ServidorLuna(AppLenta(), PoolFalso(), checkpointer=object())
+
+    async def escenario():
+        tarea = asyncio.create_task(srv.mantenimiento(intervalo=0.01, ciclos_entre_podas=2))
+        await asyncio.sleep(0.1)
+        tarea.cancel()
+
+    asyncio.run(escenario())
+    assert podas and set(podas) == {servidor.CHECKPOINTS_A_CONSERVAR}
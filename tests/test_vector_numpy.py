@@ -0,0 +1,91 @@
+import hashlib
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from asistente_idiomas.tools.vector_numpy import NumpyVectorStore
+
+
+class EmbeddingsHash(Embeddings):
+    """Vectores deterministas por hash del texto (sin red)."""
+
+    def embed_documents(self, texts):
+        return [[(b - 127.5) / 127.5 for b in hashlib.sha256(t.encode("utf-8")).digest()] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def _store(n=20, dtype="float32"):
+    store = NumpyVectorStore(EmbeddingsHash(), dtype=dtype)
+    store.add_texts([f"texto {i}" for i in range(n)], ids=[f"id{i}" for i in range(n)],
+                    metadatas=[{"n": i, "idioma": "en" if i % 2 else "fr"} for i in range(n)])
+    return store
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_busqueda_encuentra_el_texto_mas_parecido(dtype):
+    store = _store(dtype=dtype)
+    docs = store.similarity_search("texto 13", k=3)
+    assert docs[0].page_content == "texto 13"
+    assert len(docs) == 3
+
+
+def test_filtro_por_metadatos():
+    store = _store()
+    docs = store.similarity_search("texto 4", k=20, filter={"idioma": "en"})
+    assert len(docs) == 10 and all(d.metadata["n"] % 2 for d in docs)
+
+
+def test_lote_de_consultas_igual_que_una_por_una():
+    store = _store()
+    embeddings = store.embeddings
+    consultas = [embeddings.embed_query(f"texto {i}") for i in (2, 7)]
+    por_lote = store.similarity_search_by_vectors(consultas, k=2)
+    assert [[d.page_content for d in r] for r in por_lote] == [
+        [d.page_content for d in store.similarity_search_by_vector(v, k=2)] for v in consultas
+    ]
+
+
+def test_agregar_con_id_existente_reemplaza():
+    store = _store(n=3)
+    store.add_texts(["reemplazo"], ids=["id1"], metadatas=[{"n": 1}])
+    assert len(store) == 3
+    assert store.get(where={"n": 1})["documents"] == ["reemplazo"]
+
+
+def test_borrar_y_persistir(tmp_path):
+    store = NumpyVectorStore(EmbeddingsHash(), persist_directory=str(tmp_path), dtype="int8")
+    store.add_texts([f"texto {i}" for i in range(5)], ids=[f"id{i}" for i in range(5)])
+    store.delete(["id0", "id3", "inexistente"])
+    assert store.get()["ids"] == ["id1", "id2", "id4"]
+
+    reabierto = NumpyVectorStore(EmbeddingsHash(), persist_directory=str(tmp_path))
+    assert reabierto.dtype == "int8"
+    assert reabierto.get()["ids"] == ["id1", "id2", "id4"]
+    assert reabierto.similarity_search("texto 4", k=1)[0].page_content == "texto 4"
+    reabierto.delete(["id1", "id2", "id4"])
+    assert len(reabierto) == 0 and reabierto.similarity_search("texto", k=2) == []
+
+
+def test_dtype_invalido():
+    with pytest.raises(ValueError):
+        NumpyVectorStore(EmbeddingsHash(), dtype="float64")
+
+
+def test_escritura_a_mitad_de_busqueda_no_mezcla_filas(monkeypatch):
+    store = _store()
+    puntuar = NumpyVectorStore._puntajes
+
+    def puntuar_y_borrar(self, *args, **kwargs):
+        puntajes = puntuar(self, *args, **kwargs)
+        # otro hilo borra y agrega mientras esta búsqueda arma los resultados
+        monkeypatch.setattr(NumpyVectorStore, "_puntajes", puntuar)
+        self.delete([f"id{i}" for i in range(10)])
+        self.add_texts(["otro"], ids=["otro"], metadatas=[{"n": -1, "idioma": "en"}])
+        return puntajes
+
+    monkeypatch.setattr(NumpyVectorStore, "_puntajes", puntuar_y_borrar)
+    for doc in store.similarity_search("texto 3", k=20, filter={"idioma": "en"}):
+        assert doc.id == f"id{doc.metadata['n']}" and doc.page_content == f"texto {doc.metadata['n']}"
+    assert len(store) == 11